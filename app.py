@@ -1,9 +1,10 @@
 import streamlit as st
 from pathlib import Path
-import importlib
 import logging
+import time
 import sys
 import os
+from src.ui.startup import record_rerun, startup_report, timed_import
 
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -28,45 +29,57 @@ load_css()
 # Dynamic import
 def dynamic_import(module_path):
     try:
-        return importlib.import_module(module_path)
+        return timed_import(module_path)
     except Exception as e:
         st.error(f"❌ Failed to load module `{module_path}`: {e}")
         return None
 
-# Import UI pages
-home = dynamic_import("src.ui.home")
-register = dynamic_import("src.ui.register")
-users = dynamic_import("src.ui.users")
-attendance = dynamic_import("src.ui.attendance")
-
-# Sidebar navigation
+# Sidebar navigation: page -> (module, UI function). Only the selected page is imported, so
+# opening Users never loads cv2 or the dlib models the Attendance page needs.
 PAGES = {
-    "🏠 Home": home,
-    "📝 Register": register,
-    "👥 Users": users,
-    "📷 Attendance": attendance
+    "🏠 Home": ("src.ui.home", "home_ui"),
+    "📝 Register": ("src.ui.register", "register_ui"),
+    "👥 Users": ("src.ui.users", "users_ui"),
+    "📷 Attendance": ("src.ui.attendance", "attendance_ui"),
+    "📈 Export": ("src.ui.export", "export_ui"),
+    "🎥 Cameras": ("src.ui.cameras", "cameras_ui")
 }
 
 st.sidebar.title("📋 Navigation")
 page_name = st.sidebar.radio("Go to", list(PAGES.keys()))
-page_module = PAGES[page_name]
+module_path, function_name = PAGES[page_name]
+
+# Let the page being left release what it holds, e.g. the Attendance camera
+previous_page = st.session_state.get("current_page")
+if previous_page is not None and previous_page != page_name:
+    previous_module = sys.modules.get(PAGES[previous_page][0])
+    if previous_module is not None and hasattr(previous_module, "leave_ui"):
+        previous_module.leave_ui()
+st.session_state.current_page = page_name
+
+started = time.perf_counter()
+page_module = dynamic_import(module_path)
 
 if page_module:
     try:
-        if hasattr(page_module, "home_ui") and "Home" in page_name:
-            page_module.home_ui()
-        elif hasattr(page_module, "register_ui") and "Register" in page_name:
-            page_module.register_ui()
-        elif hasattr(page_module, "users_ui") and "Users" in page_name:
-            page_module.users_ui()
-        elif hasattr(page_module, "attendance_ui") and "Attendance" in page_name:
-            page_module.attendance_ui()
+        if hasattr(page_module, function_name):
+            getattr(page_module, function_name)()
         else:
             st.warning("⚠️ Selected module is missing UI function.")
     except Exception as e:
         st.error(f"Error rendering `{page_name}`: {e}")
+    finally:
+        record_rerun(page_name, time.perf_counter() - started)
 else:
     st.error("🚫 Selected page is unavailable.")
 
+with st.sidebar.expander("⏱️ Startup"):
+    report = startup_report()
+    st.caption(f"Process up since {report['process_started']} · {report['modules_loaded']} modules loaded")
+    for module, cost in report["imports"].items():
+        st.caption(f"`{module}` imported in {cost['seconds']:.2f}s ({cost['modules']} modules)")
+    for page, runs in report["reruns"].items():
+        st.caption(f"{page}: last run {runs['last_ms']:.0f} ms, median {runs['median_ms']:.0f} ms over {runs['runs']} runs")
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("© 2025 AI Attendance System")
@@ -0,0 +1,103 @@
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import face_recognition
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.face_recognition.detectors import DetectorConfig, detect_faces, get_detector, parse_roi
+from src.face_recognition.tracking import iou
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def load_labelled(labels_csv):
+    """``image,top,right,bottom,left`` rows, one per face; image paths are relative to the CSV."""
+    boxes = {}
+    with open(labels_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            path = Path(labels_csv).parent / row["image"]
+            boxes.setdefault(path, []).append(tuple(int(row[key]) for key in ("top", "right", "bottom", "left")))
+    return [(face_recognition.load_image_file(str(path)), faces) for path, faces in sorted(boxes.items())]
+
+
+def load_one_face_per_image(images_dir, limit):
+    # Enrollment photos such as data/faces/<user>/*.jpg hold one face each, without boxes
+    paths = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)[:limit]
+    return [(face_recognition.load_image_file(str(path)), None) for path in paths]
+
+
+def score(detections, labels, threshold):
+    """(faces found, faces labelled, extra detections) for one image."""
+    if labels is None:
+        found = min(1, len(detections))
+        return found, 1, len(detections) - found
+    unmatched = list(detections)
+    found = 0
+    for label in labels:
+        best = max(unmatched, key=lambda box: iou(box, label), default=None)
+        if best is not None and iou(best, label) >= threshold:
+            unmatched.remove(best)
+            found += 1
+    return found, len(labels), len(unmatched)
+
+
+def run(images, config, threshold):
+    detect_faces(images[0][0], config)  # build the detector outside the timing
+    found = labelled = extra = 0
+    times = []
+    for rgb, labels in images:
+        start = time.perf_counter()
+        detections = detect_faces(rgb, config)
+        times.append(time.perf_counter() - start)
+        image_found, image_labelled, image_extra = score(detections, labels, threshold)
+        found, labelled, extra = found + image_found, labelled + image_labelled, extra + image_extra
+    times = np.array(times) * 1000
+    return {
+        "recall": found / max(1, labelled),
+        "extra_per_image": extra / len(images),
+        "ms_per_frame": float(times.mean()),
+        "p95_ms": float(np.percentile(times, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and ms/frame of each face detector backend on labelled images")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--labels", type=Path, help="CSV of image,top,right,bottom,left rows, one per face")
+    source.add_argument("--images", type=Path, help="directory of one-face images, e.g. data/faces")
+    parser.add_argument("--limit", type=int, default=500, help="images taken from --images")
+    parser.add_argument("--backends", nargs="+", default=["hog", "haar", "yunet"])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5])
+    parser.add_argument("--upsample", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--roi", type=parse_roi, default=None, help="left,top,right,bottom as fractions of the frame")
+    parser.add_argument("--iou", type=float, default=0.4, help="overlap that counts a labelled face as found")
+    args = parser.parse_args()
+
+    images = load_labelled(args.labels) if args.labels else load_one_face_per_image(args.images, args.limit)
+    if not images:
+        parser.error("No images found")
+    height, width = images[0][0].shape[:2]
+    print(f"{len(images)} images, first one {width}x{height}")
+
+    print(f"{'backend':>8} {'scale':>6} {'upsample':>9} {'recall':>7} {'extra/img':>10} {'ms/frame':>9} {'p95 ms':>8}")
+    for backend in args.backends:
+        try:
+            get_detector(DetectorConfig(backend=backend))
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            print(f"{backend:>8} skipped: {e}")
+            continue
+        for scale in args.scales:
+            # upsample only applies to HOG
+            for upsample in args.upsample if backend == "hog" else args.upsample[:1]:
+                config = DetectorConfig(backend=backend, scale=scale, upsample=upsample, roi=args.roi)
+                result = run(images, config, args.iou)
+                print(f"{backend:>8} {scale:>6.2f} {upsample:>9} {result['recall']:>7.3f} {result['extra_per_image']:>10.2f} "
+                      f"{result['ms_per_frame']:>9.1f} {result['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import face_recognition
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.face_recognition.encoder_batch import EncodingBatcher
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.model_store import MODEL_PATH, model_exists, open_model
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def load_gallery(model_path):
+    if model_exists(Path(model_path)):
+        model = open_model(Path(model_path))
+        return FaceGallery.from_matrix(model.encodings, model.ids)
+    return FaceGallery()
+
+
+def load_frames(images_dir, limit):
+    # Detection is the same on both paths, so boxes are found once up front
+    frames = []
+    for path in sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS):
+        rgb = face_recognition.load_image_file(str(path))
+        boxes = face_recognition.face_locations(rgb)
+        if boxes:
+            frames.append((rgb, boxes))
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def per_frame(gallery):
+    def recognize(rgb, boxes):
+        # What the server and recognize_faces() did before: one encoder call per frame
+        gallery.match(face_recognition.face_encodings(rgb, boxes), k=1)
+    return recognize, None
+
+
+def batched(gallery, max_batch, max_delay):
+    batcher = EncodingBatcher(max_batch, max_delay)
+
+    def recognize(rgb, boxes):
+        gallery.match(batcher.encode_frame(rgb, boxes), k=1)
+    return recognize, batcher
+
+
+def run(frames, recognize, sources, fps, duration):
+    """``sources`` threads each offering a frame every 1/fps seconds (0 = back to back) for ``duration`` seconds.
+
+    Latency runs from the frame's due time to its match result, so time a
+    source spends behind schedule counts against the path that caused it.
+    """
+    latencies = [[] for _ in range(sources)]
+    start = time.perf_counter() + 0.1
+
+    def source_loop(index):
+        n = 0
+        while True:
+            due = start + n / fps if fps else time.perf_counter()
+            if due - start >= duration:
+                return
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            rgb, boxes = frames[(index * 7919 + n) % len(frames)]
+            recognize(rgb, boxes)
+            latencies[index].append(time.perf_counter() - due)
+            n += 1
+
+    threads = [threading.Thread(target=source_loop, args=(i,)) for i in range(sources)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([np.array(source) for source in latencies]) * 1000
+    return {
+        "frames": len(latencies),
+        "fps": len(latencies) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p99 latency and throughput of per-frame vs micro-batched face encoding")
+    parser.add_argument("images", type=Path, help="directory of images with faces, e.g. data/faces")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--frames", type=int, default=200, help="distinct frames to cycle through")
+    parser.add_argument("--sources", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--fps", type=float, default=5.0, help="frames per second per source, 0 for back to back")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--batch", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--delay", type=float, nargs="+", default=[0.005, 0.02], help="batch deadlines in seconds")
+    args = parser.parse_args()
+
+    gallery = load_gallery(args.model)
+    frames = load_frames(args.images, args.frames)
+    if not frames:
+        parser.error(f"No faces found under {args.images}")
+    print(f"{len(frames)} frames, {sum(len(boxes) for _, boxes in frames) / len(frames):.2f} faces/frame, "
+          f"gallery of {len(gallery)}")
+
+    configs = [("per-frame", lambda: per_frame(gallery))]
+    for max_batch in args.batch:
+        for max_delay in args.delay:
+            configs.append((f"batch {max_batch} / {max_delay * 1000:.0f} ms",
+                            lambda b=max_batch, d=max_delay: batched(gallery, b, d)))
+
+    print(f"{'path':>20} {'sources':>8} {'frames':>7} {'frames/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'faces/batch':>12}")
+    for sources in args.sources:
+        for label, make in configs:
+            recognize, batcher = make()
+            result = run(frames, recognize, sources, args.fps, args.duration)
+            faces_per_batch = batcher.report()["faces_per_encode_batch"] if batcher else 0.0
+            if batcher:
+                batcher.close()
+            print(f"{label:>20} {sources:>8} {result['frames']:>7} {result['fps']:>9.1f} "
+                  f"{result['p50']:>8.1f} {result['p99']:>8.1f} {faces_per_batch:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
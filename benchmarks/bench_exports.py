@@ -0,0 +1,102 @@
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.db.attendance_schema import ATTENDANCE_COLUMNS
+
+START = date(2025, 1, 6)
+
+
+def synthetic_logs(log_dir, rows, days, seed=0):
+    rng = np.random.default_rng(seed)
+    per_day = rows // days
+    for offset in range(days):
+        day = START + timedelta(days=offset)
+        users = rng.integers(0, 5000, per_day)
+        seconds = np.sort(rng.integers(8 * 3600, 18 * 3600, per_day))
+        pd.DataFrame({
+            "User ID": [f"u{u:05d}" for u in users],
+            "Name": [f"User {u}" for u in users],
+            "Date": day.isoformat(),
+            "Time": [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds],
+            "Status": "Present",
+            "Method": "Face Recognition",
+        }, columns=ATTENDANCE_COLUMNS).to_csv(log_dir / f"attendance_{day.isoformat()}.csv", index=False)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def run_streaming(export_format, log_dir, export_dir, end):
+    from src.db.exports import export_attendance_range
+
+    baseline = peak_rss_mb()
+    result = export_attendance_range(export_format, START, end, log_dir, export_dir)
+    return result["rows"], result["seconds"], peak_rss_mb() - baseline, Path(result["path"]).stat().st_size
+
+
+def run_in_memory(export_format, log_dir, export_dir, end):
+    # What export_attendance() did before: one DataFrame, one in-memory file
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    df = pd.concat([pd.read_csv(path) for path in sorted(Path(log_dir).glob("*.csv"))], ignore_index=True)
+    buffer = io.BytesIO()
+    if export_format == "CSV":
+        buffer.write(df.to_csv(index=False).encode("utf-8"))
+    else:
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            df.to_excel(writer, index=False, sheet_name="Attendance")
+    return len(df), time.perf_counter() - start, peak_rss_mb() - baseline, buffer.getbuffer().nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS and throughput of attendance exports")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=100)
+    parser.add_argument("--formats", nargs="+", default=["CSV", "Excel", "PDF", "Word"])
+    parser.add_argument("--report-rows", type=int, default=100_000, help="rows used for the PDF and Word reports")
+    parser.add_argument("--compare", action="store_true", help="also run the old load-everything CSV/Excel export")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir, report_dir, export_dir = Path(tmp) / "logs", Path(tmp) / "report_logs", Path(tmp) / "exports"
+        log_dir.mkdir()
+        report_dir.mkdir()
+        synthetic_logs(log_dir, args.rows, args.days)
+        synthetic_logs(report_dir, args.report_rows, args.days)
+        end = START + timedelta(days=args.days)
+
+        runs = []
+        for export_format in args.formats:
+            source = report_dir if export_format in ("PDF", "Word") else log_dir
+            runs.append((f"{export_format} streaming", run_streaming, export_format, source))
+            if args.compare and export_format in ("CSV", "Excel"):
+                runs.append((f"{export_format} in-memory", run_in_memory, export_format, source))
+
+        print(f"{'export':>18} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'peak RSS MB':>12} {'file MB':>8}")
+        context = multiprocessing.get_context("spawn")
+        for label, fn, export_format, source in runs:
+            # A fresh process per run so ru_maxrss belongs to that run alone
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                rows, seconds, rss, size = pool.submit(fn, export_format, source, export_dir, end).result()
+            print(f"{label:>18} {rows:>9} {seconds:>8.1f} {rows / seconds:>9.0f} {rss:>12.1f} {size / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
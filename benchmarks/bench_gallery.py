@@ -0,0 +1,87 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.face_recognition.gallery import FaceGallery
+
+try:
+    from face_recognition import face_distance
+except ImportError:
+    # Same computation as face_recognition.face_distance, for boxes without dlib
+    def face_distance(face_encodings, face_to_compare):
+        if len(face_encodings) == 0:
+            return np.empty((0))
+        return np.linalg.norm(face_encodings - face_to_compare, axis=1)
+
+
+def synthetic_gallery(size, n_users, rng):
+    centers = rng.normal(0, 0.1, size=(n_users, 128))
+    owners = rng.integers(0, n_users, size=size)
+    encodings = centers[owners] + rng.normal(0, 0.03, size=(size, 128))
+    return list(encodings), [f"user{i}" for i in owners], centers
+
+
+def per_face_path(frame_encodings, known_encodings, known_ids):
+    # What recognize_faces() did before: one face_distance call per detected face
+    results = []
+    for encoding in frame_encodings:
+        distances = face_distance(known_encodings, encoding)
+        best_index = np.argmin(distances)
+        results.append((known_ids[best_index], distances[best_index]))
+    return results
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, faces_per_frame, repeats, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for size in sizes:
+        known_encodings, known_ids, centers = synthetic_gallery(size, max(size // 4, 1), rng)
+        gallery = FaceGallery.from_encodings(known_encodings, known_ids)
+        frame = centers[rng.integers(0, len(centers), size=faces_per_frame)] + rng.normal(0, 0.03, size=(faces_per_frame, 128))
+
+        baseline_time, baseline = timed(lambda: per_face_path(frame, known_encodings, known_ids), repeats)
+        gallery_time, (ids, distances) = timed(lambda: gallery.match(frame, k=1), repeats)
+
+        same = all(
+            b_id == g_ids[0] and abs(b_dist - g_dist[0]) < 1e-5
+            for (b_id, b_dist), g_ids, g_dist in zip(baseline, ids, distances)
+        )
+        rows.append({
+            "gallery_size": size,
+            "faces": faces_per_frame,
+            "per_face_ms": baseline_time * 1000,
+            "batched_ms": gallery_time * 1000,
+            "speedup": baseline_time / gallery_time,
+            "same_results": same,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-face face_distance loop vs batched FaceGallery.match")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--faces", type=int, default=5, help="faces detected per frame")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'gallery':>8} {'faces':>5} {'per-face ms':>12} {'batched ms':>11} {'speedup':>8} {'same':>5}")
+    for row in run(args.sizes, args.faces, args.repeats):
+        print(f"{row['gallery_size']:>8} {row['faces']:>5} {row['per_face_ms']:>12.2f} "
+              f"{row['batched_ms']:>11.2f} {row['speedup']:>7.1f}x {str(row['same_results']):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.db.attendance_history import AttendanceHistory
+
+COLUMNS = ["User ID", "Name", "Date", "Time", "Status", "Method"]
+
+
+def synthetic_logs(log_dir, users, days, attend_rate, seed=0):
+    rng = np.random.default_rng(seed)
+    user_ids = np.array([f"u{i:05d}" for i in range(users)])
+    start = date(2025, 1, 1)
+    rows = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        present = user_ids[rng.random(users) < attend_rate]
+        seconds = rng.integers(8 * 3600, 10 * 3600, len(present))
+        pd.DataFrame({
+            "User ID": present,
+            "Name": np.char.add("User ", present),
+            "Date": day.isoformat(),
+            "Time": [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds],
+            "Status": "Present",
+            "Method": "Face Recognition",
+        }, columns=COLUMNS).to_csv(log_dir / f"attendance_{day.isoformat()}.csv", index=False)
+        rows += len(present)
+    users_list = [{"user_id": u, "department": f"dept{i % 20}"} for i, u in enumerate(user_ids)]
+    return users_list, rows
+
+
+def csv_department_rates(log_dir, users, start, end):
+    # What home_ui would have to do today: read every daily CSV, merge with the user table, group
+    frames = []
+    for path in sorted(log_dir.glob("attendance_*.csv")):
+        if start.isoformat() <= path.stem[-10:] <= end.isoformat():
+            frames.append(pd.read_csv(path, dtype=str))
+    logs = pd.concat(frames, ignore_index=True).drop_duplicates(["User ID", "Date"])
+    users_df = pd.DataFrame(users).rename(columns={"user_id": "User ID", "department": "Department"})
+    merged = logs.merge(users_df, on="User ID", how="left")
+    session_days = logs["Date"].nunique()
+    present = merged.groupby("Department").size()
+    headcount = users_df.groupby("Department").size()
+    return (present / (headcount * session_days)).round(4)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semester analytics: daily CSVs vs the columnar attendance history")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--attend-rate", type=float, default=0.85)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir, history_dir = Path(tmp) / "logs", Path(tmp) / "history"
+        log_dir.mkdir()
+        users, rows = synthetic_logs(log_dir, args.users, args.days, args.attend_rate)
+        csv_bytes = sum(p.stat().st_size for p in log_dir.glob("*.csv"))
+
+        history = AttendanceHistory(history_dir)
+        start = time.perf_counter()
+        history.roll_up(log_dir)
+        roll_up_seconds = time.perf_counter() - start
+        history_bytes = sum(p.stat().st_size for p in history_dir.glob("*.npz"))
+
+        # Incremental roll-up: one more day arrives
+        extra_day = date(2025, 1, 1) + timedelta(days=args.days)
+        pd.DataFrame({"User ID": ["u00000"], "Name": ["User u00000"], "Date": [extra_day.isoformat()], "Time": ["09:00:00"],
+                      "Status": ["Present"], "Method": ["Face Recognition"]}).to_csv(
+            log_dir / f"attendance_{extra_day.isoformat()}.csv", index=False)
+        start = time.perf_counter()
+        history.roll_up(log_dir)
+        incremental_seconds = time.perf_counter() - start
+
+        semester = (date(2025, 1, 1), date(2025, 6, 30))
+        expected, csv_seconds = timed(lambda: csv_department_rates(log_dir, users, *semester), repeat=1)
+        rates, history_seconds = timed(lambda: history.department_rates(*semester, users=users))
+        summary, summary_seconds = timed(lambda: history.user_summary(*semester))
+        match = np.allclose(rates.set_index("Department")["Rate"].reindex(expected.index).to_numpy(), expected.to_numpy())
+
+    print(f"{rows} check-ins from {args.users} users over {args.days} days")
+    print(f"storage: {csv_bytes / 1e6:.1f} MB of CSV -> {history_bytes / 1e6:.1f} MB columnar")
+    print(f"initial roll-up {roll_up_seconds:.2f}s, incremental roll-up of one day {1000 * incremental_seconds:.0f} ms")
+    print(f"department rates over a semester: CSV {1000 * csv_seconds:.0f} ms, history {1000 * history_seconds:.1f} ms "
+          f"({csv_seconds / history_seconds:.0f}x), results match: {match}")
+    print(f"per-user summary over a semester: {1000 * summary_seconds:.1f} ms for {len(summary)} users")
+
+
+if __name__ == "__main__":
+    main()
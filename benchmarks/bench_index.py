@@ -0,0 +1,78 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.index import ExactIndex, IVFIndex
+
+THRESHOLD = 0.5
+
+
+def synthetic_gallery(n_users, photos_per_user, rng):
+    # Roughly the geometry of dlib encodings: ~0.9 between people, ~0.35 within one person
+    centers = rng.normal(0, 0.056, size=(n_users, 128))
+    owners = np.repeat(np.arange(n_users), photos_per_user)
+    encodings = centers[owners] + rng.normal(0, 0.022, size=(len(owners), 128))
+    return encodings, [f"user{i}" for i in owners], centers
+
+
+def queries_for(centers, n_queries, impostor_rate, rng):
+    genuine = centers[rng.integers(0, len(centers), size=n_queries)] + rng.normal(0, 0.022, size=(n_queries, 128))
+    impostors = rng.normal(0, 0.056, size=(n_queries, 128))
+    use_impostor = rng.random(n_queries) < impostor_rate
+    return np.where(use_impostor[:, None], impostors, genuine)
+
+
+def decisions(gallery, queries, batch):
+    out, elapsed = [], 0.0
+    for start in range(0, len(queries), batch):
+        t0 = time.perf_counter()
+        ids, distances = gallery.match(queries[start:start + batch], k=1)
+        elapsed += time.perf_counter() - t0
+        out.extend(i[0] if i and d[0] < THRESHOLD else None for i, d in zip(ids, distances))
+    return out, elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of the IVF index against exact search")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--photos", type=int, default=3, help="photos per user")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=5, help="faces matched per call (faces per frame)")
+    parser.add_argument("--impostors", type=float, default=0.2, help="fraction of unknown faces")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    encodings, ids, centers = synthetic_gallery(args.users, args.photos, rng)
+    gallery = FaceGallery.from_encodings(encodings, ids)
+    queries = queries_for(centers, args.queries, args.impostors, rng)
+
+    gallery.index = ExactIndex()
+    exact, exact_latency = decisions(gallery, queries, args.batch)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(gallery.matrix, nlist=args.nlist)
+    build_time = time.perf_counter() - start
+    index.attach(gallery)
+
+    print(f"gallery={len(gallery)} encodings, nlist={index.nlist}, build={build_time:.1f}s, threshold={THRESHOLD}")
+    print(f"{'backend':>10} {'ms/face':>8} {'speedup':>8} {'agreement':>10} {'recall':>7}")
+    print(f"{'exact':>10} {exact_latency * 1000:>8.3f} {'1.0x':>8} {'1.000':>10} {'1.000':>7}")
+    matched = [i for i, d in enumerate(exact) if d is not None]
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        approx, latency = decisions(gallery, queries, args.batch)
+        agreement = np.mean([a == e for a, e in zip(approx, exact)])
+        recall = np.mean([approx[i] == exact[i] for i in matched]) if matched else 1.0
+        print(f"{'ivf/' + str(nprobe):>10} {latency * 1000:>8.3f} {exact_latency / latency:>7.1f}x {agreement:>10.3f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.face_recognition.prototypes import PrototypeConfig, add_prototype_arguments, compact, evaluate, print_report, \
+    prototype_config_from_args
+
+
+def synthetic_enrollment(n_users, mean_photos, two_looks, mislabelled, rng):
+    # dlib-like geometry (see bench_index.py), but photo counts vary per user, some users have
+    # two looks (e.g. glasses) about 0.3 apart, and a few photos are filed under the wrong user
+    centers = rng.normal(0, 0.056, size=(n_users, 128))
+    looks = rng.normal(0, 0.3 / np.sqrt(128), size=(n_users, 128)) * (rng.random(n_users) < two_looks)[:, None]
+    counts = np.maximum(1, rng.geometric(1 / mean_photos, size=n_users))
+    owners = np.repeat(np.arange(n_users), counts)
+    second_look = rng.random(len(owners)) < 0.5
+    encodings = centers[owners] + looks[owners] * second_look[:, None] + rng.normal(0, 0.022, size=(len(owners), 128))
+    filed_under = owners.copy()
+    wrong = rng.random(len(owners)) < mislabelled
+    filed_under[wrong] = rng.integers(0, n_users, size=int(wrong.sum()))
+    return encodings, [f"user{i}" for i in filed_under]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallery size and accuracy: every photo vs per-user prototypes")
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 5_000])
+    parser.add_argument("--mean-photos", type=float, default=8.0, help="mean photos per user (geometric)")
+    parser.add_argument("--two-looks", type=float, default=0.2, help="share of users enrolled with two looks")
+    parser.add_argument("--mislabelled", type=float, default=0.005, help="share of photos filed under the wrong user")
+    parser.add_argument("--seed", type=int, default=0)
+    add_prototype_arguments(parser)
+    args = parser.parse_args()
+
+    config = prototype_config_from_args(args, PrototypeConfig())
+    for n in args.users:
+        rng = np.random.default_rng(args.seed)
+        encodings, ids = synthetic_enrollment(n, args.mean_photos, args.two_looks, args.mislabelled, rng)
+        started = time.perf_counter()
+        compacted = compact(encodings, ids, config=config)
+        print(f"\n{n} users, {len(ids)} photos -> {len(compacted.ids)} prototypes ({compacted.ratio:.0%}), "
+              f"{len(compacted.outliers)} outliers, {time.perf_counter() - started:.2f}s")
+        print_report(evaluate(encodings, ids, config, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import face_recognition
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.face_recognition.capture import VideoFileSource
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.model_store import MODEL_PATH, model_exists, open_model
+from src.face_recognition.tracking import FaceTracker, TrackingConfig
+
+
+def load_gallery(model_path):
+    if model_exists(Path(model_path)):
+        model = open_model(Path(model_path))
+        return FaceGallery.from_matrix(model.encodings, model.ids)
+    return FaceGallery()
+
+
+def run(video, gallery, tracker=None, max_frames=None):
+    source = VideoFileSource(video, realtime=False)
+    frames = faces = 0
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if tracker is not None:
+                faces += len(tracker.update(rgb, gallery))
+            else:
+                # The per-frame path used by recognize_faces() without tracking
+                locations = face_recognition.face_locations(rgb)
+                encodings = face_recognition.face_encodings(rgb, locations)
+                gallery.match(encodings, k=1)
+                faces += len(locations)
+            frames += 1
+    finally:
+        source.release()
+    elapsed, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+    return {
+        "frames": frames,
+        "faces": faces,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "ms_per_frame": 1000 * elapsed / max(frames, 1),
+        "cpu_ms_per_frame": 1000 * cpu / max(frames, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Every-frame recognition vs detect-every-N tracking on a recorded video")
+    parser.add_argument("video", type=Path)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--detect-every", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--scale", type=float, nargs="+", default=[1.0, 0.5])
+    args = parser.parse_args()
+
+    gallery = load_gallery(args.model)
+    print(f"{'mode':>22} {'frames':>7} {'fps':>7} {'ms/frame':>9} {'cpu ms/frame':>13} {'encodings':>10}")
+    row = run(args.video, gallery, max_frames=args.max_frames)
+    print(f"{'every frame':>22} {row['frames']:>7} {row['fps']:>7.1f} {row['ms_per_frame']:>9.1f} "
+          f"{row['cpu_ms_per_frame']:>13.1f} {row['faces']:>10}")
+    for scale in args.scale:
+        for detect_every in args.detect_every:
+            tracker = FaceTracker(TrackingConfig(detect_every=detect_every, detection_scale=scale))
+            row = run(args.video, gallery, tracker, max_frames=args.max_frames)
+            mode = f"track N={detect_every} x{scale}"
+            print(f"{mode:>22} {row['frames']:>7} {row['fps']:>7.1f} {row['ms_per_frame']:>9.1f} "
+                  f"{row['cpu_ms_per_frame']:>13.1f} {tracker.stats['encodings']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.db.user_directory import DIRECTORY_COLUMNS, UserDirectory
+
+QUERIES = [("", "contains", None), ("user 12", "contains", None), ("4242", "contains", None),
+           ("smi", "prefix", None), ("u00123", "prefix", None), ("", "contains", "dept7"), ("user", "contains", "dept7")]
+
+
+def synthetic_records(n):
+    return [{"user_id": f"u{i:07d}", "name": f"User {i} {('Smith', 'Jones', 'Garcia', 'Chen')[i % 4]}", "phone": "",
+             "email": f"u{i}@example.edu", "department": f"dept{i % 40}"} for i in range(n)]
+
+
+def full_table(records):
+    # What users_ui() did before: every user into one DataFrame sent to the browser
+    df = pd.DataFrame(records)[DIRECTORY_COLUMNS]
+    df.columns = ["User ID", "Name", "Phone", "Email", "Department"]
+    return df
+
+
+def mean_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Users page: full table vs paginated directory search")
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.users:
+        records = synthetic_records(n)
+        directory = UserDirectory(records)
+        print(f"users={n}  index build {directory.build_seconds * 1000:.0f} ms  "
+              f"full table {mean_ms(lambda: full_table(records), args.repeat):.1f} ms for {n} rows")
+        print(f"  {'query':>10} {'mode':>9} {'department':>11} {'matches':>8} {'page ms':>8}")
+        for query, mode, department in QUERIES:
+            total = directory.search(query, department, 1, args.page_size, mode).total
+            ms = mean_ms(lambda: directory.search(query, department, 1, args.page_size, mode), args.repeat)
+            print(f"  {query or '-':>10} {mode:>9} {department or 'all':>11} {total:>8} {ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # db_handler and the pages resolve data/ relative to the repo root
+
+from src.db import db_handler
+
+# Throwaway tables; keep their operations out of data/logs/db_operations.log
+db_handler.LOG_TO_FILE = False
+
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+def synthetic_users(n):
+    return pd.DataFrame({
+        "user_id": [f"u{i:07d}" for i in range(n)],
+        "name": [f"User {i}" for i in range(n)],
+        "password": FAKE_HASH,
+        "phone": "",
+        "email": [f"u{i}@example.edu" for i in range(n)],
+        "department": [f"dept{i % 40}" for i in range(n)],
+        "created_at": "2025-01-01 09:00:00",
+        "last_login": "",
+    })
+
+
+def new_user(i):
+    return {"user_id": f"new{i}", "name": f"New {i}", "password": FAKE_HASH, "phone": "",
+            "email": f"new{i}@example.edu", "department": "dept0", "created_at": "2025-01-01 09:00:00", "last_login": ""}
+
+
+def written_bytes():
+    # Bytes passed to write() by this process; Linux only
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("wchar:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def disk_bytes(directory):
+    return sum(p.stat().st_size for p in Path(directory).rglob("*") if p.is_file())
+
+
+def legacy_register(user):
+    # What register_user() stored before: a full backup copy, then a full rewrite of users.csv
+    df, _, _ = db_handler._cached_users()
+    if db_handler._csv_taken(user["user_id"], user["email"]) != (False, False):
+        raise RuntimeError("duplicate")
+    df = pd.concat([df, pd.DataFrame([user])], ignore_index=True)
+    backup_path = os.path.join(db_handler.BACKUP_DIR, f"users_backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv")
+    df.to_csv(backup_path, index=False)
+    df.to_csv(db_handler.DB_FILE, index=False)
+    db_handler.invalidate_user_cache()
+
+
+def journal_register(user):
+    # Storage part of register_user() on the CSV path; bcrypt hashing is left out on both sides
+    if any(db_handler._csv_taken(user["user_id"], user["email"])):
+        raise RuntimeError("duplicate")
+    if not db_handler._append_user(user):
+        raise RuntimeError("write failed")
+
+
+def run(register, users, registrations):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_handler.DB_FILE = os.path.join(tmp, "users.csv")
+        db_handler.BACKUP_DIR = os.path.join(tmp, "backups")
+        os.makedirs(db_handler.BACKUP_DIR)
+        synthetic_users(users).to_csv(db_handler.DB_FILE, index=False)
+        db_handler.invalidate_user_cache()
+        db_handler._cached_users()
+
+        before = written_bytes()
+        start = time.perf_counter()
+        for i in range(registrations):
+            register(new_user(i))
+        elapsed = time.perf_counter() - start
+        after = written_bytes()
+
+        db_handler.invalidate_user_cache()
+        final = len(db_handler._load_users_df())
+        if final != users + registrations:
+            raise RuntimeError(f"expected {users + registrations} users after recovery, found {final}")
+        return {
+            "seconds": elapsed,
+            "written_mb": (after - before) / 1e6 if before is not None else float("nan"),
+            "disk_mb": disk_bytes(tmp) / 1e6,
+            "backups": len(list(Path(db_handler.BACKUP_DIR).iterdir())),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk registration: backup copy + full rewrite per user vs the change journal")
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="users already registered")
+    parser.add_argument("--registrations", type=int, default=1_000, help="users registered in one intake")
+    parser.add_argument("--skip-legacy-above", type=int, default=10_000,
+                        help="skip the old path for tables larger than this (it is quadratic)")
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'path':>8} {'seconds':>9} {'ms/user':>8} {'written MB':>11} {'on disk MB':>11} {'backups':>8}")
+    for users in args.users:
+        paths = [("journal", journal_register)]
+        if users <= args.skip_legacy_above:
+            paths.insert(0, ("legacy", legacy_register))
+        for label, register in paths:
+            result = run(register, users, args.registrations)
+            print(f"{users:>8} {label:>8} {result['seconds']:>9.2f} {1000 * result['seconds'] / args.registrations:>8.2f} "
+                  f"{result['written_mb']:>11.1f} {result['disk_mb']:>11.1f} {result['backups']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # db_handler and the pages resolve data/ relative to the repo root
+
+from src.db import db_handler
+from src.db.sqlite_store import SQLiteUserStore
+
+# Throwaway tables; keep their operations out of data/logs/db_operations.log
+db_handler.LOG_TO_FILE = False
+
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+def synthetic_users(n):
+    return pd.DataFrame({
+        "user_id": [f"u{i:07d}" for i in range(n)],
+        "name": [f"User {i}" for i in range(n)],
+        "password": FAKE_HASH,
+        "phone": "",
+        "email": [f"u{i}@example.edu" for i in range(n)],
+        "department": [f"dept{i % 40}" for i in range(n)],
+        "created_at": "2025-01-01 09:00:00",
+        "last_login": "",
+    })
+
+
+def new_user(i):
+    return {"user_id": f"new{i}", "name": f"New {i}", "password": FAKE_HASH, "phone": "",
+            "email": f"new{i}@example.edu", "department": "dept0", "created_at": "2025-01-01 09:00:00", "last_login": ""}
+
+
+def mean_ms(fn, args):
+    start = time.perf_counter()
+    for arg in args:
+        fn(arg)
+    return 1000 * (time.perf_counter() - start) / len(args)
+
+
+def uncached_lookup(user_id):
+    db_handler.invalidate_user_cache()
+    return db_handler.get_user_by_id(user_id)
+
+
+def csv_register(user):
+    # Storage part of register_user() on the CSV path; bcrypt hashing is left out on both sides
+    if any(db_handler._csv_taken(user["user_id"], user["email"])):
+        raise RuntimeError("duplicate")
+    db_handler._append_user(user)
+
+
+def sqlite_register(store):
+    def register(user):
+        if store.get_user(user["user_id"]) or store.email_exists(user["email"]):
+            raise RuntimeError("duplicate")
+        store.insert_user(user)
+    return register
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User lookup and registration latency: users.csv vs SQLite")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--registrations", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_handler.DB_FILE = os.path.join(tmp, "users.csv")
+        db_handler.BACKUP_DIR = os.path.join(tmp, "backups")
+        os.makedirs(db_handler.BACKUP_DIR)
+        synthetic_users(args.users).to_csv(db_handler.DB_FILE, index=False)
+        lookup_ids = [f"u{(i * 7919) % args.users:07d}" for i in range(args.lookups)]
+
+        start = time.perf_counter()
+        store = SQLiteUserStore(os.path.join(tmp, "users.db"), csv_path=db_handler.DB_FILE)
+        import_seconds = time.perf_counter() - start
+
+        db_handler.USER_STORE_BACKEND = "csv"
+        csv_lookup = mean_ms(uncached_lookup, lookup_ids)
+        db_handler.get_user_by_id(lookup_ids[0])
+        cached_lookup = mean_ms(db_handler.get_user_by_id, lookup_ids * 50)
+        csv_reg = mean_ms(csv_register, [new_user(i) for i in range(args.registrations)])
+
+        sqlite_lookup = mean_ms(store.get_user, lookup_ids * 50)
+        sqlite_reg = mean_ms(sqlite_register(store), [new_user(i) for i in range(args.registrations, 2 * args.registrations)])
+
+    print(f"users={args.users}  one-time CSV import into SQLite: {import_seconds:.2f}s")
+    print(f"{'operation':>10} {'csv ms':>10} {'sqlite ms':>10} {'speedup':>9}")
+    print(f"{'lookup':>10} {csv_lookup:>10.2f} {sqlite_lookup:>10.3f} {csv_lookup / sqlite_lookup:>8.0f}x")
+    print(f"{'lookup':>10} {cached_lookup:>10.3f} {sqlite_lookup:>10.3f} {cached_lookup / sqlite_lookup:>8.1f}x  (csv parsed once, in-process cache)")
+    print(f"{'register':>10} {csv_reg:>10.2f} {sqlite_reg:>10.3f} {csv_reg / sqlite_reg:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
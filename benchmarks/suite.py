@@ -0,0 +1,398 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # db_handler and the pages resolve data/ relative to the repo root
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+SCALES = [1_000, 10_000, 100_000]
+PHOTOS_PER_USER = 3
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+FRAME_SHAPE = (480, 640, 3)
+LOG_DAY = date(2025, 1, 6)
+TAIL_ROWS = 100
+FAKE_PASSWORD = "benchmark-password"
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def synthetic_gallery(size, rng):
+    n_users = max(1, size // PHOTOS_PER_USER)
+    centers = rng.normal(0, 0.1, size=(n_users, 128)).astype(np.float32)
+    owners = rng.integers(0, n_users, size=size)
+    encodings = centers[owners] + rng.normal(0, 0.03, size=(size, 128)).astype(np.float32)
+    return encodings, [f"u{i:07d}" for i in owners], centers
+
+
+def synthetic_users(n):
+    return pd.DataFrame({
+        "user_id": [f"u{i:07d}" for i in range(n)],
+        "name": [f"User {i}" for i in range(n)],
+        "password": FAKE_HASH,
+        "phone": "",
+        "email": [f"u{i}@example.edu" for i in range(n)],
+        "department": [f"dept{i % 40}" for i in range(n)],
+        "created_at": "2025-01-01 09:00:00",
+        "last_login": "",
+    })
+
+
+def synthetic_log(path, rows, n_users, rng, start_second=8 * 3600):
+    from src.db.attendance_schema import ATTENDANCE_COLUMNS
+
+    users = rng.integers(0, n_users, rows)
+    seconds = np.sort(rng.integers(start_second, start_second + 2 * 3600, rows))
+    pd.DataFrame({
+        "User ID": [f"u{u:07d}" for u in users],
+        "Name": [f"User {u}" for u in users],
+        "Date": LOG_DAY.isoformat(),
+        "Time": [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds],
+        "Status": "Present",
+        "Method": "Face Recognition",
+    }, columns=ATTENDANCE_COLUMNS).to_csv(path, mode="a" if path.exists() else "w", header=not path.exists(), index=False)
+
+
+def face_photos(faces_dir, limit):
+    if faces_dir is None or not Path(faces_dir).is_dir():
+        return []
+    return sorted(p for p in Path(faces_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)[:limit]
+
+
+def generated_frames(photos, count, rng):
+    """Enrollment photos pasted onto a noisy background, or background only when there are none."""
+    faces = [cv2.resize(cv2.imread(str(path)), (160, 200)) for path in photos[:count]]
+    faces = [face for face in faces if face is not None]
+    frames = []
+    for i in range(count):
+        frame = rng.integers(60, 120, size=FRAME_SHAPE, dtype=np.uint8)
+        for j in range(min(2, len(faces))):
+            top, left = int(rng.integers(20, 260)), 60 + j * 300 + int(rng.integers(0, 60))
+            frame[top:top + 200, left:left + 160] = faces[(i + j) % len(faces)]
+        frames.append(frame)
+    return frames
+
+
+def bench_match(args, work, context):
+    from src.face_recognition.gallery import FaceGallery
+
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    for n in args.scales:
+        encodings, ids, centers = synthetic_gallery(n, rng)
+        start = time.perf_counter()
+        gallery = FaceGallery.from_matrix(encodings, ids)
+        results[f"match/{n}/build_ms"] = 1000 * (time.perf_counter() - start)
+        queries = [centers[rng.integers(0, len(centers), args.faces)] + rng.normal(0, 0.03, (args.faces, 128)).astype(np.float32)
+                   for _ in range(args.repeats * 10)]
+        batches = iter(queries)
+        results[f"match/{n}/ms_per_frame"] = median_ms(lambda: gallery.match(list(next(batches)), k=1), len(queries))
+    context["match"] = {"faces_per_frame": args.faces, "photos_per_user": PHOTOS_PER_USER}
+    return results
+
+
+def bench_training(args, work, context):
+    from src.face_recognition import trainer
+    from src.face_recognition.model_store import open_model, write_model
+
+    rng = np.random.default_rng(args.seed)
+    faces_dir = work / "faces"
+    photos = face_photos(args.faces_dir, args.train_images)
+    for i, path in enumerate(photos):
+        target = faces_dir / path.parent.name / f"{path.stem}_{i}.jpg"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix.lower() == ".jpg":
+            shutil.copyfile(path, target)
+        else:
+            cv2.imwrite(str(target), cv2.imread(str(path)))
+    if not photos:
+        # No faces to find: decode and detect are still measured, encode is not
+        for i in range(args.train_images):
+            target = faces_dir / f"u{i % 50:07d}" / f"photo_{i}.jpg"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            cv2.imwrite(str(target), rng.integers(0, 256, size=FRAME_SHAPE, dtype=np.uint8))
+    trainer.FACES_DIR = faces_dir
+    trainer.MODEL_PATH = work / "model" / "face_encodings.bin"
+    images = len(trainer.list_training_images())
+    start = time.perf_counter()
+    trainer.train_model(workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    results = {"training/images_per_s": images / elapsed}
+    rng = np.random.default_rng(args.seed)
+    for n in args.scales:
+        encodings, ids, _ = synthetic_gallery(n, rng)
+        path = work / "model" / f"synthetic_{n}.bin"
+        results[f"training/{n}/write_model_ms"] = median_ms(lambda: write_model(path, encodings, ids), args.repeats)
+        results[f"training/{n}/open_model_ms"] = median_ms(lambda: open_model(path), args.repeats)
+    context["training"] = {"images": images, "photos": "enrollment photos" if photos else "generated, no faces",
+                           "workers": args.workers}
+    return results
+
+
+def bench_frames(args, work, context):
+    from src.face_recognition.capture import SyntheticSource, VideoFileSource
+    from src.face_recognition.core import locate_and_match
+    from src.face_recognition.detectors import LIVE_DETECTOR, resolve_backend
+    from src.face_recognition.gallery import FaceGallery
+    from src.face_recognition.metrics import METRICS
+
+    rng = np.random.default_rng(args.seed)
+    if args.video:
+        source = VideoFileSource(args.video, realtime=False)
+    else:
+        pool = generated_frames(face_photos(args.faces_dir, 30), 30, rng)
+        source = SyntheticSource(lambda i: pool[i % len(pool)].copy(), n_frames=args.frames, fps=0)
+    size = max(args.scales)
+    encodings, ids, _ = synthetic_gallery(size, rng)
+    gallery = FaceGallery.from_matrix(encodings, ids)
+
+    latencies, faces = [], 0
+    METRICS.reset()
+    METRICS.enabled = True
+    try:
+        while len(latencies) < args.frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            start = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            faces += len(locate_and_match(rgb, gallery, 0.5, detector=LIVE_DETECTOR))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        METRICS.enabled = False
+        source.release()
+    if not latencies:
+        raise RuntimeError(f"No frames read from {args.video}")
+
+    latencies = np.array(latencies) * 1000
+    results = {
+        "frames/p50_ms": float(np.percentile(latencies, 50)),
+        "frames/p95_ms": float(np.percentile(latencies, 95)),
+        "frames/frames_per_s": 1000 * len(latencies) / float(latencies.sum()),
+    }
+    for stage, summary in METRICS.snapshot()["stages_ms"].items():
+        results[f"frames/{stage}_p50_ms"] = summary["p50"]
+    context["frames"] = {"source": str(args.video) if args.video else "generated", "frames": len(latencies),
+                         "faces_per_frame": faces / len(latencies), "gallery_size": size,
+                         "detector": resolve_backend(LIVE_DETECTOR)}
+    return results
+
+
+def bench_dashboard(args, work, context):
+    from src.db.attendance_schema import read_log
+    from src.ui.dashboard_data import USER_INFO_COLUMNS, DashboardCache
+
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    for n in args.scales:
+        log_dir = work / f"attendance_{n}"
+        log_dir.mkdir(parents=True)
+        path = log_dir / f"attendance_{LOG_DAY.isoformat()}.csv"
+        synthetic_log(path, n, n, rng)
+        users = synthetic_users(n).rename(columns={"user_id": "User ID", "name": "Name", "phone": "Phone Number",
+                                                   "email": "Email", "department": "Department"})[USER_INFO_COLUMNS]
+
+        # read_log is what home.load_attendance_log runs; the first read also writes the normalized copy
+        start = time.perf_counter()
+        read_log(path)
+        results[f"dashboard/{n}/read_log_cold_ms"] = 1000 * (time.perf_counter() - start)
+        results[f"dashboard/{n}/read_log_ms"] = median_ms(lambda: read_log(path), args.repeats)
+
+        cache = DashboardCache(lambda: users, lambda: 1)
+        start = time.perf_counter()
+        cache.get(path)
+        results[f"dashboard/{n}/cold_ms"] = 1000 * (time.perf_counter() - start)
+        results[f"dashboard/{n}/warm_ms"] = median_ms(lambda: cache.get(path), args.repeats)
+
+        def append_and_get():
+            synthetic_log(path, TAIL_ROWS, n, rng, start_second=10 * 3600)
+            cache.get(path)
+        results[f"dashboard/{n}/tail_ms"] = median_ms(append_and_get, args.repeats)
+    context["dashboard"] = {"rows_per_user": 1, "tail_rows": TAIL_ROWS}
+    return results
+
+
+def bench_db(args, work, context):
+    from src.db import db_handler
+
+    db_handler.USER_STORE_BACKEND = "csv"
+    # Throwaway tables; keep their operations out of data/logs/db_operations.log
+    db_handler.LOG_TO_FILE = False
+    results = {}
+    for n in args.scales:
+        user_dir = work / f"users_{n}"
+        (user_dir / "backups").mkdir(parents=True)
+        db_handler.DB_FILE = str(user_dir / "users.csv")
+        db_handler.BACKUP_DIR = str(user_dir / "backups")
+        synthetic_users(n).to_csv(db_handler.DB_FILE, index=False)
+        db_handler.invalidate_user_cache()
+        lookups = iter([f"u{(i * 7919) % n:07d}" for i in range(args.lookups * 100)])
+
+        def uncached_lookup():
+            db_handler.invalidate_user_cache()
+            db_handler.get_user_by_id(next(lookups))
+        results[f"db/{n}/lookup_uncached_ms"] = median_ms(uncached_lookup, args.lookups)
+        results[f"db/{n}/lookup_ms"] = median_ms(lambda: db_handler.get_user_by_id(next(lookups)), args.lookups * 50)
+
+        registrations = iter(range(args.registrations))
+
+        def register():
+            i = next(registrations)
+            ok, message = db_handler.register_user(f"bench{i}", f"Bench {i}", FAKE_PASSWORD, email=f"bench{i}@example.edu")
+            if not ok:
+                raise RuntimeError(message)
+        results[f"db/{n}/register_ms"] = median_ms(register, args.registrations)
+    context["db"] = {"backend": "csv", "lookups": args.lookups, "registrations": args.registrations,
+                     "note": "register_ms includes bcrypt hashing"}
+    return results
+
+
+GROUPS = {
+    "match": bench_match,
+    "training": bench_training,
+    "frames": bench_frames,
+    "dashboard": bench_dashboard,
+    "db": bench_db,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args) -> dict:
+    run = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "context": {},
+        "skipped": {},
+        "results": {},
+    }
+    for name in args.groups:
+        print(f"Running {name}...", flush=True)
+        with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as tmp:
+            try:
+                run["results"].update(GROUPS[name](args, Path(tmp), run["context"]))
+            except (ImportError, RuntimeError, OSError) as e:
+                # e.g. face_recognition/dlib missing, or a video that will not open
+                run["skipped"][name] = f"{type(e).__name__}: {e}"
+                print(f"  skipped: {run['skipped'][name]}")
+    return run
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def compare(baseline: dict, current: dict, threshold: float, noise_floor_ms: float) -> list:
+    """Print every shared metric and return the names of those more than ``threshold`` worse."""
+    regressions = []
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric in sorted(set(baseline["results"]) & set(current["results"])):
+        old, new = baseline["results"][metric], current["results"][metric]
+        if old <= 0:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better(metric) else change
+        # Sub-noise-floor timings swing by more than any sensible threshold
+        noisy = metric.endswith("_ms") and max(old, new) < noise_floor_ms
+        flag = ""
+        if worse > threshold and not noisy:
+            flag = "REGRESSION"
+            regressions.append(metric)
+        elif worse < -threshold and not noisy:
+            flag = "improved"
+        print(f"{metric:<40} {old:>12.3f} {new:>12.3f} {change:>+7.1%}  {flag}")
+    missing = set(baseline["results"]) - set(current["results"])
+    added = set(current["results"]) - set(baseline["results"])
+    if missing or added:
+        print(f"{len(missing)} baseline metric(s) not in the current run, {len(added)} new")
+    return regressions
+
+
+def print_results(run: dict):
+    print(f"{'metric':<40} {'value':>12}")
+    for metric, value in run["results"].items():
+        print(f"{metric:<40} {value:>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic galleries, users and attendance logs; "
+                                                 "writes JSON results and compares them with a previous run")
+    parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="gallery, user and log sizes")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--faces", type=int, default=5, help="faces per frame in the match benchmark")
+    parser.add_argument("--frames", type=int, default=100, help="frames replayed in the frame benchmark")
+    parser.add_argument("--video", type=Path, default=None, help="recorded video to replay instead of generated frames")
+    parser.add_argument("--faces-dir", type=Path, default=Path("data/faces"),
+                        help="enrollment photos used for training and generated frames, if present")
+    parser.add_argument("--train-images", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1, help="training worker processes")
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--registrations", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None, help="results file (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="previous results file to compare against")
+    parser.add_argument("--current", type=Path, default=None, help="compare this results file instead of running the suite")
+    parser.add_argument("--threshold", type=float, default=0.2, help="fractional slowdown reported as a regression")
+    parser.add_argument("--noise-floor", type=float, default=0.05, help="ms below which timings are never flagged")
+    args = parser.parse_args()
+    if args.current and not args.compare:
+        parser.error("--current needs --compare")
+
+    if args.current:
+        current = json.loads(args.current.read_text(encoding="utf-8"))
+    else:
+        current = run_suite(args)
+        out = args.out or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print_results(current)
+        print(f"Results written to {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"\nBaseline {baseline.get('commit')} ({baseline['created_at']}) vs current {current.get('commit')} "
+              f"({current['created_at']}), threshold {args.threshold:.0%}")
+        regressions = compare(baseline, current, args.threshold, args.noise_floor)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
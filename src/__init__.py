@@ -1,2 +0,0 @@
-from src.ui import users
-print(dir(users))  # does users_ui appear here?
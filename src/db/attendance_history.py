@@ -0,0 +1,294 @@
+import os
+import json
+import logging
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.db.attendance_schema import read_log
+
+logger = logging.getLogger(__name__)
+
+# Constants
+ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
+HISTORY_DIR = Path("data/attendance_history")
+MANIFEST_FILENAME = "manifest.json"
+HISTORY_VERSION = 1
+# Every partition holds these columns; np.load on an .npz only decompresses the members that are read
+HISTORY_COLUMNS = ("day", "seconds", "user", "source")
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _to_day_number(value) -> int:
+    return int((np.datetime64(value, "D") - EPOCH).astype(np.int64))
+
+
+def day_to_date(day_number: int) -> date:
+    return (EPOCH + np.timedelta64(int(day_number), "D")).astype(date)
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    # Sort-based; noticeably faster than np.unique's hash path on large int arrays
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _month_of(day_numbers: np.ndarray) -> np.ndarray:
+    return (EPOCH + day_numbers.astype("timedelta64[D]")).astype("datetime64[M]").astype(str)
+
+
+def read_log_columns(path: Path) -> pd.DataFrame:
+    """One attendance log as ``user_id``, ``day`` (days since 1970) and ``seconds`` (since midnight)."""
+    df = read_log(path)
+    stamps = df["Timestamp"].to_numpy(dtype="datetime64[s]")
+    days = stamps.astype("datetime64[D]")
+    return pd.DataFrame({
+        "user_id": df["User ID"].to_numpy(dtype=str),
+        "day": (days - EPOCH).astype(np.int32),
+        "seconds": (stamps - days).astype(np.int32),
+    })
+
+
+class AttendanceHistory:
+    """Compacted attendance history: one compressed columnar .npz per month.
+
+    User IDs are dictionary-encoded into ``user`` codes (the dictionary lives
+    in manifest.json and only grows, so codes are stable across partitions).
+    ``roll_up()`` folds new or changed daily CSVs in incrementally; queries
+    open only the months in range and decompress only the columns they use.
+    """
+
+    def __init__(self, root: Path = HISTORY_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._manifest = self._read_manifest()
+        self._codes = {user_id: code for code, user_id in enumerate(self._manifest["users"])}
+
+    # Storage
+
+    def _read_manifest(self) -> dict:
+        path = self.root / MANIFEST_FILENAME
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == HISTORY_VERSION:
+                return manifest
+            logger.warning(f"Ignoring history manifest version {manifest.get('version')} in {self.root}")
+        return {"version": HISTORY_VERSION, "users": [], "sources": {}, "next_source": 0}
+
+    def _write_manifest(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (MANIFEST_FILENAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.root / MANIFEST_FILENAME)
+
+    def _partition_path(self, month: str) -> Path:
+        return self.root / f"{month}.npz"
+
+    def months(self) -> List[str]:
+        return sorted(p.stem for p in self.root.glob("*.npz"))
+
+    def _read_partition(self, month: str, columns: Iterable[str]) -> Dict[str, np.ndarray]:
+        path = self._partition_path(month)
+        if not path.exists():
+            return {col: np.empty(0, dtype=np.int32) for col in columns}
+        with np.load(path) as data:
+            return {col: data[col] for col in columns}
+
+    def _write_partition(self, month: str, columns: Dict[str, np.ndarray]):
+        path = self._partition_path(month)
+        if len(columns["day"]) == 0:
+            if path.exists():
+                path.unlink()
+            return
+        order = np.lexsort((columns["seconds"], columns["day"]))
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **{col: columns[col][order] for col in HISTORY_COLUMNS})
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _encode_users(self, user_ids: pd.Series) -> np.ndarray:
+        uniques, inverse = np.unique(user_ids.to_numpy(dtype=str), return_inverse=True)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, user_id in enumerate(map(str, uniques)):
+            code = self._codes.get(user_id)
+            if code is None:
+                code = self._codes[user_id] = len(self._manifest["users"])
+                self._manifest["users"].append(user_id)
+            mapping[i] = code
+        return mapping[inverse]
+
+    # Ingest
+
+    def roll_up(self, log_dir: Path = ATTENDANCE_LOG_DIR) -> Dict[str, int]:
+        """Fold new or changed CSVs from ``log_dir`` into the monthly partitions.
+
+        A source whose size or mtime changed (today's log, typically) has its
+        previous rows replaced, so calling this repeatedly is idempotent.
+        """
+        with self._lock:
+            sources = self._manifest["sources"]
+            changed, frames = {}, []
+            seen = set()
+            for path in sorted(Path(log_dir).glob("*.csv")):
+                stat = path.stat()
+                seen.add(path.name)
+                known = sources.get(path.name)
+                if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+                code = known["code"] if known else self._manifest["next_source"]
+                if not known:
+                    self._manifest["next_source"] += 1
+                rows = read_log_columns(path)
+                rows["source"] = np.int32(code)
+                frames.append(rows)
+                changed[path.name] = {"code": code, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                      "rows": len(rows), "months": sorted(set(map(str, _month_of(rows["day"].to_numpy()))))}
+            removed = {name: sources[name] for name in sources if name not in seen}
+            if not changed and not removed:
+                return {"sources": 0, "rows": 0, "months": 0, "removed": 0}
+
+            replaced_codes = [info["code"] for name, info in sources.items() if name in changed or name in removed]
+            touched = set()
+            for name in list(changed) + list(removed):
+                touched.update(sources.get(name, {}).get("months", []))
+                touched.update(changed.get(name, {}).get("months", []))
+
+            new_rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["user_id", "day", "seconds", "source"])
+            new_columns = {
+                "day": new_rows["day"].to_numpy(dtype=np.int32),
+                "seconds": new_rows["seconds"].to_numpy(dtype=np.int32),
+                "user": self._encode_users(new_rows["user_id"]) if len(new_rows) else np.empty(0, dtype=np.int32),
+                "source": new_rows["source"].to_numpy(dtype=np.int32),
+            }
+            new_months = _month_of(new_columns["day"])
+            # The dictionary is saved first: a crash below leaves extra codes, never unknown ones
+            self._write_manifest()
+
+            for month in sorted(touched):
+                existing = self._read_partition(month, HISTORY_COLUMNS)
+                keep = ~np.isin(existing["source"], replaced_codes)
+                take = new_months == month
+                self._write_partition(month, {
+                    col: np.concatenate([existing[col][keep], new_columns[col][take]]).astype(np.int32)
+                    for col in HISTORY_COLUMNS
+                })
+
+            for name in removed:
+                del sources[name]
+            sources.update(changed)
+            self._write_manifest()
+            logger.info(f"Rolled {len(changed)} attendance logs ({len(new_rows)} rows) into {len(touched)} "
+                        f"monthly partitions, removed {len(removed)}")
+            return {"sources": len(changed), "rows": len(new_rows), "months": len(touched), "removed": len(removed)}
+
+    # Queries
+
+    def scan(self, start: Optional[date] = None, end: Optional[date] = None,
+             columns: Iterable[str] = ("day", "user")) -> Dict[str, np.ndarray]:
+        """Raw column arrays for ``start <= day <= end``, reading only the months in range."""
+        columns = list(columns)
+        needed = list(dict.fromkeys(columns + ["day"]))
+        lo = _to_day_number(start) if start else None
+        hi = _to_day_number(end) if end else None
+        first = str(start)[:7] if start else None
+        last = str(end)[:7] if end else None
+        parts = {col: [] for col in needed}
+        for month in self.months():
+            if (first and month < first) or (last and month > last):
+                continue
+            data = self._read_partition(month, needed)
+            mask = np.ones(len(data["day"]), dtype=bool)
+            if lo is not None:
+                mask &= data["day"] >= lo
+            if hi is not None:
+                mask &= data["day"] <= hi
+            for col in needed:
+                parts[col].append(data[col][mask])
+        return {col: np.concatenate(parts[col]) if parts[col] else np.empty(0, dtype=np.int32) for col in columns}
+
+    def user_id(self, code: int) -> str:
+        return self._manifest["users"][code]
+
+    def user_ids(self) -> List[str]:
+        return list(self._manifest["users"])
+
+    def presence(self, start=None, end=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Distinct (day, user code) pairs: a user seen several times a day counts once."""
+        data = self.scan(start, end, ("day", "user"))
+        width = max(1, len(self._manifest["users"]))
+        keys = _sorted_unique(data["day"].astype(np.int64) * width + data["user"])
+        return (keys // width).astype(np.int32), (keys % width).astype(np.int32)
+
+    def daily_counts(self, start=None, end=None) -> pd.Series:
+        days, _ = self.presence(start, end)
+        values, counts = np.unique(days, return_counts=True)
+        return pd.Series(counts, index=pd.Index([day_to_date(d) for d in values], name="Date"), name="Present")
+
+    def user_summary(self, start=None, end=None, user_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Per user: days present, first/last day seen and mean first check-in time."""
+        data = self.scan(start, end, ("day", "seconds", "user"))
+        if user_ids is not None:
+            wanted = [self._codes[u] for u in user_ids if u in self._codes]
+            mask = np.isin(data["user"], wanted)
+            data = {col: values[mask] for col, values in data.items()}
+        columns = ["User ID", "Days Present", "First Seen", "Last Seen", "Avg Check-in"]
+        if len(data["day"]) == 0:
+            return pd.DataFrame(columns=columns)
+        first_checkins = (pd.DataFrame(data).groupby(["user", "day"], sort=False)["seconds"].min()
+                          .reset_index().groupby("user"))
+        summary = first_checkins.agg(days=("day", "size"), first=("day", "min"), last=("day", "max"), avg=("seconds", "mean"))
+        return pd.DataFrame({
+            "User ID": [self.user_id(code) for code in summary.index],
+            "Days Present": summary["days"].to_numpy(),
+            "First Seen": [day_to_date(d) for d in summary["first"]],
+            "Last Seen": [day_to_date(d) for d in summary["last"]],
+            "Avg Check-in": [f"{int(s) // 3600:02d}:{int(s) % 3600 // 60:02d}" for s in summary["avg"]],
+        }, columns=columns).sort_values("User ID", ignore_index=True)
+
+    def department_rates(self, start=None, end=None, users: Optional[List[Dict[str, str]]] = None,
+                         department_of: Optional[Callable[[Dict[str, str]], str]] = None) -> pd.DataFrame:
+        """Attendance rate per department over the days on which anyone attended.
+
+        ``rate = distinct (user, day) check-ins / (headcount * session days)``;
+        check-ins by IDs missing from ``users`` are reported as "Unknown".
+        """
+        if users is None:
+            from src.db.db_handler import get_all_users
+
+            users = get_all_users()
+        department_of = department_of or (lambda user: (user.get("department") or "").strip() or "Unassigned")
+        headcount: Dict[str, int] = {}
+        by_user: Dict[str, str] = {}
+        for user in users:
+            department = department_of(user)
+            by_user[str(user["user_id"]).strip().lower()] = department
+            headcount[department] = headcount.get(department, 0) + 1
+
+        days, codes = self.presence(start, end)
+        session_days = len(_sorted_unique(days))
+        departments = sorted(set(headcount) | ({"Unknown"} if len(codes) else set()))
+        index = {name: i for i, name in enumerate(departments)}
+        code_department = np.array([index.get(by_user.get(user_id.lower(), "Unknown"), index.get("Unknown", 0))
+                                    for user_id in self._manifest["users"]], dtype=np.int32)
+        present = np.bincount(code_department[codes], minlength=len(departments)) if len(codes) else np.zeros(len(departments), dtype=np.int64)
+        result = pd.DataFrame({
+            "Department": departments,
+            "Headcount": [headcount.get(name, 0) for name in departments],
+            "Check-ins": present,
+        })
+        expected = result["Headcount"] * session_days
+        result["Rate"] = (result["Check-ins"] / expected.where(expected > 0)).round(4)
+        result.attrs["session_days"] = session_days
+        return result
@@ -0,0 +1,326 @@
+import io
+import os
+import re
+import csv
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Constants
+ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
+# Typed copies of the CSV logs, one .npz per log, next to the logs they mirror
+NORMALIZED_DIR_NAME = ".normalized"
+# 2: Name/Status/Method are kept as written instead of stripped
+NORMALIZED_VERSION = 2
+CHUNK_ROWS = 50_000
+
+# Canonical on-disk record, written by every attendance writer
+ATTENDANCE_COLUMNS = ["User ID", "Name", "Date", "Time", "Status", "Method"]
+DEFAULT_STATUS = "Present"
+DEFAULT_METHOD = "Face Recognition"
+# In-memory form: the Date/Time strings are parsed once into Timestamp
+NORMALIZED_COLUMNS = ["User ID", "Name", "Timestamp", "Status", "Method"]
+STRING_COLUMNS = ["User ID", "Name", "Status", "Method"]
+FILENAME_DAY = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+def attendance_record(user_id, name, when: datetime, method=DEFAULT_METHOD, status=DEFAULT_STATUS):
+    return {
+        "User ID": user_id,
+        "Name": name,
+        "Date": when.strftime("%Y-%m-%d"),
+        "Time": when.strftime("%H:%M:%S"),
+        "Status": status,
+        "Method": method
+    }
+
+
+def empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "User ID": pd.Series(dtype=object),
+        "Name": pd.Series(dtype=object),
+        "Timestamp": pd.Series(dtype="datetime64[s]"),
+        "Status": pd.Series(dtype=object),
+        "Method": pd.Series(dtype=object),
+    })
+
+
+def _column(chunk: pd.DataFrame, name: str, strip: bool = True) -> pd.Series:
+    if name not in chunk.columns:
+        return pd.Series("", index=chunk.index, dtype=object)
+    values = chunk[name].fillna("").astype(str)
+    # Only keys and timestamps are stripped; that is most of the parsing cost otherwise
+    return values.str.strip() if strip else values
+
+
+def _parse_timestamps(chunk: pd.DataFrame, fallback_day: Optional[str]) -> pd.Series:
+    time = _column(chunk, "Time")
+    date = _column(chunk, "Date")
+    full = time.str.len() > 8
+    # "YYYY-MM-DD HH:MM:SS" in Time carries its own date; otherwise Date, then the file name
+    date = date.mask(full & (date == ""), time.str[:10])
+    if fallback_day:
+        date = date.mask(date == "", fallback_day)
+    clock = time.where(~full, time.str[-8:])
+
+    stamp = pd.to_datetime(date + " " + clock, format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    bad = stamp.isna() & (time != "")
+    if bad.any():
+        # Odd formats (no seconds, fractions, ...) only
+        stamp[bad] = pd.to_datetime(date[bad] + " " + clock[bad], format="mixed", errors="coerce")
+    return stamp
+
+
+def normalize_chunk(chunk: pd.DataFrame, fallback_day: Optional[str] = None) -> pd.DataFrame:
+    """Map one chunk of any known log layout onto NORMALIZED_COLUMNS.
+
+    Understands the canonical columns as well as the older ``User ID, Time``
+    logs where Time holds a full timestamp, row by row, since both can end
+    up in the same file. Rows whose time cannot be read are dropped and
+    logged, never guessed.
+    """
+    if "User ID" not in chunk.columns or "Time" not in chunk.columns:
+        return empty_frame()
+
+    # Canonical rows parse in one pass; only the rest go through the layout detection
+    if "Date" in chunk.columns:
+        stamp = pd.to_datetime(chunk["Date"] + " " + chunk["Time"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    else:
+        stamp = pd.Series(pd.NaT, index=chunk.index, dtype="datetime64[s]")
+    slow = stamp.isna()
+    if slow.any():
+        stamp = stamp.astype("datetime64[s]")
+        stamp[slow] = _parse_timestamps(chunk[slow], fallback_day)
+
+    out = pd.DataFrame({
+        "User ID": _column(chunk, "User ID"),
+        "Name": _column(chunk, "Name", strip=False),
+        "Timestamp": stamp.astype("datetime64[s]"),
+        "Status": _column(chunk, "Status", strip=False).replace("", DEFAULT_STATUS),
+        "Method": _column(chunk, "Method", strip=False).replace("", DEFAULT_METHOD),
+    })
+    keep = out["Timestamp"].notna() & (out["User ID"] != "")
+    if not keep.all():
+        logger.warning(f"Dropping {int((~keep).sum())} attendance rows without a readable user or time")
+    return out[keep].reset_index(drop=True)
+
+
+def fallback_day_for(path: Path) -> Optional[str]:
+    name_day = FILENAME_DAY.search(Path(path).name)
+    return name_day.group(1) if name_day else None
+
+
+def iter_log_chunks(path: Path, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Stream a CSV log as normalized chunks without loading it whole."""
+    fallback_day = fallback_day_for(path)
+    try:
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+        for chunk in reader:
+            yield normalize_chunk(chunk, fallback_day)
+    except pd.errors.EmptyDataError:
+        return
+
+
+def to_canonical(normalized: pd.DataFrame) -> pd.DataFrame:
+    """Normalized rows back to the ATTENDANCE_COLUMNS strings."""
+    # datetime_as_string is several times faster than .dt.strftime on large chunks
+    iso = np.datetime_as_string(normalized["Timestamp"].to_numpy(dtype="datetime64[s]"))
+    chars = iso.view("U1").reshape(len(iso), -1) if len(iso) else np.empty((0, 19), dtype="U1")
+    return pd.DataFrame({
+        "User ID": normalized["User ID"].to_numpy(),
+        "Name": normalized["Name"].to_numpy(),
+        "Date": np.ascontiguousarray(chars[:, :10]).view("U10").ravel(),
+        "Time": np.ascontiguousarray(chars[:, 11:19]).view("U8").ravel(),
+        "Status": normalized["Status"].to_numpy(),
+        "Method": normalized["Method"].to_numpy(),
+    }, columns=ATTENDANCE_COLUMNS)
+
+
+def to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Compact columnar form: dictionary-encoded strings and int64 epoch seconds."""
+    columns = {"timestamp": df["Timestamp"].to_numpy(dtype="datetime64[s]").astype(np.int64)}
+    for name in STRING_COLUMNS:
+        codes, uniques = pd.factorize(df[name], sort=False)
+        key = name.lower().replace(" ", "_")
+        columns[f"{key}_codes"] = codes.astype(np.int32)
+        columns[f"{key}_values"] = np.asarray(uniques, dtype=str)
+    return columns
+
+
+def from_columns(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    data = {"Timestamp": columns["timestamp"].astype("datetime64[s]")}
+    for name in STRING_COLUMNS:
+        key = name.lower().replace(" ", "_")
+        values = columns[f"{key}_values"].astype(object)
+        data[name] = values[columns[f"{key}_codes"]] if len(values) else np.empty(0, dtype=object)
+    return pd.DataFrame(data, columns=NORMALIZED_COLUMNS)
+
+
+def normalized_path(path: Path) -> Path:
+    path = Path(path)
+    return path.parent / NORMALIZED_DIR_NAME / f"{path.stem}.npz"
+
+
+def _source_key(path: Path) -> np.ndarray:
+    stat = os.stat(path)
+    return np.array([NORMALIZED_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def _read_normalized(path: Path, key: np.ndarray) -> Optional[pd.DataFrame]:
+    target = normalized_path(path)
+    if not target.exists():
+        return None
+    try:
+        with np.load(target) as data:
+            if not np.array_equal(data["source_key"], key):
+                return None
+            return from_columns({name: data[name] for name in data.files})
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable {target}: {e}")
+        return None
+
+
+def _write_normalized(path: Path, df: pd.DataFrame, key: np.ndarray):
+    target = normalized_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, source_key=key, **to_columns(df))
+    os.replace(tmp, target)
+
+
+def read_log(path: Path, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Typed attendance frame for one log; the single read path for dashboards and exports.
+
+    Served from the .npz copy while the CSV's size and mtime match it;
+    otherwise the CSV is streamed through the normalizer and the copy
+    refreshed.
+    """
+    path = Path(path)
+    if not path.exists():
+        return empty_frame()
+    key = _source_key(path)
+    df = _read_normalized(path, key)
+    if df is not None:
+        return df
+    chunks = [chunk for chunk in iter_log_chunks(path, chunk_rows) if len(chunk)]
+    df = pd.concat(chunks, ignore_index=True) if chunks else empty_frame()
+    try:
+        _write_normalized(path, df, key)
+    except OSError as e:
+        logger.warning(f"Could not cache normalized {path.name}: {e}")
+    return df
+
+
+def parse_log_bytes(data: bytes, header: Optional[List[str]], fallback_day: Optional[str]) -> pd.DataFrame:
+    """Normalize raw CSV bytes; ``header`` is given when ``data`` is a tail without one."""
+    if not data.strip():
+        return empty_frame()
+    chunk = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, header=None if header else "infer", names=header)
+    return normalize_chunk(chunk, fallback_day)
+
+
+def read_log_snapshot(path: Path) -> Tuple[pd.DataFrame, List[str], int]:
+    """Typed frame, header and the byte offset it covers, for readers that follow appends.
+
+    Stops at the last complete line, so a row being appended right now is
+    picked up by the next tail read instead of being half-parsed.
+    """
+    path = Path(path)
+    key = _source_key(path)
+    with open(path, "rb") as f:
+        data = f.read(int(key[1]))
+    header = next(csv.reader([data.split(b"\n", 1)[0].rstrip(b"\r").decode("utf-8-sig")]), []) if data else []
+    df = _read_normalized(path, key)
+    if df is not None and data.endswith(b"\n"):
+        return df, header, len(data)
+    end = data.rfind(b"\n") + 1
+    df = parse_log_bytes(data[:end], None, fallback_day_for(path))
+    if end == len(data):
+        try:
+            _write_normalized(path, df, key)
+        except OSError as e:
+            logger.warning(f"Could not cache normalized {path.name}: {e}")
+    return df, header, end
+
+
+def read_header(path: Path) -> List[str]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return [name.strip() for name in next(csv.reader(f), [])]
+
+
+def rewrite_canonical(path: Path, chunk_rows: int = CHUNK_ROWS) -> Tuple[int, int]:
+    """Rewrite a log in place with ATTENDANCE_COLUMNS, chunk by chunk, under the writers' lock.
+
+    Returns the rows written and the rows the normalizer could not read.
+    If there are any of the latter the log is left exactly as it was, since
+    the canonical form has no place for them.
+    """
+    from src.db.attendance_writer import directory_lock
+
+    path = Path(path)
+    fallback_day = fallback_day_for(path)
+    rows = unreadable = 0
+    with directory_lock(path.parent):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(",".join(ATTENDANCE_COLUMNS) + "\n")
+            try:
+                for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+                    normalized = normalize_chunk(chunk, fallback_day)
+                    unreadable += len(chunk) - len(normalized)
+                    canonical = to_canonical(normalized)
+                    canonical.to_csv(f, header=False, index=False, lineterminator="\n")
+                    rows += len(canonical)
+            except pd.errors.EmptyDataError:
+                pass
+            f.flush()
+            os.fsync(f.fileno())
+        if unreadable:
+            os.remove(tmp)
+            return 0, unreadable
+        os.replace(tmp, path)
+    return rows, unreadable
+
+
+def normalize_logs(log_dir: Path = ATTENDANCE_LOG_DIR, rewrite: bool = False, chunk_rows: int = CHUNK_ROWS) -> Dict[str, int]:
+    """Normalize every log in ``log_dir``; with ``rewrite`` also convert the CSVs to the canonical columns.
+
+    A log with rows the normalizer cannot read is never rewritten; it is
+    counted under "not_rewritten" and its unreadable rows under "unreadable_rows".
+    """
+    stats = {"logs": 0, "rows": 0, "rewritten": 0, "not_rewritten": 0, "unreadable_rows": 0}
+    for path in sorted(Path(log_dir).glob("*.csv")):
+        if rewrite and read_header(path) != ATTENDANCE_COLUMNS:
+            _, unreadable = rewrite_canonical(path, chunk_rows)
+            if unreadable:
+                stats["not_rewritten"] += 1
+                stats["unreadable_rows"] += unreadable
+                logger.warning(f"Left {path.name} as it is: {unreadable} rows have no readable user or time")
+            else:
+                stats["rewritten"] += 1
+                logger.info(f"Rewrote {path.name} with the canonical columns")
+        stats["rows"] += len(read_log(path, chunk_rows))
+        stats["logs"] += 1
+    logger.info(f"Normalized {stats['logs']} logs ({stats['rows']} rows), rewrote {stats['rewritten']}")
+    if stats["not_rewritten"]:
+        logger.warning(f"Did not rewrite {stats['not_rewritten']} logs with {stats['unreadable_rows']} unreadable rows; "
+                       "fix or remove those rows and run again")
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Normalize attendance logs to the canonical schema")
+    parser.add_argument("--log-dir", type=Path, default=ATTENDANCE_LOG_DIR)
+    parser.add_argument("--rewrite", action="store_true", help="also rewrite non-canonical CSVs in place")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    normalize_logs(args.log_dir, rewrite=args.rewrite, chunk_rows=args.chunk_rows)
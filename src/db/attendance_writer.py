@@ -0,0 +1,223 @@
+import os
+import io
+import csv
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.db.attendance_schema import ATTENDANCE_COLUMNS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Constants
+ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
+LOCK_FILENAME = ".attendance.lock"
+DEFAULT_COLUMNS = ATTENDANCE_COLUMNS
+FLUSH_ROWS = 50
+FLUSH_SECONDS = 2.0
+
+
+@contextmanager
+def directory_lock(directory: Path):
+    """Exclusive inter-process lock shared by every writer of ``directory``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILENAME, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _existing_header(path: Path) -> Optional[List[str]]:
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader([f.readline()]), None)
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b"\n", b"\r")
+
+
+def _rewrite_with_header(path: Path, header: List[str]):
+    # Old rows keep their values; columns they never had stay empty for the readers to fill in
+    tmp = path.with_name(path.name + ".tmp")
+    with open(path, "r", encoding="utf-8", newline="") as src, open(tmp, "w", encoding="utf-8", newline="") as dst:
+        writer = csv.DictWriter(dst, fieldnames=header, restval="", lineterminator="\n")
+        writer.writeheader()
+        for row in csv.DictReader(src):
+            if None in row:
+                logger.warning(f"Row with more values than the header in {path}: {row.pop(None)}")
+            writer.writerow(row)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, path)
+
+
+def append_rows(path: Path, rows: Iterable[Dict[str, str]], columns: List[str] = DEFAULT_COLUMNS) -> int:
+    """Append rows to a CSV in one write, under the directory lock, and fsync.
+
+    Rows follow the header already in the file, so two writers with
+    different column sets never shift each other's values. A file whose
+    header lacks some of ``columns`` (e.g. an old ``User ID,Time`` log) is
+    first rewritten with ``columns`` plus its own extra columns, so no
+    field of the new rows is dropped.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    path = Path(path)
+    with directory_lock(path.parent):
+        header = _existing_header(path)
+        if header is not None and any(column not in header for column in columns):
+            header = list(columns) + [column for column in header if column not in columns]
+            _rewrite_with_header(path, header)
+            logger.info(f"Rewrote {path} with the header {header}")
+        buffer = io.StringIO()
+        if header is None:
+            header = list(columns)
+            csv.writer(buffer, lineterminator="\n").writerow(header)
+        elif not _ends_with_newline(path):
+            buffer.write("\n")
+        writer = csv.DictWriter(buffer, fieldnames=header, extrasaction="ignore", lineterminator="\n")
+        writer.writerows(rows)
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+    return len(rows)
+
+
+def daily_log_path(day: str, directory: Path = ATTENDANCE_LOG_DIR) -> Path:
+    return Path(directory) / f"attendance_{day}.csv"
+
+
+class AttendanceWriter:
+    """Buffered, append-only writer for the daily attendance CSVs.
+
+    ``append()`` queues a row and flushes once ``flush_rows`` rows are
+    pending or ``flush_seconds`` have passed (a daemon thread covers quiet
+    periods). ``write()`` appends and flushes immediately; a record is
+    durable once either call that flushed it has returned.
+
+    The writer owns retries: rows a flush could not write stay queued and
+    go out with the next flush, so callers treat a record as taken once it
+    is queued. A record for a user and day that is already queued is
+    dropped.
+    """
+
+    def __init__(self, directory: Path = ATTENDANCE_LOG_DIR, columns: List[str] = DEFAULT_COLUMNS,
+                 flush_rows: int = FLUSH_ROWS, flush_seconds: float = FLUSH_SECONDS, day_column: Optional[str] = "Date"):
+        self.directory = Path(directory)
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.day_column = day_column
+        self._pending: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self.rows_written = 0
+
+    def _day_for(self, record: Dict[str, str]) -> str:
+        day = str(record.get(self.day_column, ""))[:10] if self.day_column else ""
+        return day or datetime.now().strftime("%Y-%m-%d")
+
+    def _path_for(self, record: Dict[str, str]) -> Path:
+        return daily_log_path(self._day_for(record), self.directory)
+
+    def _queue(self, records: Iterable[Dict[str, str]]) -> int:
+        # Called under _lock
+        queued = {(record.get("User ID"), self._day_for(record)) for record in self._pending}
+        added = 0
+        for record in records:
+            key = (record.get("User ID"), self._day_for(record))
+            if key[0] is not None and key in queued:
+                logger.debug(f"{key[0]} is already queued for {key[1]}")
+                continue
+            queued.add(key)
+            self._pending.append(record)
+            added += 1
+        return added
+
+    def _ensure_timer(self):
+        if self.flush_seconds and (self._timer is None or not self._timer.is_alive()):
+            self._timer = threading.Thread(target=self._flush_periodically, name="attendance-writer", daemon=True)
+            self._timer.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_seconds):
+            if self._pending and time.monotonic() - self._last_flush >= self.flush_seconds:
+                self.flush()
+
+    def append(self, record: Dict[str, str]):
+        with self._lock:
+            self._queue([record])
+            due = len(self._pending) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+        else:
+            self._ensure_timer()
+
+    def write(self, records: Iterable[Dict[str, str]]) -> int:
+        with self._lock:
+            self._queue(records)
+        return self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return 0
+            by_file: Dict[Path, List[Dict[str, str]]] = {}
+            for record in pending:
+                by_file.setdefault(self._path_for(record), []).append(record)
+            remaining = list(by_file.items())
+            written = 0
+            try:
+                while remaining:
+                    path, rows = remaining[0]
+                    written += append_rows(path, rows, self.columns)
+                    remaining.pop(0)
+            except Exception as e:
+                # Files already appended stay written; only the rest goes back to the queue
+                requeued = [record for _, rows in remaining for record in rows]
+                logger.error(f"Attendance write failed, keeping {len(requeued)} rows queued: {e}")
+                self._pending = requeued + self._pending
+                # The periodic flush retries them even if nothing else is queued
+                self._ensure_timer()
+                raise
+            self.rows_written += written
+            return written
+
+    def close(self):
+        self._closed.set()
+        self.flush()
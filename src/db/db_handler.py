@@ -1,21 +1,16 @@
 import os
-import bcrypt
 import pandas as pd
 import logging
 from pathlib import Path
 from datetime import datetime
 import re
+import threading
 from typing import Tuple, List, Dict, Any, Optional
+from src.db.sqlite_store import SQLiteUserStore, SQLITE_DB_FILE
+from src.db.user_journal import UserJournal
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("data/logs/db_operations.log", mode='a')
-    ]
-)
+# Configure logging; the db_operations.log file handler is attached by ensure_directories()
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -23,13 +18,50 @@ DB_FILE = "data/users.csv"
 BACKUP_DIR = "data/backups"
 EXPORT_DIR = "data/exports"
 LOG_DIR = "data/logs"
+# Benchmarks and tools working on throwaway tables turn this off to keep data/logs/db_operations.log clean
+LOG_TO_FILE = True
 REQUIRED_COLUMNS = ["user_id", "name", "password", "phone", "email", "department", "created_at", "last_login"]
 EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+# "csv" keeps data/users.csv as the user table; "sqlite" uses data/users.db (imports users.csv on first run)
+USER_STORE_BACKEND = os.environ.get("USER_STORE_BACKEND", "csv").lower()
+
+_sqlite_store = None
+_sqlite_store_lock = threading.Lock()
+
+# Parsed users.csv shared by every session/thread in the process; see _cached_users()
+_users_cache: Dict[str, Any] = {"key": None, "df": None, "index": {}, "records": [], "emails": set(), "appended": []}
+_users_cache_lock = threading.Lock()
+_users_cache_generation = 0
+_users_cache_stats = {"hits": 0, "misses": 0}
+
+# Serialises the duplicate check and the write of a registration within the process
+_users_write_lock = threading.Lock()
+_journals: Dict[Tuple[str, str], UserJournal] = {}
+
+_log_file_handler: Optional[logging.Handler] = None
+_log_file_lock = threading.Lock()
+
+def _attach_log_file():
+    # Opened on first use instead of at import, so importing this module never needs data/logs to exist;
+    # follows LOG_DIR when benchmarks and tools repoint it
+    global _log_file_handler
+    path = os.path.abspath(os.path.join(LOG_DIR, "db_operations.log"))
+    with _log_file_lock:
+        if not LOG_TO_FILE or (_log_file_handler is not None and _log_file_handler.baseFilename == path):
+            return
+        if _log_file_handler is not None:
+            logger.removeHandler(_log_file_handler)
+            _log_file_handler.close()
+        _log_file_handler = logging.FileHandler(path, mode='a')
+        _log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(_log_file_handler)
 
 def ensure_directories():
+    # Runs on every user-cache miss, so it stays quiet at INFO
     for directory in [os.path.dirname(DB_FILE), BACKUP_DIR, EXPORT_DIR, LOG_DIR]:
         os.makedirs(directory, exist_ok=True)
-        logger.info(f"Ensured directory exists: {directory}")
+        logger.debug(f"Ensured directory exists: {directory}")
+    _attach_log_file()
 
 def ensure_db_path():
     ensure_directories()
@@ -37,6 +69,24 @@ def ensure_db_path():
         pd.DataFrame(columns=REQUIRED_COLUMNS).to_csv(DB_FILE, index=False)
         logger.info(f"Created new empty DB file: {DB_FILE}")
 
+def _journal() -> UserJournal:
+    # Keyed by the paths, which benchmarks and tools repoint at runtime
+    key = (DB_FILE, BACKUP_DIR)
+    if key not in _journals:
+        _journals[key] = UserJournal(Path(DB_FILE), Path(BACKUP_DIR))
+    return _journals[key]
+
+def get_sqlite_store() -> SQLiteUserStore:
+    global _sqlite_store
+    with _sqlite_store_lock:
+        if _sqlite_store is None:
+            ensure_directories()
+            if os.path.exists(DB_FILE) and _journal().pending():
+                # The one-time import reads users.csv only, so fold the journal into it first
+                _compact_users()
+            _sqlite_store = SQLiteUserStore(SQLITE_DB_FILE, csv_path=DB_FILE)
+        return _sqlite_store
+
 def _load_users_df() -> pd.DataFrame:
     ensure_db_path()
     if not os.path.exists(DB_FILE) or os.path.getsize(DB_FILE) == 0:
@@ -45,21 +95,120 @@ def _load_users_df() -> pd.DataFrame:
     for col in REQUIRED_COLUMNS:
         if col not in df.columns:
             df[col] = ""
-    return df[REQUIRED_COLUMNS]
+    # users.csv is the last snapshot; registrations since then are in the journal
+    return _journal().replay(df[REQUIRED_COLUMNS])
+
+def _users_file_key():
+    try:
+        stat = os.stat(DB_FILE)
+    except FileNotFoundError:
+        return None
+    return (DB_FILE, stat.st_mtime_ns, stat.st_size, _journal().key(), _users_cache_generation)
+
+def _refresh_users_cache():
+    # Caller holds _users_cache_lock
+    key = _users_file_key()
+    if key is not None and key == _users_cache["key"]:
+        _users_cache_stats["hits"] += 1
+        return
+
+    _users_cache_stats["misses"] += 1
+    df = _load_users_df()
+    records = df.drop(columns=["password"]).to_dict(orient="records")
+    index = {}
+    for record in records:
+        index.setdefault(record["user_id"].strip().lower(), record)
+    emails = set(df["email"].str.lower()) - {""}
+    # The key read before loading: a write that lands during the parse makes the next call reload
+    _users_cache.update(key=key, df=df, index=index, records=records, emails=emails, appended=[])
+
+def _cached_index() -> Tuple[Dict[str, Dict[str, str]], List[Dict[str, str]]]:
+    """The dict index by lowercased user_id and the password-free records; see _cached_users()."""
+    with _users_cache_lock:
+        _refresh_users_cache()
+        return _users_cache["index"], _users_cache["records"]
+
+def _cached_users() -> Tuple[pd.DataFrame, Dict[str, Dict[str, str]], List[Dict[str, str]]]:
+    """Parsed user table, a dict index by lowercased user_id and the password-free records.
+
+    Reused while the file's mtime/size and the in-process write generation
+    are unchanged. Callers must treat both as read-only. Users registered
+    since the last call are folded into the table here, in one concat.
+    """
+    with _users_cache_lock:
+        _refresh_users_cache()
+        if _users_cache["appended"]:
+            appended = pd.DataFrame(_users_cache["appended"], columns=REQUIRED_COLUMNS)
+            _users_cache.update(df=pd.concat([_users_cache["df"], appended], ignore_index=True), appended=[])
+        return _users_cache["df"], _users_cache["index"], _users_cache["records"]
+
+def invalidate_user_cache():
+    global _users_cache_generation
+    with _users_cache_lock:
+        _users_cache_generation += 1
+
+def get_users_version() -> Tuple:
+    """Changes whenever the user table may have changed; cheap enough to call on every rerun."""
+    if USER_STORE_BACKEND == "sqlite":
+        paths = [SQLITE_DB_FILE, SQLITE_DB_FILE + "-wal"]
+        return tuple((s.st_mtime_ns, s.st_size) for s in (os.stat(p) for p in paths if os.path.exists(p)))
+    return _users_file_key()
+
+def get_cache_stats() -> Dict[str, int]:
+    with _users_cache_lock:
+        return dict(_users_cache_stats, generation=_users_cache_generation)
 
 def _save_users_df(df: pd.DataFrame) -> bool:
+    """Atomically replace the whole table with ``df`` and empty the journal; see UserJournal.snapshot."""
     try:
-        if os.path.exists(DB_FILE):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = os.path.join(BACKUP_DIR, f"users_backup_{timestamp}.csv")
-            df.to_csv(backup_path, index=False)
-            logger.info(f"Created backup: {backup_path}")
-        df.to_csv(DB_FILE, index=False)
+        _journal().snapshot(df)
         logger.info("Saved DB successfully")
         return True
     except Exception as e:
         logger.error(f"Error saving DB: {e}")
         return False
+    finally:
+        invalidate_user_cache()
+
+def _compact_users() -> bool:
+    """Fold the journal into users.csv; reads both under the lock other processes write with."""
+    try:
+        ensure_db_path()
+        _journal().compact()
+        logger.info("Saved DB successfully")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving DB: {e}")
+        return False
+    finally:
+        invalidate_user_cache()
+
+def _append_user(user: Dict[str, str]) -> bool:
+    """Journal one new user and fold it into the cached table without re-reading users.csv."""
+    key_before = _users_file_key()
+    try:
+        journal = _journal()
+        pending = journal.append("upsert", user)
+    except Exception as e:
+        logger.error(f"Error saving DB: {e}")
+        invalidate_user_cache()
+        return False
+
+    with _users_cache_lock:
+        if _users_cache["key"] is not None and _users_cache["key"] == key_before:
+            # Index, records and emails only ever grow here, so they are extended in place;
+            # the DataFrame is rebuilt from "appended" only when _cached_users() is next asked for it
+            record = {k: v for k, v in user.items() if k != "password"}
+            _users_cache["index"].setdefault(user["user_id"].strip().lower(), record)
+            _users_cache["records"].append(record)
+            if user["email"]:
+                _users_cache["emails"].add(user["email"].lower())
+            _users_cache["appended"].append(user)
+            _users_cache["key"] = _users_file_key()
+
+    if pending >= journal.snapshot_every:
+        return _compact_users()
+    return True
 
 def validate_user_data(user_data: Dict[str, str]) -> Tuple[bool, str]:
     if not user_data.get("user_id") or not user_data.get("name") or not user_data.get("password"):
@@ -72,17 +221,30 @@ def validate_user_data(user_data: Dict[str, str]) -> Tuple[bool, str]:
         return False, "Invalid email."
     return True, "Valid"
 
+def _csv_taken(user_id: str, email: str) -> Tuple[bool, bool]:
+    index, _ = _cached_index()
+    with _users_cache_lock:
+        emails = _users_cache["emails"]
+    return user_id in index, bool(email) and email.lower() in emails
+
 def register_user(user_id: str, name: str, password: str, phone: str = "", email: str = "", department: str = "") -> Tuple[bool, str]:
-    df = _load_users_df()
     user_id = user_id.strip().lower()
-    if user_id in df['user_id'].str.lower().values:
+    if USER_STORE_BACKEND == "sqlite":
+        store = get_sqlite_store()
+        id_taken = store.get_user(user_id) is not None
+        email_taken = bool(email) and store.email_exists(email)
+    else:
+        id_taken, email_taken = _csv_taken(user_id, email)
+    if id_taken:
         return False, "User ID already exists."
-    if email and email.lower() in df['email'].str.lower().values:
+    if email_taken:
         return False, "Email already registered."
     valid, msg = validate_user_data({"user_id": user_id, "name": name, "password": password, "email": email})
     if not valid:
         return False, msg
     try:
+        import bcrypt
+
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         new_user = {
@@ -95,23 +257,33 @@ def register_user(user_id: str, name: str, password: str, phone: str = "", email
             "created_at": now,
             "last_login": ""
         }
-        df = pd.concat([df, pd.DataFrame([new_user])], ignore_index=True)
-        return (_save_users_df(df), "User registered successfully.")
+        if USER_STORE_BACKEND == "sqlite":
+            if store.insert_user(new_user):
+                logger.info(f"Registered user {user_id} in {SQLITE_DB_FILE}")
+                return True, "User registered successfully."
+            return False, "User ID or email already registered."
+        with _users_write_lock:
+            # Checked again: another session may have registered the same ID while bcrypt ran
+            if any(_csv_taken(user_id, email)):
+                return False, "User ID or email already registered."
+            return (_append_user(new_user), "User registered successfully.")
     except Exception as e:
         logger.error(f"Registration error: {e}")
         return False, f"Error: {e}"
 
 def get_all_users() -> List[Dict[str, str]]:
-    df = _load_users_df()
-    if "password" in df.columns:
-        df = df.drop(columns=["password"])
-    return df.to_dict(orient="records")
+    if USER_STORE_BACKEND == "sqlite":
+        users = get_sqlite_store().all_users()
+        for user in users:
+            user.pop("password", None)
+        return users
+    return [dict(record) for record in _cached_index()[1]]
 
 def get_user_by_id(user_id: str) -> Optional[Dict[str, str]]:
-    df = _load_users_df()
-    row = df[df['user_id'].str.lower() == user_id.strip().lower()]
-    if not row.empty:
-        record = row.iloc[0].to_dict()
-        record.pop("password", None)
+    if USER_STORE_BACKEND == "sqlite":
+        record = get_sqlite_store().get_user(user_id)
+        if record:
+            record.pop("password", None)
         return record
-    return None
+    record = _cached_index()[0].get(user_id.strip().lower())
+    return dict(record) if record else None
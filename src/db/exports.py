@@ -0,0 +1,239 @@
+import os
+import time
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+
+from src.db.attendance_schema import ATTENDANCE_COLUMNS, ATTENDANCE_LOG_DIR, CHUNK_ROWS, fallback_day_for, iter_log_chunks, to_canonical
+
+logger = logging.getLogger(__name__)
+
+# Constants
+EXPORT_DIR = Path("data/exports")
+EXPORT_FORMATS = {"CSV": ".csv", "Excel": ".xlsx", "PDF": ".pdf", "Word": ".docx"}
+XLSX_SHEET_ROWS = 1_048_575  # Excel's row limit minus the header
+PDF_FONT_SIZE = 8
+PDF_COLUMN_WIDTHS = [90, 170, 70, 60, 70, 150]
+# python-docx keeps the whole document in memory, so the Word report lists at most this many rows
+DOCX_DETAIL_ROWS = 5_000
+
+Progress = Callable[[int, float], None]
+
+
+def _no_progress(rows: int, fraction: float):
+    pass
+
+
+def _in_range(path: Path, start: Optional[date], end: Optional[date]) -> bool:
+    day = fallback_day_for(path)
+    if day is None:
+        # Logs without a date in the name (attendance.csv) are filtered row by row
+        return True
+    return (start is None or day >= start.isoformat()) and (end is None or day <= end.isoformat())
+
+
+def iter_export_chunks(start: Optional[date] = None, end: Optional[date] = None, log_dir: Path = ATTENDANCE_LOG_DIR,
+                       chunk_rows: int = CHUNK_ROWS, progress: Progress = _no_progress) -> Iterator[pd.DataFrame]:
+    """Canonical string rows for ``start <= day <= end``, one chunk at a time, oldest log first."""
+    paths = [path for path in sorted(Path(log_dir).glob("*.csv")) if _in_range(path, start, end)]
+    sizes = [max(1, path.stat().st_size) for path in paths]
+    total, done, rows = sum(sizes), 0, 0
+    for path, size in zip(paths, sizes):
+        for chunk in iter_log_chunks(path, chunk_rows):
+            days = chunk["Timestamp"].dt.date
+            keep = pd.Series(True, index=chunk.index)
+            if start is not None:
+                keep &= days >= start
+            if end is not None:
+                keep &= days <= end
+            chunk = chunk[keep]
+            if chunk.empty:
+                continue
+            rows += len(chunk)
+            yield to_canonical(chunk)
+            progress(rows, done / total)
+        done += size
+        progress(rows, done / total if total else 1.0)
+
+
+def iter_csv(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """CSV as a byte stream: the header, then one encoded block per chunk."""
+    yield (",".join(ATTENDANCE_COLUMNS) + "\n").encode("utf-8")
+    for chunk in chunks:
+        yield chunk.to_csv(header=False, index=False, lineterminator="\n").encode("utf-8")
+
+
+def write_csv(chunks: Iterable[pd.DataFrame], path: Path):
+    with open(path, "wb") as f:
+        for block in iter_csv(chunks):
+            f.write(block)
+
+
+def _counting(chunks: Iterable[pd.DataFrame], on_chunk: Callable[[int], None]) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        on_chunk(len(chunk))
+        yield chunk
+
+
+def write_xlsx(chunks: Iterable[pd.DataFrame], path: Path):
+    from openpyxl import Workbook
+
+    # write_only streams rows to a temp file instead of keeping cell objects around
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, sheets = None, XLSX_SHEET_ROWS, 0
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            if sheet_rows >= XLSX_SHEET_ROWS:
+                sheets += 1
+                sheet = workbook.create_sheet("Attendance" if sheets == 1 else f"Attendance {sheets}")
+                sheet.append(ATTENDANCE_COLUMNS)
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet("Attendance").append(ATTENDANCE_COLUMNS)
+    workbook.save(path)
+
+
+class _Summary:
+    """Per-day record and user counts, gathered while the rows stream past."""
+
+    def __init__(self):
+        self.records: Dict[str, int] = {}
+        self.users: Dict[str, Set[str]] = {}
+
+    def add(self, chunk: pd.DataFrame):
+        for day, group in chunk.groupby("Date", sort=False):
+            self.records[day] = self.records.get(day, 0) + len(group)
+            self.users.setdefault(day, set()).update(group["User ID"])
+
+    def rows(self) -> List[List[str]]:
+        return [[day, str(self.records[day]), str(len(self.users[day]))] for day in sorted(self.records)]
+
+
+def write_pdf(chunks: Iterable[pd.DataFrame], path: Path, title: str):
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    width, height = landscape(A4)
+    margin, line = 36, PDF_FONT_SIZE + 3
+    # reportlab keeps every finished page (as a compressed content stream) until save(),
+    # so unlike CSV and Excel the PDF's memory use grows with the number of rows
+    pdf = canvas.Canvas(str(path), pagesize=(width, height), pageCompression=1)
+    summary = _Summary()
+    state = {"y": 0.0, "page": 0}
+
+    def draw_row(values, bold=False, widths=PDF_COLUMN_WIDTHS):
+        if state["y"] < margin:
+            if state["page"]:
+                pdf.showPage()
+            state["page"] += 1
+            pdf.setFont("Helvetica-Bold", 12)
+            pdf.drawString(margin, height - margin, title)
+            pdf.setFont("Helvetica", PDF_FONT_SIZE)
+            pdf.drawRightString(width - margin, height - margin, f"Page {state['page']}")
+            state["y"] = height - margin - 2 * line
+        pdf.setFont("Helvetica-Bold" if bold else "Helvetica", PDF_FONT_SIZE)
+        x = margin
+        for value, column_width in zip(values, widths):
+            pdf.drawString(x, state["y"], str(value)[:int(column_width / (PDF_FONT_SIZE * 0.5))])
+            x += column_width
+        state["y"] -= line
+
+    draw_row(ATTENDANCE_COLUMNS, bold=True)
+    for chunk in chunks:
+        summary.add(chunk)
+        for row in chunk.itertuples(index=False, name=None):
+            draw_row(row)
+
+    state["y"] = 0.0
+    draw_row(["Summary"], bold=True)
+    draw_row(["Date", "Records", "Unique users"], bold=True, widths=[90, 90, 90])
+    for row in summary.rows():
+        draw_row(row, widths=[90, 90, 90])
+    pdf.save()
+
+
+def write_docx(chunks: Iterable[pd.DataFrame], path: Path, title: str):
+    from docx import Document
+
+    document = Document()
+    document.add_heading(title, level=1)
+    # Filled in at the end, once the total is known; removed if every row fits
+    notice = document.add_paragraph()
+    table = document.add_table(rows=1, cols=len(ATTENDANCE_COLUMNS))
+    table.style = "Table Grid"
+    for cell, name in zip(table.rows[0].cells, ATTENDANCE_COLUMNS):
+        cell.text = name
+    summary = _Summary()
+    listed = total = 0
+    for chunk in chunks:
+        summary.add(chunk)
+        total += len(chunk)
+        for row in chunk.head(max(0, DOCX_DETAIL_ROWS - listed)).itertuples(index=False, name=None):
+            for cell, value in zip(table.add_row().cells, row):
+                cell.text = str(value)
+            listed += 1
+    if total > listed:
+        text = f"Truncated at {DOCX_DETAIL_ROWS} rows: showing the first {listed} of {total} records; " \
+               "export CSV or Excel for the full list."
+        notice.add_run(text).bold = True
+        document.add_paragraph(text)
+    else:
+        notice._p.getparent().remove(notice._p)
+
+    document.add_page_break()
+    document.add_heading("Summary", level=2)
+    summary_table = document.add_table(rows=1, cols=3)
+    summary_table.style = "Table Grid"
+    for cell, name in zip(summary_table.rows[0].cells, ["Date", "Records", "Unique users"]):
+        cell.text = name
+    for row in summary.rows():
+        for cell, value in zip(summary_table.add_row().cells, row):
+            cell.text = value
+    document.save(str(path))
+
+
+def export_attendance_range(export_format: str, start: Optional[date] = None, end: Optional[date] = None,
+                            log_dir: Path = ATTENDANCE_LOG_DIR, export_dir: Path = EXPORT_DIR,
+                            progress: Progress = _no_progress, chunk_rows: int = CHUNK_ROWS) -> Dict[str, object]:
+    """Stream the attendance between ``start`` and ``end`` into ``export_dir`` in ``export_format``.
+
+    Rows flow chunk by chunk from the logs to the writer, so for CSV and
+    Excel memory stays flat however long the range. PDF pages are held until
+    the file is saved, and Word lists at most ``DOCX_DETAIL_ROWS`` rows (with
+    a notice saying so). Written to a temp name and renamed, so a failed
+    export never leaves a truncated file behind.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format!r}; expected one of {list(EXPORT_FORMATS)}")
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    label = f"{start or 'start'}_to_{end or 'end'}"
+    path = export_dir / f"attendance_{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS[export_format]}"
+    tmp = path.with_name(path.name + ".tmp")
+    title = f"Attendance {start or '…'} to {end or '…'}"
+
+    started = time.perf_counter()
+    counted = {"rows": 0}
+    chunks = _counting(iter_export_chunks(start, end, log_dir, chunk_rows, progress),
+                       lambda n: counted.__setitem__("rows", counted["rows"] + n))
+    try:
+        if export_format == "CSV":
+            write_csv(chunks, tmp)
+        elif export_format == "Excel":
+            write_xlsx(chunks, tmp)
+        elif export_format == "PDF":
+            write_pdf(chunks, tmp, title)
+        else:
+            write_docx(chunks, tmp, title)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    seconds = time.perf_counter() - started
+    logger.info(f"Exported {counted['rows']} attendance rows to {path} in {seconds:.1f}s")
+    return {"path": path, "rows": counted["rows"], "seconds": seconds}
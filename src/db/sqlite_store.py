@@ -0,0 +1,108 @@
+import os
+import csv
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Constants
+SQLITE_DB_FILE = "data/users.db"
+USER_COLUMNS = ["user_id", "name", "password", "phone", "email", "department", "created_at", "last_login"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id     TEXT PRIMARY KEY COLLATE NOCASE,
+    name        TEXT NOT NULL DEFAULT '',
+    password    TEXT NOT NULL DEFAULT '',
+    phone       TEXT NOT NULL DEFAULT '',
+    email       TEXT NOT NULL DEFAULT '',
+    department  TEXT NOT NULL DEFAULT '',
+    created_at  TEXT NOT NULL DEFAULT '',
+    last_login  TEXT NOT NULL DEFAULT ''
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email COLLATE NOCASE) WHERE email <> '';
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class SQLiteUserStore:
+    """User table in SQLite (WAL mode) with a primary key on user_id and a unique index on email.
+
+    Connections are per thread, so one store instance can be shared by every
+    Streamlit session in the process.
+    """
+
+    def __init__(self, path: str = SQLITE_DB_FILE, csv_path: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if csv_path:
+            self.import_csv(csv_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def import_csv(self, csv_path: str) -> int:
+        """One-time import of an existing users.csv; later calls are no-ops."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+            return 0
+        imported = 0
+        if os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+            with open(csv_path, "r", encoding="utf-8", newline="") as f:
+                rows = [
+                    {col: (row.get(col) or "").strip() if col == "user_id" else (row.get(col) or "") for col in USER_COLUMNS}
+                    for row in csv.DictReader(f)
+                ]
+            rows = [row for row in rows if row["user_id"]]
+            with conn:
+                for row in rows:
+                    # Older CSVs can hold duplicate emails; keep the first owner, blank the rest
+                    if row["email"] and self.email_exists(row["email"]):
+                        row["email"] = ""
+                    cursor = conn.execute(
+                        f"INSERT OR IGNORE INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})",
+                        [row[col] for col in USER_COLUMNS],
+                    )
+                    imported += cursor.rowcount
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_imported', ?)", (csv_path,))
+        if imported:
+            logger.info(f"Imported {imported} users from {csv_path} into {self.path}")
+        return imported
+
+    def insert_user(self, user: Dict[str, str]) -> bool:
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})",
+                    [user.get(col, "") for col in USER_COLUMNS],
+                )
+            return True
+        except sqlite3.IntegrityError as e:
+            logger.error(f"Duplicate user rejected: {e}")
+            return False
+
+    def get_user(self, user_id: str) -> Optional[Dict[str, str]]:
+        row = self._conn().execute("SELECT * FROM users WHERE user_id = ?", (user_id.strip(),)).fetchone()
+        return dict(row) if row else None
+
+    def email_exists(self, email: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM users WHERE email = ? COLLATE NOCASE AND email <> ''", (email,)).fetchone() is not None
+
+    def all_users(self) -> List[Dict[str, str]]:
+        return [dict(row) for row in self._conn().execute("SELECT * FROM users ORDER BY rowid")]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
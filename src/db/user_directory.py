@@ -0,0 +1,152 @@
+import time
+import logging
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.db.db_handler import get_all_users, get_users_version
+
+logger = logging.getLogger(__name__)
+
+# Constants
+SEARCH_FIELDS = ["user_id", "name", "email", "department"]
+DIRECTORY_COLUMNS = ["user_id", "name", "phone", "email", "department"]
+SEARCH_MODES = ("contains", "prefix")
+PAGE_SIZE = 50
+# Sorts after any character a user can type, so "abc" + PREFIX_END bounds every key starting with "abc"
+PREFIX_END = "\U0010ffff"
+
+
+@dataclass
+class UserPage:
+    users: List[Dict[str, str]]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+    @property
+    def first(self) -> int:
+        """1-based position of the first user on this page, 0 when there are none."""
+        return (self.page - 1) * self.page_size + 1 if self.users else 0
+
+
+class UserDirectory:
+    """Search index over the password-free user records.
+
+    Rows are kept in user_id order, so every result set is a sorted array
+    of row numbers. Prefix search bisects one sorted array holding each
+    searchable field and each word of the name. Substring search runs
+    ``str.find`` over one lowercased text of all rows and maps each hit to
+    its row by bisecting the row start offsets. Department filters are a
+    per-row code compared against the chosen department.
+    """
+
+    def __init__(self, records: Sequence[Dict[str, str]]):
+        started = time.perf_counter()
+        self.records = sorted((dict(record) for record in records), key=lambda r: str(r.get("user_id", "")).lower())
+        rows = [[str(record.get(field, "") or "") for field in SEARCH_FIELDS] for record in self.records]
+
+        name, department = SEARCH_FIELDS.index("name"), SEARCH_FIELDS.index("department")
+        keys, key_rows = [], []
+        for row, values in enumerate(rows):
+            for key in {value.lower() for value in values if value}.union(values[name].lower().split()):
+                keys.append(key)
+                key_rows.append(row)
+        keys = np.array(keys, dtype=str)
+        order = np.argsort(keys, kind="stable")
+        self._prefix_keys = keys[order]
+        self._prefix_rows = np.array(key_rows, dtype=np.int64)[order]
+
+        # Tabs and newlines cannot be typed into the search box, so a hit never spans two fields or rows
+        texts = ["\t".join(values).lower() for values in rows]
+        self._starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]]).tolist() if texts else []
+        self._text = "\n".join(texts)
+
+        departments = [values[department] for values in rows]
+        self.departments = sorted({department for department in departments if department}, key=str.lower)
+        codes = {department: code for code, department in enumerate(self.departments)}
+        self._department_codes = np.array([codes.get(department, -1) for department in departments], dtype=np.int32)
+        self.build_seconds = time.perf_counter() - started
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _prefix_matches(self, query: str) -> np.ndarray:
+        left = np.searchsorted(self._prefix_keys, query, side="left")
+        right = np.searchsorted(self._prefix_keys, query + PREFIX_END, side="left")
+        return np.unique(self._prefix_rows[left:right])
+
+    def _substring_matches(self, query: str) -> np.ndarray:
+        rows, starts, text = [], self._starts, self._text
+        position = text.find(query)
+        while position != -1:
+            row = bisect_right(starts, position) - 1
+            rows.append(row)
+            # One hit per row is enough; carry on from the next row
+            if row + 1 >= len(starts):
+                break
+            position = text.find(query, starts[row + 1])
+        return np.array(rows, dtype=np.int64)
+
+    def matching_rows(self, query: str = "", department: Optional[str] = None, mode: str = "contains") -> np.ndarray:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}; expected one of {list(SEARCH_MODES)}")
+        query = " ".join(query.lower().split())
+        if not query:
+            rows = np.arange(len(self.records))
+        elif mode == "prefix":
+            rows = self._prefix_matches(query)
+        else:
+            rows = self._substring_matches(query)
+        if department:
+            code = self.departments.index(department) if department in self.departments else -2
+            rows = rows[self._department_codes[rows] == code]
+        return rows
+
+    def search(self, query: str = "", department: Optional[str] = None, page: int = 1,
+               page_size: int = PAGE_SIZE, mode: str = "contains") -> UserPage:
+        """One page of the users matching ``query`` in ``department``, in user_id order, with the total count."""
+        return self.page_of(self.matching_rows(query, department, mode), page, page_size)
+
+    def page_of(self, rows: np.ndarray, page: int = 1, page_size: int = PAGE_SIZE) -> UserPage:
+        page_size = max(1, page_size)
+        page = min(max(1, page), max(1, -(-len(rows) // page_size)))
+        selected = rows[(page - 1) * page_size:page * page_size]
+        return UserPage([dict(self.records[row]) for row in selected], len(rows), page, page_size)
+
+
+_directory: Dict[str, object] = {"version": None, "directory": None}
+_directory_lock = threading.Lock()
+_directory_stats = {"builds": 0, "hits": 0}
+
+
+def get_user_directory() -> UserDirectory:
+    """The directory for the current user store, rebuilt only when ``get_users_version()`` changes."""
+    with _directory_lock:
+        version = get_users_version()
+        if _directory["directory"] is not None and version == _directory["version"]:
+            _directory_stats["hits"] += 1
+            return _directory["directory"]
+        # The version is read before loading, so a write during the build triggers another rebuild
+        directory = UserDirectory(get_all_users())
+        _directory.update(version=version, directory=directory)
+        _directory_stats["builds"] += 1
+        logger.info(f"Built user directory of {len(directory)} users in {directory.build_seconds:.2f}s")
+        return directory
+
+
+def search_users(query: str = "", department: Optional[str] = None, page: int = 1,
+                 page_size: int = PAGE_SIZE, mode: str = "contains") -> UserPage:
+    return get_user_directory().search(query, department, page, page_size, mode)
+
+
+def get_directory_stats() -> Dict[str, int]:
+    with _directory_lock:
+        return dict(_directory_stats)
@@ -0,0 +1,183 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.db.attendance_writer import directory_lock
+
+logger = logging.getLogger(__name__)
+
+# Constants
+JOURNAL_SUFFIX = ".journal"
+SNAPSHOT_PREFIX = "users_snapshot_"
+SNAPSHOT_EVERY = 1000
+SNAPSHOTS_KEPT = 5
+
+
+def _fsync_dir(directory: Path):
+    # Makes a rename durable on POSIX; directories cannot be opened on Windows
+    if os.name != "nt":
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def atomic_write_csv(df: pd.DataFrame, path: Path):
+    """Write ``df`` to a temp file beside ``path``, fsync it and rename it over ``path``."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+class UserJournal:
+    """Append-only journal of user-table changes on top of the last snapshot.
+
+    The snapshot is the user table itself (``users.csv``); each change is
+    one JSON line in ``users.csv.journal``, fsynced before the write
+    returns. The current table is the snapshot with the journal replayed
+    over it. Every ``snapshot_every`` entries the table is rewritten
+    atomically and the journal emptied; the table it replaces is kept in
+    ``backup_dir`` as a snapshot, newest ``snapshots_kept`` only.
+
+    Replay is an upsert by user_id, so a crash between the table rename
+    and the journal reset replays entries the table already holds without
+    changing it. A torn last line (crash mid-append) is skipped.
+
+    Appends and snapshots hold the table directory's inter-process lock,
+    since other app processes and the CLI write the same journal.
+    """
+
+    def __init__(self, table_path: Path, backup_dir: Path, snapshot_every: int = SNAPSHOT_EVERY,
+                 snapshots_kept: int = SNAPSHOTS_KEPT):
+        self.table_path = Path(table_path)
+        self.path = self.table_path.with_name(self.table_path.name + JOURNAL_SUFFIX)
+        self.backup_dir = Path(backup_dir)
+        self.snapshot_every = snapshot_every
+        self.snapshots_kept = snapshots_kept
+        self._pending: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def key(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def entries(self) -> List[Dict]:
+        if not self.path.exists():
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping unreadable line {number} of {self.path}")
+        return entries
+
+    def pending(self) -> int:
+        with self._lock:
+            if self._pending is None:
+                self._pending = len(self.entries())
+            return self._pending
+
+    def append(self, op: str, record: Dict[str, str]) -> int:
+        """Durably record one change; returns the number of entries since the last snapshot."""
+        line = json.dumps({"op": op, "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "user": record},
+                          ensure_ascii=False)
+        with self._lock, directory_lock(self.table_path.parent):
+            if self._pending is None:
+                self._pending = len(self.entries())
+            with open(self.path, "a+b") as f:
+                # Start on a fresh line if a crash left half an entry behind
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(line.encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending += 1
+            return self._pending
+
+    def replay(self, df: pd.DataFrame, key_column: str = "user_id") -> pd.DataFrame:
+        """``df`` (the snapshot) with every journal entry applied."""
+        entries = self.entries()
+        if not entries:
+            return df
+        latest: Dict[str, Dict[str, str]] = {}
+        for entry in entries:
+            if entry.get("op") != "upsert":
+                logger.warning(f"Skipping unknown journal operation {entry.get('op')!r}")
+                continue
+            record = entry["user"]
+            latest[str(record[key_column]).strip().lower()] = record
+        changed = pd.DataFrame(list(latest.values()), dtype=str).reindex(columns=df.columns).fillna("")
+        keep = ~df[key_column].str.strip().str.lower().isin(latest.keys())
+        return pd.concat([df[keep], changed], ignore_index=True)
+
+    def snapshot(self, df: pd.DataFrame):
+        """Make ``df`` the new snapshot and empty the journal."""
+        with self._lock, directory_lock(self.table_path.parent):
+            self._write_snapshot(df)
+        logger.info(f"Wrote user snapshot of {len(df)} users to {self.table_path}")
+
+    def compact(self, key_column: str = "user_id") -> int:
+        """Fold the journal into the table on disk; returns the number of users.
+
+        Table and journal are both read under the lock, so entries another
+        process appended, or a snapshot it wrote, since this process last
+        read them are kept. The table must exist, as it names the columns.
+        """
+        with self._lock, directory_lock(self.table_path.parent):
+            table = pd.read_csv(self.table_path, dtype=str, keep_default_na=False)
+            df = self.replay(table, key_column)
+            self._write_snapshot(df)
+        logger.info(f"Wrote user snapshot of {len(df)} users to {self.table_path}")
+        return len(df)
+
+    def _write_snapshot(self, df: pd.DataFrame):
+        # Called under both locks
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        if self.table_path.exists():
+            self._keep_previous()
+        atomic_write_csv(df, self.table_path)
+        # The table now holds every entry; from here a crash only means an idempotent replay
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        open(tmp, "wb").close()
+        os.replace(tmp, self.path)
+        self._pending = 0
+        self._prune()
+
+    def _keep_previous(self):
+        target = self.backup_dir / f"{SNAPSHOT_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+        try:
+            # A hard link keeps the old table without writing its bytes again
+            os.link(self.table_path, target)
+        except OSError:
+            shutil.copyfile(self.table_path, target)
+
+    def _prune(self):
+        snapshots = sorted(self.backup_dir.glob(f"{SNAPSHOT_PREFIX}*.csv"))
+        for old in snapshots[:max(0, len(snapshots) - self.snapshots_kept)]:
+            try:
+                old.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove old snapshot {old}: {e}")
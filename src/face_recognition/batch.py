@@ -0,0 +1,253 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import pandas as pd
+
+from src.db.attendance_schema import ATTENDANCE_COLUMNS, attendance_record
+from src.face_recognition.core import locate_and_match_many
+from src.face_recognition.detectors import STILL_DETECTOR, add_detector_arguments, detector_from_args
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.model_store import MODEL_PATH, ModelFormatError, open_model
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("batch")
+
+# Constants
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+# Kept out of data/attendance_logs: every CSV there is read as a day of live attendance
+OUTPUT_DIR = Path("data/batch_attendance")
+SEGMENT_FRAMES = 1800
+IMAGES_PER_TASK = 32
+# Sampled frames encoded together in one batched network pass
+FRAMES_PER_ENCODE = 8
+MATCH_TOLERANCE = 0.5
+BATCH_METHOD = "Face Recognition (Batch)"
+
+# Per-process gallery and detector settings, set once by _init_worker
+_GALLERY = None
+_DETECTOR = STILL_DETECTOR
+
+
+def _init_worker(model_path, detector=STILL_DETECTOR):
+    global _GALLERY, _DETECTOR
+    model = open_model(Path(model_path))
+    _GALLERY = FaceGallery.from_matrix(model.encodings, model.ids)
+    _DETECTOR = detector
+
+
+def _sight(sightings, pending):
+    faces = 0
+    rgb_frames = [rgb for rgb, _ in pending]
+    for (_, when), matches in zip(pending, locate_and_match_many(rgb_frames, _GALLERY, MATCH_TOLERANCE, detector=_DETECTOR)):
+        for _, user_id, _ in matches:
+            faces += 1
+            if user_id is not None and (user_id not in sightings or when < sightings[user_id]):
+                sightings[user_id] = when
+    pending.clear()
+    return faces
+
+
+def _process_video_segment(source, start, end, step, fps, recorded_at):
+    sightings, frames, faces, pending = {}, 0, 0, []
+    cap = cv2.VideoCapture(str(source))
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, end):
+            # grab() skips decoding for frames that are not sampled
+            if not cap.grab():
+                break
+            if (index - start) % step:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+            frames += 1
+            pending.append((cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), recorded_at + timedelta(seconds=index / fps)))
+            if len(pending) >= FRAMES_PER_ENCODE:
+                faces += _sight(sightings, pending)
+        if pending:
+            faces += _sight(sightings, pending)
+    finally:
+        cap.release()
+    return sightings, frames, faces
+
+
+def _process_images(paths):
+    sightings, frames, faces, pending = {}, 0, 0, []
+    for path in paths:
+        frame = cv2.imread(str(path))
+        if frame is None:
+            logger.warning(f"Could not read {path}")
+            continue
+        frames += 1
+        pending.append((cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), datetime.fromtimestamp(os.path.getmtime(path))))
+        if len(pending) >= FRAMES_PER_ENCODE:
+            faces += _sight(sightings, pending)
+    if pending:
+        faces += _sight(sightings, pending)
+    return sightings, frames, faces
+
+
+def _run_task(task):
+    # Failures come back as data so one bad file never stops the batch
+    kind, source, args = task
+    start = time.perf_counter()
+    try:
+        if kind == "video":
+            sightings, frames, faces = _process_video_segment(source, *args)
+        else:
+            sightings, frames, faces = _process_images(args)
+        return source, sightings, frames, faces, time.perf_counter() - start, None
+    except Exception as e:
+        return source, {}, 0, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def collect_sources(inputs):
+    videos, image_groups = [], {}
+    for item in map(Path, inputs):
+        if item.is_dir():
+            for path in sorted(item.rglob("*")):
+                if path.suffix.lower() in IMAGE_EXTENSIONS:
+                    image_groups.setdefault(str(item), []).append(path)
+                elif path.suffix.lower() in VIDEO_EXTENSIONS:
+                    videos.append(path)
+        elif item.suffix.lower() in VIDEO_EXTENSIONS:
+            videos.append(item)
+        elif item.suffix.lower() in IMAGE_EXTENSIONS:
+            image_groups.setdefault(str(item.parent), []).append(item)
+        else:
+            logger.warning(f"Ignoring {item}: not a video, image or directory")
+    return videos, image_groups
+
+
+def plan_tasks(videos, image_groups, sample_fps, recorded_at=None):
+    tasks = []
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total <= 0:
+            logger.warning(f"Could not read frame count of {video}, skipping")
+            continue
+        step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+        # Without an explicit start time assume the file was closed when recording ended
+        start_time = recorded_at or datetime.fromtimestamp(os.path.getmtime(video)) - timedelta(seconds=total / fps)
+        # Segment boundaries are multiples of step so sampling matches a single sequential pass
+        segment = max(step, SEGMENT_FRAMES - SEGMENT_FRAMES % step)
+        for start in range(0, total, segment):
+            tasks.append(("video", str(video), (start, min(total, start + segment), step, fps, start_time)))
+    for source, paths in image_groups.items():
+        for start in range(0, len(paths), IMAGES_PER_TASK):
+            tasks.append(("images", source, paths[start:start + IMAGES_PER_TASK]))
+    return tasks
+
+
+def sightings_to_records(sightings, name_lookup):
+    records = [attendance_record(user_id, name_lookup(user_id), when, BATCH_METHOD)
+               for user_id, when in sorted(sightings.items(), key=lambda item: item[1])]
+    return pd.DataFrame(records, columns=ATTENDANCE_COLUMNS)
+
+
+def _default_name_lookup(user_id):
+    from src.db.db_handler import get_user_by_id
+
+    user_info = get_user_by_id(user_id)
+    return user_info["name"] if user_info else user_id
+
+
+def run_batch(inputs, sample_fps=1.0, workers=None, per_file=False, output=None, output_dir=OUTPUT_DIR,
+              model_path=MODEL_PATH, recorded_at=None, name_lookup=_default_name_lookup, detector=STILL_DETECTOR):
+    started = time.perf_counter()
+    videos, image_groups = collect_sources(inputs)
+    tasks = plan_tasks(videos, image_groups, sample_fps, recorded_at)
+    if not tasks:
+        logger.error("Nothing to process.")
+        return []
+
+    # Checked here, since a worker that cannot open the model only surfaces as a BrokenProcessPool
+    try:
+        open_model(Path(model_path))
+    except (OSError, ModelFormatError) as e:
+        logger.error(f"Cannot open the trained model {model_path}: {e}")
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Processing {len(videos)} videos and {sum(map(len, image_groups.values()))} images "
+                f"as {len(tasks)} tasks on {workers} workers")
+
+    per_source = {}
+    totals = {"frames": 0, "faces": 0, "failed_tasks": 0}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(model_path), detector)) as executor:
+        futures = [executor.submit(_run_task, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            source, sightings, frames, faces, seconds, error = future.result()
+            if error:
+                totals["failed_tasks"] += 1
+                logger.warning(f"Task on {source} failed: {error}")
+            merged = per_source.setdefault(source, {})
+            for user_id, when in sightings.items():
+                if user_id not in merged or when < merged[user_id]:
+                    merged[user_id] = when
+            totals["frames"] += frames
+            totals["faces"] += faces
+            elapsed = time.perf_counter() - started
+            logger.info(f"[{done}/{len(tasks)}] {Path(source).name}: {frames} frames in {seconds:.1f}s; "
+                        f"overall {totals['frames'] / elapsed:.1f} frames/sec")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    if per_file:
+        for source, sightings in sorted(per_source.items()):
+            # hall1/lecture.mp4 and hall2/lecture.mp4 share a stem, so the folder is part of the name
+            source = Path(source)
+            name = f"batch_{source.parent.name}_{source.stem}" if source.parent.name else f"batch_{source.stem}"
+            path, index = output_dir / f"{name}.csv", 1
+            while path in written:
+                index += 1
+                path = output_dir / f"{name}_{index}.csv"
+            sightings_to_records(sightings, name_lookup).to_csv(path, index=False)
+            written.append(path)
+    else:
+        combined = {}
+        for sightings in per_source.values():
+            for user_id, when in sightings.items():
+                if user_id not in combined or when < combined[user_id]:
+                    combined[user_id] = when
+        path = Path(output) if output else output_dir / f"attendance_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sightings_to_records(combined, name_lookup).to_csv(path, index=False)
+        written.append(path)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Done: {totals['frames']} frames, {totals['faces']} faces, {totals['failed_tasks']} failed tasks "
+                f"in {elapsed:.1f}s ({totals['frames'] / elapsed:.1f} frames/sec)")
+    for path in written:
+        logger.info(f"Wrote {path}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Take attendance offline from video files and image folders")
+    parser.add_argument("inputs", nargs="+", help="video files, images or directories containing them")
+    parser.add_argument("--sample-fps", type=float, default=1.0, help="video frames analysed per second of footage (0 = every frame)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU core)")
+    parser.add_argument("--per-file", action="store_true", help="write one attendance CSV per input instead of one combined CSV")
+    parser.add_argument("--output", type=Path, default=None, help="combined CSV path")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--recorded-at", type=lambda s: datetime.strptime(s, "%Y-%m-%d %H:%M:%S"), default=None,
+                        help="start time of the recordings, 'YYYY-MM-DD HH:MM:SS' (default: from file times)")
+    add_detector_arguments(parser, STILL_DETECTOR)
+    args = parser.parse_args()
+    run_batch(args.inputs, sample_fps=args.sample_fps, workers=args.workers, per_file=args.per_file,
+              output=args.output, output_dir=args.output_dir, model_path=args.model, recorded_at=args.recorded_at,
+              detector=detector_from_args(args, STILL_DETECTOR))
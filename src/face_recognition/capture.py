@@ -0,0 +1,284 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.face_recognition.metrics import METRICS
+
+logger = logging.getLogger("capture")
+
+# Constants
+RING_SIZE = 2
+FPS_WINDOW = 30
+READ_FAILURE_LIMIT = 50
+MAX_EVENTS = 1000
+
+
+class CameraSource:
+    live = True
+
+    def __init__(self, device=0):
+        self.device = device
+        self.cap = cv2.VideoCapture(device)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open camera {device}")
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource:
+    """Plays a video file in place of a webcam, optionally looping and paced to its native FPS."""
+
+    def __init__(self, path, loop: bool = False, realtime: bool = True):
+        self.path = str(path)
+        self.loop = loop
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video {self.path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 0
+        self.interval = 1.0 / fps if realtime and fps > 0 else 0.0
+        self._next = time.perf_counter()
+
+    def read(self):
+        if self.interval:
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next = max(self._next + self.interval, time.perf_counter())
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticSource:
+    """Generates frames from ``make_frame(index)`` at a fixed rate; for tests and benchmarks."""
+
+    def __init__(self, make_frame: Optional[Callable[[int], np.ndarray]] = None, n_frames: Optional[int] = None,
+                 fps: float = 30.0, shape=(480, 640, 3)):
+        self.make_frame = make_frame or (lambda i: np.full(shape, i % 256, dtype=np.uint8))
+        self.n_frames = n_frames
+        self.interval = 1.0 / fps if fps else 0.0
+        self.index = 0
+        self._next = time.perf_counter()
+
+    def read(self):
+        if self.n_frames is not None and self.index >= self.n_frames:
+            return False, None
+        if self.interval:
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next = max(self._next + self.interval, time.perf_counter())
+        frame = self.make_frame(self.index)
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class FrameRing:
+    """Bounded buffer of the newest frames; pushing into a full ring drops the oldest."""
+
+    def __init__(self, capacity: int = RING_SIZE):
+        self.frames = deque(maxlen=capacity)
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def push(self, item):
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(item)
+            self._cond.notify()
+
+    def pop_latest(self, timeout: Optional[float] = None):
+        # The consumer always wants the freshest frame; anything older is stale
+        with self._cond:
+            if not self.frames and not self.closed:
+                self._cond.wait(timeout)
+            if not self.frames:
+                return None
+            item = self.frames.pop()
+            self.dropped += len(self.frames)
+            self.frames.clear()
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class RateMeter:
+    def __init__(self, window: int = FPS_WINDOW):
+        self.stamps = deque(maxlen=window)
+        self.count = 0
+
+    def tick(self):
+        self.stamps.append(time.perf_counter())
+        self.count += 1
+
+    def rate(self) -> float:
+        if len(self.stamps) < 2:
+            return 0.0
+        span = self.stamps[-1] - self.stamps[0]
+        return (len(self.stamps) - 1) / span if span > 0 else 0.0
+
+
+class CaptureService:
+    """Long-lived grab -> recognize pipeline behind the attendance page.
+
+    A grabber thread reads the source into a small ``FrameRing``; a worker
+    thread runs ``process_frame(frame) -> (annotated_frame, events)`` on the
+    newest frame. Callers poll ``latest_frame()``, ``drain_events()`` and
+    ``stats()`` without ever touching the camera themselves.
+
+    Events are for display only and the newest ``MAX_EVENTS`` are kept;
+    anything that must survive belongs in ``process_frame`` itself. With
+    ``idle_timeout`` set, the service releases the camera once nobody has
+    called ``heartbeat()`` for that many seconds (e.g. the tab was closed).
+    """
+
+    def __init__(self, source_factory: Callable[[], object], process_frame: Callable, ring_size: int = RING_SIZE,
+                 idle_timeout: Optional[float] = None):
+        self.source_factory = source_factory
+        self.process_frame = process_frame
+        self.ring_size = ring_size
+        self.idle_timeout = idle_timeout
+        self.ring = FrameRing(ring_size)
+        self.capture_rate = RateMeter()
+        self.recognition_rate = RateMeter()
+        self.error: Optional[str] = None
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._latest = None
+        self._latest_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_heartbeat = time.monotonic()
+        self._source_lock = threading.Lock()
+        self.source = None
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        if self.running:
+            return self
+        # A fresh event per run, so a grabber left over from a timed-out stop() stays stopped
+        self._stop = threading.Event()
+        self.ring = FrameRing(self.ring_size)
+        self.error = None
+        self._last_heartbeat = time.monotonic()
+        self.source = self.source_factory()
+        self._threads = [
+            threading.Thread(target=self._grab_loop, name="capture-grabber", daemon=True),
+            threading.Thread(target=self._recognize_loop, name="capture-recognizer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self.ring.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        if any(thread.is_alive() for thread in self._threads):
+            # A grabber stuck in read() releases its own source once the read returns
+            logger.warning(f"Capture threads did not stop within {timeout:.1f}s")
+        else:
+            self._release_source()
+        self._threads = []
+
+    def heartbeat(self):
+        self._last_heartbeat = time.monotonic()
+
+    def _release_source(self, source=None):
+        with self._source_lock:
+            source = source or self.source
+            if source is None:
+                return
+            source.release()
+            if self.source is source:
+                self.source = None
+
+    def _grab_loop(self):
+        # Local references: after a timed-out stop() a restart may already have replaced them
+        source, ring, stop = self.source, self.ring, self._stop
+        failures = 0
+        while not stop.is_set():
+            if self.idle_timeout is not None and time.monotonic() - self._last_heartbeat > self.idle_timeout:
+                logger.info(f"No heartbeat for {self.idle_timeout:.0f}s, releasing the camera")
+                self.error = "Camera released: the page stopped polling."
+                break
+            with METRICS.stage("capture"):
+                ret, frame = source.read()
+            if not ret:
+                failures += 1
+                # Finite sources (video files, synthetic runs) end on their first failed read
+                if not getattr(source, "live", False):
+                    break
+                if failures >= READ_FAILURE_LIMIT:
+                    self.error = "Camera error."
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+            self.capture_rate.tick()
+            ring.push(frame)
+        ring.close()
+        self._release_source(source)
+
+    def _recognize_loop(self):
+        ring, stop = self.ring, self._stop
+        while not stop.is_set():
+            frame = ring.pop_latest(timeout=0.5)
+            if frame is None:
+                if ring.closed:
+                    break
+                continue
+            try:
+                annotated, events = self.process_frame(frame)
+            except Exception as e:
+                logger.error(f"Recognition failed: {e}")
+                self.error = str(e)
+                continue
+            self.recognition_rate.tick()
+            with self._latest_lock:
+                self._latest = annotated
+            self._events.extend(events)
+
+    def latest_frame(self):
+        with self._latest_lock:
+            return self._latest
+
+    def drain_events(self) -> list:
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def stats(self) -> dict:
+        return {
+            "capture_fps": self.capture_rate.rate(),
+            "recognition_fps": self.recognition_rate.rate(),
+            "frames_captured": self.capture_rate.count,
+            "frames_recognized": self.recognition_rate.count,
+            "frames_dropped": self.ring.dropped,
+        }
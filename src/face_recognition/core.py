@@ -0,0 +1,53 @@
+import face_recognition
+
+from src.face_recognition.detectors import STILL_DETECTOR, detect_faces
+from src.face_recognition.encoder_batch import MAX_BATCH, encode_faces
+from src.face_recognition.metrics import METRICS
+
+
+def _label(locations, match_ids, match_distances, tolerance):
+    faces = []
+    for location, candidates, distances in zip(locations, match_ids, match_distances):
+        if candidates and distances[0] < tolerance:
+            faces.append((location, candidates[0], distances[0]))
+        else:
+            faces.append((location, None, 1.0))
+    return faces
+
+
+def locate_and_match(rgb_frame, gallery, tolerance, tracker=None, detector=STILL_DETECTOR):
+    """Detect, encode and match every face in an RGB frame.
+
+    Returns ``[(box, user_id or None, distance), ...]`` with boxes in
+    face_recognition's (top, right, bottom, left) order.
+    """
+    if tracker is not None:
+        return [(track.box, track.user_id, track.distance) for track in tracker.update(rgb_frame, gallery)]
+
+    with METRICS.stage("detect"):
+        face_locations = detect_faces(rgb_frame, detector)
+    with METRICS.stage("encode"):
+        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+    with METRICS.stage("match"):
+        match_ids, match_distances = gallery.match(face_encodings, k=1)
+    return _label(face_locations, match_ids, match_distances, tolerance)
+
+
+def locate_and_match_many(rgb_frames, gallery, tolerance, max_batch=MAX_BATCH, detector=STILL_DETECTOR):
+    """``locate_and_match`` for several frames with one batched encode and one match call.
+
+    Returns one list of ``(box, user_id or None, distance)`` per frame.
+    """
+    with METRICS.stage("detect"):
+        locations = [detect_faces(rgb_frame, detector) for rgb_frame in rgb_frames]
+    with METRICS.stage("encode"):
+        encodings = encode_faces(list(zip(rgb_frames, locations)), max_batch)
+    with METRICS.stage("match"):
+        match_ids, match_distances = gallery.match([encoding for frame in encodings for encoding in frame], k=1)
+    results, offset = [], 0
+    for frame_locations in locations:
+        count = len(frame_locations)
+        results.append(_label(frame_locations, match_ids[offset:offset + count],
+                              match_distances[offset:offset + count], tolerance))
+        offset += count
+    return results
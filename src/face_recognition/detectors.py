@@ -0,0 +1,164 @@
+import logging
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("detectors")
+
+# Constants
+DETECTOR_BACKENDS = ("auto", "hog", "haar", "yunet")
+YUNET_MODEL_PATH = Path("data/model/face_detection_yunet_2023mar.onnx")
+HAAR_CASCADE = "haarcascade_frontalface_default.xml"
+HAAR_SCALE_FACTOR = 1.1
+HAAR_MIN_NEIGHBORS = 5
+YUNET_NMS_THRESHOLD = 0.3
+
+Box = Tuple[int, int, int, int]  # (top, right, bottom, left), the face_recognition order
+
+
+@dataclass(frozen=True)
+class DetectorConfig:
+    backend: str = "hog"             # hog | haar | yunet | auto (YuNet if its model is on disk, else Haar, else HOG)
+    scale: float = 1.0               # detector input is the frame (or ROI) resized by this factor
+    upsample: int = 1                # times HOG doubles its input to find small faces; Haar/YuNet use min_face instead
+    roi: Optional[Tuple[float, float, float, float]] = None  # (left, top, right, bottom) as fractions of the frame
+    min_face: int = 20               # smallest face side in detector-input pixels (Haar)
+    score_threshold: float = 0.7     # minimum YuNet confidence
+    model_path: Optional[str] = None  # YuNet .onnx or Haar .xml instead of the default
+
+
+# Camera frames: HOG on a half-size frame. Haar and YuNet are opt-in ("auto" picks them when available):
+# their boxes are framed differently from HOG's, which dlib's landmark model was trained on
+LIVE_DETECTOR = DetectorConfig(backend="hog", scale=0.5)
+# Enrollment photos and offline runs: full-size HOG, as face_locations() did
+STILL_DETECTOR = DetectorConfig(backend="hog")
+
+
+def resolve_backend(config: DetectorConfig) -> str:
+    if config.backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector backend {config.backend!r}; expected one of {list(DETECTOR_BACKENDS)}")
+    if config.backend != "auto":
+        return config.backend
+    if Path(config.model_path or YUNET_MODEL_PATH).exists():
+        return "yunet"
+    # OpenCV 5 moved the Haar cascades out of the main package
+    return "haar" if hasattr(cv2, "CascadeClassifier") else "hog"
+
+
+def parse_roi(text: str) -> Tuple[float, float, float, float]:
+    """``"left,top,right,bottom"`` fractions, e.g. ``"0.25,0,0.75,1"`` for the middle half."""
+    left, top, right, bottom = (float(value) for value in text.split(","))
+    if not (0 <= left < right <= 1 and 0 <= top < bottom <= 1):
+        raise ValueError(f"ROI {text!r} must be fractions with left < right and top < bottom")
+    return left, top, right, bottom
+
+
+class HogDetector:
+    """dlib's HOG detector through face_recognition.face_locations."""
+
+    def __init__(self, config: DetectorConfig):
+        # Imported on first use, so importing this module does not load dlib
+        import face_recognition
+
+        self.config = config
+        self.face_locations = face_recognition.face_locations
+
+    def __call__(self, image: np.ndarray) -> List[Box]:
+        return self.face_locations(image, number_of_times_to_upsample=self.config.upsample)
+
+
+class HaarDetector:
+    """OpenCV's frontal-face Haar cascade."""
+
+    def __init__(self, config: DetectorConfig):
+        self.config = config
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise RuntimeError(f"OpenCV {cv2.__version__} has no Haar cascades; install opencv-python<5 or pick another backend")
+        path = config.model_path or str(Path(cv2.data.haarcascades) / HAAR_CASCADE)
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Could not load Haar cascade {path}")
+
+    def __call__(self, image: np.ndarray) -> List[Box]:
+        gray = cv2.equalizeHist(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=HAAR_SCALE_FACTOR, minNeighbors=HAAR_MIN_NEIGHBORS,
+                                              minSize=(self.config.min_face, self.config.min_face))
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in faces]
+
+
+class YuNetDetector:
+    """OpenCV's YuNet CNN (cv2.FaceDetectorYN), a few hundred KB of ONNX run on the CPU."""
+
+    def __init__(self, config: DetectorConfig):
+        self.config = config
+        path = Path(config.model_path or YUNET_MODEL_PATH)
+        if not path.exists():
+            raise FileNotFoundError(f"YuNet model not found at {path}; download face_detection_yunet_2023mar.onnx "
+                                    f"from the OpenCV model zoo or pick another backend")
+        self.net = cv2.FaceDetectorYN.create(str(path), "", (320, 320), config.score_threshold, YUNET_NMS_THRESHOLD)
+
+    def __call__(self, image: np.ndarray) -> List[Box]:
+        height, width = image.shape[:2]
+        self.net.setInputSize((width, height))
+        _, faces = self.net.detect(cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in faces[:, :4]]
+
+
+BACKEND_CLASSES = {"hog": HogDetector, "haar": HaarDetector, "yunet": YuNetDetector}
+
+# OpenCV detectors are not safe to share across threads, so each thread builds its own
+_local = threading.local()
+
+
+def get_detector(config: DetectorConfig):
+    if not hasattr(_local, "detectors"):
+        _local.detectors = {}
+    detectors: Dict[DetectorConfig, object] = _local.detectors
+    # Scale and ROI are applied around the detector, so configs differing only there share one
+    key = replace(config, scale=1.0, roi=None)
+    detector = detectors.get(key)
+    if detector is None:
+        backend = resolve_backend(config)
+        if backend != config.backend:
+            logger.info(f"Using the {backend} face detector")
+        detector = detectors[key] = BACKEND_CLASSES[backend](key)
+    return detector
+
+
+def detect_faces(rgb_frame: np.ndarray, config: DetectorConfig = STILL_DETECTOR) -> List[Box]:
+    """Face boxes in full-frame coordinates, found inside ``config.roi`` at ``config.scale``."""
+    height, width = rgb_frame.shape[:2]
+    x0 = y0 = 0
+    image = rgb_frame
+    if config.roi is not None:
+        left, top, right, bottom = config.roi
+        x0, y0 = int(left * width), int(top * height)
+        image = rgb_frame[y0:int(bottom * height), x0:int(right * width)]
+
+    detector = get_detector(config)
+    # HOG upsamples internally; the OpenCV backends run at exactly config.scale
+    factor = config.scale
+    if factor != 1.0:
+        image = cv2.resize(image, (0, 0), fx=factor, fy=factor)
+    return [
+        (max(0, int(top / factor) + y0), min(width, int(right / factor) + x0),
+         min(height, int(bottom / factor) + y0), max(0, int(left / factor) + x0))
+        for top, right, bottom, left in detector(np.ascontiguousarray(image))
+    ]
+
+
+def add_detector_arguments(parser, default: DetectorConfig):
+    parser.add_argument("--detector", choices=DETECTOR_BACKENDS, default=default.backend)
+    parser.add_argument("--detection-scale", type=float, default=default.scale)
+    parser.add_argument("--upsample", type=int, default=default.upsample)
+    parser.add_argument("--roi", type=parse_roi, default=default.roi, help="left,top,right,bottom as fractions of the frame")
+
+
+def detector_from_args(args, default: DetectorConfig) -> DetectorConfig:
+    return replace(default, backend=args.detector, scale=args.detection_scale, upsample=args.upsample, roi=args.roi)
@@ -0,0 +1,179 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import face_recognition
+
+from src.face_recognition.metrics import METRICS
+
+logger = logging.getLogger("encoder_batch")
+
+# Constants
+MAX_BATCH = 32
+MAX_DELAY = 0.010
+# dlib's compute_face_descriptor(image, shape) aligns faces with exactly these chip settings
+CHIP_SIZE = 150
+CHIP_PADDING = 0.25
+
+Box = Tuple[int, int, int, int]
+EncodeFn = Callable[[Sequence[Tuple[np.ndarray, Sequence[Box]]], int], List[List[np.ndarray]]]
+
+
+def _batched_api():
+    """dlib's face chip and aligned-batch descriptor API, or None on builds without it."""
+    try:
+        import dlib
+        from face_recognition import api
+    except ImportError:
+        return None
+    if not hasattr(dlib, "get_face_chip") or not hasattr(api, "_raw_face_landmarks"):
+        return None
+    return dlib, api
+
+
+def encode_faces(items: Sequence[Tuple[np.ndarray, Sequence[Box]]], max_batch: int = MAX_BATCH) -> List[List[np.ndarray]]:
+    """Encodings for every box of every ``(rgb, boxes)`` item, one list per item.
+
+    Landmarks are found per face, the aligned chips of all items are then
+    pushed through the network ``max_batch`` at a time. The result equals
+    calling ``face_recognition.face_encodings(rgb, boxes)`` item by item.
+    """
+    batched = _batched_api()
+    if batched is None:
+        return [face_recognition.face_encodings(rgb, list(boxes)) if boxes else [] for rgb, boxes in items]
+    dlib, api = batched
+
+    chips, counts = [], []
+    for rgb, boxes in items:
+        shapes = api._raw_face_landmarks(rgb, list(boxes), model="small") if boxes else []
+        chips.extend(dlib.get_face_chip(rgb, shape, size=CHIP_SIZE, padding=CHIP_PADDING) for shape in shapes)
+        counts.append(len(shapes))
+
+    descriptors = []
+    for start in range(0, len(chips), max(1, max_batch)):
+        descriptors.extend(api.face_encoder.compute_face_descriptor(chips[start:start + max_batch], 1))
+
+    results, offset = [], 0
+    for count in counts:
+        results.append([np.array(descriptor) for descriptor in descriptors[offset:offset + count]])
+        offset += count
+    return results
+
+
+class EncodingBatcher:
+    """Gathers encode requests from many threads into shared network passes.
+
+    ``submit(rgb, boxes)`` returns a future for that frame's encodings. A
+    batch closes once it holds ``max_batch`` faces, once its oldest request
+    has waited ``max_delay`` seconds, or when ``flush()`` says no more
+    requests are coming, and each frame gets its own slice of the result.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY, encode: EncodeFn = encode_faces):
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.encode = encode
+        self.stats = {"batches": 0, "requests": 0, "faces": 0, "encode_seconds": 0.0, "wait_seconds": 0.0}
+        self._queue = deque()
+        self._pending_faces = 0
+        self._flush_now = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, rgb: np.ndarray, boxes: Sequence[Box]) -> Future:
+        future = Future()
+        if not boxes:
+            future.set_result([])
+            return future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EncodingBatcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="encoder-batch", daemon=True)
+                self._thread.start()
+            self._queue.append((time.perf_counter(), rgb, list(boxes), future))
+            self._pending_faces += len(boxes)
+            self._cond.notify()
+        return future
+
+    def encode_frame(self, rgb: np.ndarray, boxes: Sequence[Box]) -> List[np.ndarray]:
+        return self.submit(rgb, boxes).result()
+
+    def flush(self):
+        """Close the current batch now instead of waiting out the deadline."""
+        with self._cond:
+            if self._queue:
+                self._flush_now = True
+                self._cond.notify()
+
+    def close(self, timeout: float = 5.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            deadline = self._queue[0][0] + self.max_delay
+            while self._pending_faces < self.max_batch and not self._flush_now and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, faces = [], 0
+            # A frame with more than max_batch faces still goes in whole; encode() splits it
+            while self._queue and (not batch or faces + len(self._queue[0][2]) <= self.max_batch):
+                request = self._queue.popleft()
+                batch.append(request)
+                faces += len(request[2])
+            self._pending_faces -= faces
+            if not self._queue:
+                self._flush_now = False
+            return batch, faces
+
+    def _run(self):
+        while True:
+            next_batch = self._next_batch()
+            if next_batch is None:
+                return
+            batch, faces = next_batch
+            start = time.perf_counter()
+            try:
+                results = self.encode([(rgb, boxes) for _, rgb, boxes, _ in batch], self.max_batch)
+            except Exception as e:
+                logger.error(f"Batch of {faces} faces failed: {e}")
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+            encode_seconds = time.perf_counter() - start
+            for (_, _, _, future), encodings in zip(batch, results):
+                future.set_result(encodings)
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["faces"] += faces
+            self.stats["encode_seconds"] += encode_seconds
+            self.stats["wait_seconds"] += sum(start - submitted for submitted, *_ in batch)
+            # One network pass per batch; the time each frame waited for its batch is kept apart
+            METRICS.observe_stage("encode", encode_seconds)
+            for submitted, *_ in batch:
+                METRICS.observe_stage("encode_wait", start - submitted)
+
+    def report(self) -> dict:
+        batches = max(1, self.stats["batches"])
+        return {
+            "encode_batches": self.stats["batches"],
+            "faces_per_encode_batch": round(self.stats["faces"] / batches, 2),
+            "frames_per_encode_batch": round(self.stats["requests"] / batches, 2),
+            "encode_ms_per_batch": round(1000 * self.stats["encode_seconds"] / batches, 2),
+            "encode_wait_ms": round(1000 * self.stats["wait_seconds"] / max(1, self.stats["requests"]), 2),
+        }
@@ -0,0 +1,152 @@
+import os
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple, Any, Optional
+
+import numpy as np
+
+from src.face_recognition.detectors import STILL_DETECTOR, DetectorConfig, detect_faces
+
+logger = logging.getLogger("encoding_cache")
+
+# Constants
+FACES_DIR = Path("data/faces")
+CACHE_FILENAME = ".encodings_cache.pkl"
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_image(path: Path, detector: DetectorConfig = STILL_DETECTOR) -> Optional[np.ndarray]:
+    import face_recognition
+
+    image = face_recognition.load_image_file(str(path))
+    face_locations = detect_faces(image, detector)
+    if not face_locations:
+        return None
+    return face_recognition.face_encodings(image, face_locations)[0]
+
+
+def iter_face_images(faces_dir: Path):
+    for user_folder in sorted(faces_dir.iterdir()):
+        if user_folder.is_dir():
+            for img_path in sorted(user_folder.glob("*.jpg")):
+                yield user_folder.name, img_path
+
+
+class EncodingCache:
+    """Persistent per-image encodings stored next to the face images.
+
+    Entries are keyed by the image path relative to ``faces_dir`` and
+    validated against file size, mtime and SHA-1 of the content, so a
+    refresh only runs detection/encoding for new or changed photos.
+    """
+
+    def __init__(self, faces_dir: Path = FACES_DIR, cache_path: Optional[Path] = None):
+        self.faces_dir = Path(faces_dir)
+        self.cache_path = Path(cache_path) if cache_path else self.faces_dir / CACHE_FILENAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != CACHE_VERSION:
+                logger.info(f"Discarding encoding cache with version {data.get('version')}")
+                return
+            self.entries = data["entries"]
+        except Exception as e:
+            logger.warning(f"Could not read encoding cache {self.cache_path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "entries": self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self, encode_fn=encode_image) -> Dict[str, List[str]]:
+        stats = {"reused": [], "encoded": [], "removed": [], "failed": []}
+        if not self.faces_dir.exists():
+            stats["removed"] = list(self.entries)
+            self.entries = {}
+            return stats
+
+        seen = set()
+        dirty = False
+        for user_id, img_path in iter_face_images(self.faces_dir):
+            key = img_path.relative_to(self.faces_dir).as_posix()
+            seen.add(key)
+            try:
+                st_info = img_path.stat()
+                entry = self.entries.get(key)
+                if entry and entry["size"] == st_info.st_size and entry["mtime"] == st_info.st_mtime_ns:
+                    stats["reused"].append(key)
+                    continue
+
+                digest = file_digest(img_path)
+                if entry and entry["sha1"] == digest:
+                    # Touched but unchanged content: keep the encoding, refresh the stat key
+                    entry["size"], entry["mtime"] = st_info.st_size, st_info.st_mtime_ns
+                    stats["reused"].append(key)
+                    dirty = True
+                    continue
+
+                encoding = encode_fn(img_path)
+                self.entries[key] = {
+                    "user_id": user_id,
+                    "size": st_info.st_size,
+                    "mtime": st_info.st_mtime_ns,
+                    "sha1": digest,
+                    "encoding": None if encoding is None else np.asarray(encoding, dtype=np.float64),
+                }
+                stats["encoded"].append(key)
+                dirty = True
+            except Exception as e:
+                logger.warning(f"Skipping {img_path}: {e}")
+                stats["failed"].append(f"{img_path.name}: {e}")
+
+        for key in list(self.entries):
+            if key not in seen:
+                del self.entries[key]
+                stats["removed"].append(key)
+                dirty = True
+
+        if dirty:
+            self.save()
+        return stats
+
+    def put(self, img_path: Path, user_id: str, encoding: Optional[np.ndarray]):
+        """Record an encoding computed elsewhere (e.g. at enrollment) so refresh() reuses it; call save() after."""
+        img_path = Path(img_path)
+        st_info = img_path.stat()
+        self.entries[img_path.relative_to(self.faces_dir).as_posix()] = {
+            "user_id": user_id,
+            "size": st_info.st_size,
+            "mtime": st_info.st_mtime_ns,
+            "sha1": file_digest(img_path),
+            "encoding": None if encoding is None else np.asarray(encoding, dtype=np.float64),
+        }
+
+    def known_faces(self) -> Tuple[List[np.ndarray], List[str]]:
+        known_encodings = []
+        known_ids = []
+        for key in sorted(self.entries):
+            entry = self.entries[key]
+            if entry["encoding"] is not None:
+                known_encodings.append(entry["encoding"])
+                known_ids.append(entry["user_id"])
+        return known_encodings, known_ids
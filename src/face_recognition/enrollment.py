@@ -0,0 +1,387 @@
+import os
+import time
+import queue
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import weakref
+import zipfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.face_recognition.detectors import STILL_DETECTOR, DetectorConfig, detect_faces
+from src.face_recognition.encoding_cache import FACES_DIR, EncodingCache
+from src.face_recognition.model_store import MODEL_PATH, append_model, migrate_pickle, model_exists
+
+logger = logging.getLogger("enrollment")
+
+# Constants
+REJECTED_DIR = Path("data/faces_rejected")
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+ENROLL_WORKERS = min(4, os.cpu_count() or 1)
+COMMIT_BATCH = 256
+# The encoding cache is one pickle of every photo, so it is rewritten at most this often (and when idle)
+CACHE_SAVE_SECONDS = 10.0
+MAX_JOBS_KEPT = 1000
+DONE_STATUSES = ("enrolled", "rejected", "failed")
+
+
+@dataclass
+class EnrollmentJob:
+    job_id: int
+    user_id: str
+    path: Path
+    source: str
+    submitted_at: datetime
+    status: str = "queued"  # queued | enrolled | rejected | failed
+    message: str = ""
+    finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in DONE_STATUSES
+
+
+def encode_photo(path: Path, detector: DetectorConfig = STILL_DETECTOR) -> Tuple[str, str, Optional[np.ndarray]]:
+    """``("enrolled", ..., encoding)`` for a photo with exactly one face, else a rejection or failure reason."""
+    # Imported here so pages that only queue photos never load dlib; the workers do
+    import face_recognition
+
+    try:
+        image = face_recognition.load_image_file(str(path))
+        boxes = detect_faces(image, detector)
+        if not boxes:
+            return "rejected", "No face found", None
+        if len(boxes) > 1:
+            return "rejected", f"{len(boxes)} faces found; use a photo of this person alone", None
+        return "enrolled", "Encoded", np.asarray(face_recognition.face_encodings(image, boxes)[0])
+    except Exception as e:
+        return "failed", f"{type(e).__name__}: {e}", None
+
+
+class EnrollmentQueue:
+    """Validates and encodes enrollment photos in the background.
+
+    Workers detect and encode each photo; one committer thread then
+    appends the accepted encodings to the persistent model and, once that
+    has succeeded, adds them to every attached live gallery, in batches.
+    They are also recorded in the encoding cache, at most every
+    ``CACHE_SAVE_SECONDS`` and whenever the queue goes idle, so the next
+    camera start does not encode them again. Photos with no face or
+    several faces are moved to ``rejected_dir``.
+
+    The pool starts with one worker for single registrations and grows to
+    ``workers`` on the first bulk upload.
+    """
+
+    def __init__(self, faces_dir: Path = FACES_DIR, model_path: Path = MODEL_PATH, workers: int = ENROLL_WORKERS,
+                 processes: bool = True, detector: DetectorConfig = STILL_DETECTOR, rejected_dir: Path = REJECTED_DIR):
+        self.faces_dir = Path(faces_dir)
+        self.model_path = Path(model_path)
+        self.rejected_dir = Path(rejected_dir)
+        self.workers = max(1, workers)
+        self.processes = processes
+        self.detector = detector
+        self.stats = {"enrolled": 0, "rejected": 0, "failed": 0, "commits": 0}
+        self._jobs: "OrderedDict[int, EnrollmentJob]" = OrderedDict()
+        self._next_id = 1
+        self._photos = 0
+        self._galleries = weakref.WeakSet()
+        self._encoded = queue.Queue()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._executor_workers = 0
+        self._retired = []
+        self._committer: Optional[threading.Thread] = None
+        self._uncached: List[Tuple[EnrollmentJob, np.ndarray]] = []
+        self._cache_lock = threading.Lock()
+        self._cache_saved_at = time.monotonic()
+
+    def attach(self, gallery):
+        """Add future enrollments to ``gallery`` as well; held weakly, so a dropped gallery detaches itself."""
+        self._galleries.add(gallery)
+
+    def _start(self, workers: int):
+        # Called under _cond. Every spawned worker loads dlib, so a single registration starts just one
+        workers = min(workers, self.workers)
+        if self._executor is None or self._executor_workers < workers:
+            if self._executor is not None:
+                # Photos already queued there still finish; close() waits for them
+                self._executor.shutdown(wait=False)
+                self._retired.append(self._executor)
+            if self.processes:
+                # spawn, not fork: the caller (e.g. Streamlit) is multi-threaded
+                self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(workers, thread_name_prefix="enroll")
+            self._executor_workers = workers
+        if self._committer is None:
+            self._committer = threading.Thread(target=self._commit_loop, name="enroll-commit", daemon=True)
+            self._committer.start()
+
+    def _new_job(self, user_id: str, path: Path, source: str) -> EnrollmentJob:
+        # Called under _cond
+        job = EnrollmentJob(self._next_id, str(user_id), Path(path), source, datetime.now())
+        self._next_id += 1
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > MAX_JOBS_KEPT and next(iter(self._jobs.values())).done:
+            self._jobs.popitem(last=False)
+        return job
+
+    def submit(self, user_id: str, path: Path, source: str = "registration", bulk: bool = False) -> EnrollmentJob:
+        """Queue a photo that is already in ``faces_dir/<user_id>/``."""
+        with self._cond:
+            self._start(self.workers if bulk else 1)
+            job = self._new_job(user_id, path, source)
+            future = self._executor.submit(encode_photo, job.path, self.detector)
+        future.add_done_callback(lambda f, job=job: self._encoded.put((job, f)))
+        return replace(job)
+
+    def _save_photo(self, user_id: str, data: bytes) -> Path:
+        user_dir = self.faces_dir / str(user_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        with self._cond:
+            # The counter keeps names unique when a bulk upload holds many photos per second
+            self._photos += 1
+            path = user_dir / f"{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._photos}.jpg"
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def add_photo(self, user_id: str, data: bytes, source: str = "registration", bulk: bool = False) -> EnrollmentJob:
+        """Save ``data`` as a new photo of ``user_id`` and queue it."""
+        return self.submit(user_id, self._save_photo(user_id, data), source, bulk)
+
+    def check(self, data: bytes, timeout: Optional[float] = None) -> Tuple[str, str, Optional[np.ndarray]]:
+        """``encode_photo()`` for photo bytes on a worker, without enrolling anything.
+
+        Lets the register form refuse a photo before the user is saved;
+        the encoding then goes to ``add_encoded()`` once they are.
+        """
+        fd, tmp = tempfile.mkstemp(suffix=".jpg")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._cond:
+            self._start(1)
+            future = self._executor.submit(encode_photo, Path(tmp), self.detector)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            return "failed", f"The photo was not checked within {timeout:.0f}s; try again", None
+        except Exception as e:
+            return "failed", f"{type(e).__name__}: {e}", None
+        finally:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def add_encoded(self, user_id: str, data: bytes, encoding: np.ndarray, source: str = "registration") -> EnrollmentJob:
+        """Save ``data`` as a new photo of ``user_id`` and enroll the encoding ``check()`` already computed."""
+        path = self._save_photo(user_id, data)
+        future = Future()
+        future.set_result(("enrolled", "Encoded", encoding))
+        with self._cond:
+            self._start(1)
+            job = self._new_job(user_id, path, source)
+        self._encoded.put((job, future))
+        return replace(job)
+
+    def _commit_loop(self):
+        while True:
+            try:
+                batch = [self._encoded.get(timeout=CACHE_SAVE_SECONDS if self._uncached else None)]
+            except queue.Empty:
+                self._save_cache()
+                continue
+            while len(batch) < COMMIT_BATCH:
+                try:
+                    batch.append(self._encoded.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._commit(batch)
+            except Exception as e:
+                logger.error(f"Enrollment commit failed: {e}")
+                self._finish([(job, "failed", str(e)) for job, _ in batch])
+            if time.monotonic() - self._cache_saved_at >= CACHE_SAVE_SECONDS:
+                self._save_cache()
+
+    def _commit(self, batch: List[Tuple[EnrollmentJob, Future]]):
+        results, accepted = [], []
+        for job, future in batch:
+            try:
+                status, message, encoding = future.result()
+            except Exception as e:
+                status, message, encoding = "failed", f"{type(e).__name__}: {e}", None
+            if status == "enrolled":
+                accepted.append((job, encoding))
+            elif status == "rejected":
+                message = f"{message}; photo moved to {self._reject(job.path)}"
+            results.append((job, status, message))
+
+        if accepted:
+            # Without a trained model there is nothing to append to; train_model() builds it from data/faces.
+            # A pickle from before the versioned store is migrated first so its rows are kept.
+            migrate_pickle(self.model_path.with_suffix(".pkl"), self.model_path)
+            if model_exists(self.model_path):
+                append_model(self.model_path, [encoding for _, encoding in accepted], [job.user_id for job, _ in accepted])
+            # Only after the model took them, so a failed batch never matches in the running galleries
+            for gallery in list(self._galleries):
+                for job, encoding in accepted:
+                    gallery.add(job.user_id, [encoding])
+            with self._cache_lock:
+                self._uncached.extend(accepted)
+            self.stats["commits"] += 1
+            logger.info(f"Enrolled {len(accepted)} photos")
+        self._finish(results)
+
+    def _save_cache(self):
+        with self._cache_lock:
+            uncached, self._uncached = self._uncached, []
+            self._cache_saved_at = time.monotonic()
+            if not uncached:
+                return
+            try:
+                cache = EncodingCache(self.faces_dir)
+                for job, encoding in uncached:
+                    cache.put(job.path, job.user_id, encoding)
+                cache.save()
+            except Exception as e:
+                # Only a cache: the next camera start encodes these photos again
+                logger.warning(f"Could not record {len(uncached)} enrollments in the encoding cache: {e}")
+
+    def _reject(self, path: Path) -> Path:
+        target = self.rejected_dir / path.parent.name / path.name
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(path), str(target))
+        except OSError as e:
+            logger.warning(f"Could not move rejected photo {path}: {e}")
+            return path
+        return target
+
+    def _finish(self, results):
+        now = datetime.now()
+        with self._cond:
+            for job, status, message in results:
+                job.status, job.message, job.finished_at = status, message, now
+                self.stats[status] += 1
+                if status != "enrolled":
+                    logger.warning(f"{job.path.name} for {job.user_id}: {message}")
+            self._cond.notify_all()
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> Optional[EnrollmentJob]:
+        """The job once it is done, or as it stands when ``timeout`` runs out."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            job = self._jobs.get(job_id)
+            while job is not None and not job.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return replace(job) if job else None
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def jobs(self, limit: int = 50) -> List[EnrollmentJob]:
+        """Most recent jobs first, as copies."""
+        with self._cond:
+            return [replace(job) for job in list(self._jobs.values())[-limit:][::-1]]
+
+    def close(self):
+        for executor in self._retired + [self._executor]:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self._save_cache()
+
+
+def iter_bulk_photos(source) -> Iterator[Tuple[str, str, bytes]]:
+    """``(user_id, file name, bytes)`` from a folder or zip laid out as ``<user_id>/<photo>``."""
+    if not isinstance(source, (str, Path)) or not Path(source).is_dir():
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                member = PurePosixPath(info.filename)
+                if info.is_dir() or member.suffix.lower() not in IMAGE_EXTENSIONS or len(member.parts) < 2:
+                    continue
+                if member.parts[0] == "__MACOSX" or member.name.startswith("."):
+                    continue
+                yield member.parent.name, member.name, archive.read(info)
+        return
+    for path in sorted(Path(source).rglob("*")):
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS and path.parent != Path(source):
+            yield path.parent.name, path.name, path.read_bytes()
+
+
+def enroll_bulk(enrollment: EnrollmentQueue, source, known_user: Optional[Callable[[str], bool]] = None,
+                label: str = "bulk") -> Tuple[List[EnrollmentJob], List[str]]:
+    """Queue every photo in a folder or zip; photos of users ``known_user`` rejects are skipped."""
+    jobs, skipped = [], []
+    for user_id, name, data in iter_bulk_photos(source):
+        if known_user is not None and not known_user(user_id):
+            skipped.append(f"{user_id}/{name}: no registered user with this ID")
+            continue
+        jobs.append(enrollment.add_photo(user_id, data, source=label, bulk=True))
+    logger.info(f"Queued {len(jobs)} photos from {label}, skipped {len(skipped)}")
+    return jobs, skipped
+
+
+_shared: Optional[EnrollmentQueue] = None
+_shared_lock = threading.Lock()
+
+
+def shared_queue() -> EnrollmentQueue:
+    """The queue shared by every page and session of this process."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EnrollmentQueue()
+        return _shared
+
+
+def _registered(user_id: str) -> bool:
+    from src.db.db_handler import get_user_by_id
+
+    return get_user_by_id(user_id) is not None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Enroll face photos from a folder or zip laid out as <user_id>/<photo>")
+    parser.add_argument("source", type=Path)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--allow-unknown", action="store_true", help="enroll photos of IDs missing from the user table")
+    args = parser.parse_args()
+
+    enrollment = EnrollmentQueue(workers=args.workers)
+    started = time.perf_counter()
+    jobs, skipped = enroll_bulk(enrollment, args.source, None if args.allow_unknown else _registered, args.source.name)
+    for line in skipped:
+        print(f"Skipped {line}")
+    while not enrollment.wait_all(timeout=5):
+        print(f"{len(jobs) - enrollment.pending()}/{len(jobs)} done")
+    enrollment.close()
+    print(f"{enrollment.stats['enrolled']} enrolled, {enrollment.stats['rejected']} rejected, "
+          f"{enrollment.stats['failed']} failed in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,165 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.face_recognition.index import ExactIndex
+
+# Constants
+ENCODING_DIM = 128
+INITIAL_CAPACITY = 1024
+# Extra candidates re-scored exactly after the fast float32 pass, so rounding in
+# the |q|^2 + |g|^2 - 2qg expansion can never change which neighbours win.
+REFINE_MARGIN = 8
+
+
+class FaceGallery:
+    """All known encodings in one contiguous float32 (N x 128) matrix.
+
+    Rows live in a preallocated buffer that grows geometrically; squared norms
+    are kept alongside so a whole frame of faces is matched with one matrix
+    product. Removing a user moves rows from the tail into the freed slots
+    instead of rebuilding the matrix. Candidate search is delegated to
+    ``index`` (brute force by default, see ``src.face_recognition.index``).
+    """
+
+    def __init__(self, dim: int = ENCODING_DIM, capacity: int = INITIAL_CAPACITY):
+        self.dim = dim
+        self._matrix = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self._sq_norms = np.zeros(max(capacity, 1), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, List[int]] = {}
+        self._lock = threading.RLock()
+        self.index = ExactIndex()
+
+    @classmethod
+    def from_encodings(cls, encodings: Sequence[np.ndarray], ids: Sequence[str], dim: int = ENCODING_DIM) -> "FaceGallery":
+        gallery = cls(dim=dim, capacity=max(len(encodings), INITIAL_CAPACITY))
+        if len(encodings):
+            gallery._append(np.asarray(encodings, dtype=np.float32).reshape(-1, dim), [str(i) for i in ids])
+        return gallery
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray, ids: Sequence[str]) -> "FaceGallery":
+        """Adopt an (N x dim) float32 array, e.g. a ModelReader memmap, without copying it.
+
+        The buffer is only copied once the gallery has to grow past N rows.
+        """
+        gallery = cls(dim=matrix.shape[1], capacity=1)
+        if len(ids):
+            gallery._matrix = matrix if matrix.dtype == np.float32 else matrix.astype(np.float32)
+            gallery._sq_norms = np.einsum("ij,ij->i", gallery._matrix, gallery._matrix).astype(np.float32)
+            gallery._ids = [str(i) for i in ids]
+            for row, user_id in enumerate(gallery._ids):
+                gallery._rows.setdefault(user_id, []).append(row)
+        return gallery
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._rows
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:len(self._ids)]
+
+    @property
+    def sq_norms(self) -> np.ndarray:
+        return self._sq_norms[:len(self._ids)]
+
+    def user_ids(self) -> List[str]:
+        return list(self._rows)
+
+    def _reserve(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        size = len(self._ids)
+        matrix[:size] = self._matrix[:size]
+        sq_norms[:size] = self._sq_norms[:size]
+        self._matrix, self._sq_norms = matrix, sq_norms
+
+    def _append(self, rows: np.ndarray, ids: List[str]):
+        start = len(self._ids)
+        end = start + len(ids)
+        self._reserve(end)
+        self._matrix[start:end] = rows
+        self._sq_norms[start:end] = np.einsum("ij,ij->i", rows, rows)
+        for offset, user_id in enumerate(ids):
+            self._rows.setdefault(user_id, []).append(start + offset)
+        self._ids.extend(ids)
+        self.index.add_rows(start, rows)
+
+    def add(self, user_id: str, encodings: Iterable[np.ndarray]):
+        rows = np.asarray(list(encodings), dtype=np.float32).reshape(-1, self.dim)
+        if not len(rows):
+            return
+        with self._lock:
+            self._append(rows, [str(user_id)] * len(rows))
+
+    def remove(self, user_id: str) -> int:
+        with self._lock:
+            rows = self._rows.pop(str(user_id), [])
+            # Fill holes from the highest index down so every moved row comes from the tail
+            for row in sorted(rows, reverse=True):
+                last = len(self._ids) - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._sq_norms[row] = self._sq_norms[last]
+                    self._ids[row] = moved_id
+                    moved_rows = self._rows[moved_id]
+                    moved_rows[moved_rows.index(last)] = row
+                    self.index.move_row(last, row)
+                self._ids.pop()
+                self.index.truncate(len(self._ids))
+            return len(rows)
+
+    def replace(self, user_id: str, encodings: Iterable[np.ndarray]):
+        with self._lock:
+            self.remove(user_id)
+            self.add(user_id, encodings)
+
+    def distances(self, encodings: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        matrix = self.matrix if rows is None else self._matrix[rows]
+        sq_norms = self.sq_norms if rows is None else self._sq_norms[rows]
+        sq = np.einsum("ij,ij->i", queries, queries)[:, None] + sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def match(self, encodings: Sequence[np.ndarray], k: int = 1) -> Tuple[List[List[str]], np.ndarray]:
+        """Top-k gallery IDs and Euclidean distances for every query encoding.
+
+        Returns ``(ids, distances)`` where ``ids[i]`` holds up to ``k`` IDs for
+        query ``i`` and ``distances`` is an (M x k) array, padded with ``inf``
+        when the gallery has fewer than ``k`` rows.
+        """
+        queries = np.asarray(encodings, dtype=np.float64).reshape(-1, self.dim)
+        with self._lock:
+            size = len(self._ids)
+            out_dist = np.full((len(queries), k), np.inf)
+            out_ids: List[List[str]] = [[] for _ in range(len(queries))]
+            if size == 0 or len(queries) == 0:
+                return out_ids, out_dist
+
+            pool = min(size, k + REFINE_MARGIN)
+            candidates = self.index.candidates(self, queries, pool)
+
+            for qi, query in enumerate(queries):
+                cand = np.sort(candidates[qi])
+                # Exact float64 distances, matching face_recognition.face_distance
+                exact = np.linalg.norm(self._matrix[cand].astype(np.float64) - query, axis=1)
+                order = np.argsort(exact, kind="stable")[:k]
+                out_dist[qi, :len(order)] = exact[order]
+                out_ids[qi] = [self._ids[cand[j]] for j in order]
+            return out_ids, out_dist
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from src.face_recognition.model_store import MODEL_PATH, open_model
+
+logger = logging.getLogger("face_index")
+
+# Constants
+INDEX_PATH = Path("data/model/face_index.npz")
+INDEX_VERSION = 1
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 20
+KMEANS_SAMPLES_PER_LIST = 256
+ASSIGN_CHUNK = 16384
+
+
+def _sq_distances(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    sq = (np.einsum("ij,ij->i", points, points)[:, None]
+          + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+          - 2.0 * (points @ centroids.T))
+    return np.maximum(sq, 0.0, out=sq)
+
+
+def assign(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(points), dtype=np.int32)
+    for start in range(0, len(points), ASSIGN_CHUNK):
+        chunk = points[start:start + ASSIGN_CHUNK]
+        labels[start:start + len(chunk)] = np.argmin(_sq_distances(chunk, centroids), axis=1)
+    return labels
+
+
+def kmeans(points: np.ndarray, n_clusters: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    points = np.asarray(points, dtype=np.float32)
+    n_clusters = max(1, min(n_clusters, len(points)))
+    sample_size = min(len(points), n_clusters * KMEANS_SAMPLES_PER_LIST)
+    sample = points[rng.choice(len(points), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = assign(sample, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty lists on random sample points so every list stays useful
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+    return centroids
+
+
+def fingerprint(matrix: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(matrix, dtype=np.float32).tobytes()).hexdigest()
+
+
+class ExactIndex:
+    """Brute force over every gallery row; the default and the recall reference."""
+
+    name = "exact"
+
+    def candidates(self, gallery, queries: np.ndarray, pool: int) -> List[np.ndarray]:
+        size = len(gallery)
+        if pool >= size:
+            return [np.arange(size)] * len(queries)
+        approx = gallery.distances(queries)
+        return list(np.argpartition(approx, pool - 1, axis=1)[:, :pool])
+
+    def add_rows(self, start: int, rows: np.ndarray):
+        pass
+
+    def move_row(self, src: int, dst: int):
+        pass
+
+    def truncate(self, size: int):
+        pass
+
+
+class IVFIndex:
+    """Inverted-file index: k-means partitions of the gallery, probed per query.
+
+    ``nprobe`` is the recall-vs-speed setting: each query is only compared
+    with rows in its ``nprobe`` nearest partitions. ``nprobe == nlist``
+    gives the same answers as :class:`ExactIndex`.
+    """
+
+    name = "ivf"
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = DEFAULT_NPROBE):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self.labels = np.empty(0, dtype=np.int32)
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE, seed: int = 0) -> "IVFIndex":
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(matrix))))
+        index = cls(kmeans(matrix, nlist, seed=seed), nprobe=nprobe)
+        index.labels = assign(matrix, index.centroids)
+        return index
+
+    def attach(self, gallery):
+        # Centroids are a coarse quantizer, so they stay usable for a gallery
+        # that has drifted from the one they were trained on; only labels change.
+        if len(self.labels) != len(gallery):
+            self.labels = assign(gallery.matrix, self.centroids)
+            self._order = None
+        gallery.index = self
+        return self
+
+    def add_rows(self, start: int, rows: np.ndarray):
+        labels = assign(np.asarray(rows, dtype=np.float32), self.centroids)
+        self.labels = np.concatenate([self.labels[:start], labels])
+        self._order = None
+
+    def move_row(self, src: int, dst: int):
+        self.labels[dst] = self.labels[src]
+        self._order = None
+
+    def truncate(self, size: int):
+        self.labels = self.labels[:size]
+        self._order = None
+
+    def _lists(self):
+        if self._order is None:
+            self._order = np.argsort(self.labels, kind="stable")
+            self._offsets = np.concatenate([[0], np.cumsum(np.bincount(self.labels, minlength=self.nlist))])
+        return self._order, self._offsets
+
+    def candidates(self, gallery, queries: np.ndarray, pool: int) -> List[np.ndarray]:
+        order, offsets = self._lists()
+        nprobe = min(self.nprobe, self.nlist)
+        probe_dist = _sq_distances(np.asarray(queries, dtype=np.float32), self.centroids)
+        probes = np.argpartition(probe_dist, nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for qi, lists in enumerate(probes):
+            rows = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in lists])
+            if len(rows) > pool:
+                approx = gallery.distances(queries[qi], rows=rows)[0]
+                rows = rows[np.argpartition(approx, pool - 1)[:pool]]
+            results.append(rows)
+        return results
+
+    def save(self, path: Path, gallery=None):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                version=INDEX_VERSION,
+                centroids=self.centroids,
+                labels=self.labels,
+                nprobe=self.nprobe,
+                fingerprint="" if gallery is None else fingerprint(gallery.matrix),
+            )
+        logger.info(f"Saved IVF index ({self.nlist} lists) to {path}")
+
+    @classmethod
+    def load(cls, path: Path, gallery=None, nprobe: Optional[int] = None) -> "IVFIndex":
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"Unsupported index version {int(data['version'])}")
+            index = cls(data["centroids"], nprobe=int(data["nprobe"]) if nprobe is None else nprobe)
+            stored_fingerprint = str(data["fingerprint"])
+            labels = data["labels"]
+        if gallery is not None:
+            if stored_fingerprint and len(labels) == len(gallery) and stored_fingerprint == fingerprint(gallery.matrix):
+                index.labels = labels.astype(np.int32)
+            index.attach(gallery)
+        return index
+
+
+def load_index(path: Path, gallery, nprobe: Optional[int] = None):
+    """Attach the persisted IVF index to ``gallery`` if one exists, else keep brute force."""
+    path = Path(path)
+    if not path.exists():
+        return gallery.index
+    try:
+        return IVFIndex.load(path, gallery, nprobe=nprobe)
+    except Exception as e:
+        logger.warning(f"Ignoring face index {path}: {e}")
+        return gallery.index
+
+
+def build_index_from_model(model_path: Path = MODEL_PATH, index_path: Path = INDEX_PATH,
+                           nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE) -> IVFIndex:
+    from src.face_recognition.gallery import FaceGallery
+
+    model = open_model(model_path)
+    gallery = FaceGallery.from_matrix(model.encodings, model.ids)
+    index = IVFIndex.build(gallery.matrix, nlist=nlist, nprobe=nprobe)
+    index.save(index_path, gallery)
+    return index
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build the approximate (IVF) face index from the trained model")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--output", type=Path, default=INDEX_PATH)
+    parser.add_argument("--nlist", type=int, default=None, help="number of partitions (default 4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="partitions searched per face; higher = better recall, slower")
+    args = parser.parse_args()
+    built = build_index_from_model(args.model, args.output, nlist=args.nlist, nprobe=args.nprobe)
+    print(f"✅ Index with {built.nlist} lists saved to {args.output}")
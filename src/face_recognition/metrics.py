@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+logger = logging.getLogger("metrics")
+
+# Constants
+METRICS_DIR = Path("data/logs")
+METRICS_PREFIX = "attendance"
+# Seconds, roughly x2 apart from 50 µs to 10 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+STAGES = ("capture", "convert", "detect", "encode", "encode_wait", "match", "lookup", "draw", "display", "frame")
+
+
+class Histogram:
+    """Fixed-bucket histogram: one bisect and a few additions per observation."""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        bucket = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.sum += value
+            self.count += 1
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation, kept within min..max."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bucket, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[bucket - 1] if bucket else 0.0
+                upper = self.bounds[bucket] if bucket < len(self.bounds) else self.bounds[-1]
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                return min(self.max, max(self.min, estimate))
+            seen += count
+        return self.max
+
+    def summary(self, scale: float = 1.0) -> dict:
+        return {
+            "count": self.count,
+            "mean": scale * self.sum / self.count if self.count else 0.0,
+            "p50": scale * self.quantile(0.50),
+            "p95": scale * self.quantile(0.95),
+            "p99": scale * self.quantile(0.99),
+        }
+
+
+class _Stage:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Metrics:
+    """Per-stage latency histograms, counters and count distributions for the recognition pipeline.
+
+    Disabled, ``stage()`` hands back one shared no-op context manager and
+    ``inc()``/``observe()`` return after a single attribute check, so the
+    instrumentation can stay in the hot loop.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.distributions: Dict[str, Histogram] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: Dict[str, Histogram], name: str, bounds: Sequence[float]) -> Histogram:
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, Histogram(bounds))
+        return histogram
+
+    def stage(self, name: str):
+        """``with METRICS.stage("detect"): ...`` times the block into the ``detect`` histogram."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self._histogram(self.stages, name, LATENCY_BUCKETS))
+
+    def observe_stage(self, name: str, seconds: float):
+        if self.enabled:
+            self._histogram(self.stages, name, LATENCY_BUCKETS).observe(seconds)
+
+    def observe(self, name: str, value: float, bounds: Sequence[float] = COUNT_BUCKETS):
+        if self.enabled:
+            self._histogram(self.distributions, name, bounds).observe(value)
+
+    def inc(self, name: str, amount: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_frame(self, faces: int, matched: int):
+        """Count one processed frame with ``faces`` faces, ``matched`` of them recognized."""
+        if self.enabled:
+            self.inc("frames")
+            self.inc("faces", faces)
+            self.inc("matches", matched)
+            self.inc("unknowns", faces - matched)
+            self.observe("faces_per_frame", faces)
+
+    def reset(self):
+        with self._lock:
+            self.stages, self.counters, self.distributions = {}, {}, {}
+            self.started_at = time.time()
+
+    def _tables(self):
+        # Copied under the lock: other threads add stages and counters while a report iterates them
+        with self._lock:
+            return dict(self.stages), dict(self.counters), dict(self.distributions), self.started_at
+
+    def snapshot(self) -> dict:
+        """Stage latencies in milliseconds, counters and distributions, JSON-ready."""
+        stages, counters, distributions, started_at = self._tables()
+        ordered = sorted(stages, key=lambda name: (STAGES.index(name) if name in STAGES else len(STAGES), name))
+        return {
+            "enabled": self.enabled,
+            "since": datetime.fromtimestamp(started_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "stages_ms": {name: stages[name].summary(scale=1000) for name in ordered},
+            "counters": dict(sorted(counters.items())),
+            "distributions": {name: histogram.summary() for name, histogram in sorted(distributions.items())},
+        }
+
+    def to_prometheus(self, prefix: str = METRICS_PREFIX) -> str:
+        stages, counters, distributions, _ = self._tables()
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        for name, histogram in stages.items():
+            lines.extend(_prometheus_histogram(f"{prefix}_stage_seconds", histogram, f'stage="{name}"'))
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, histogram in sorted(distributions.items()):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            lines.extend(_prometheus_histogram(f"{prefix}_{name}", histogram))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> Path:
+        """Write ``.json`` as a snapshot, anything else (``.prom``, ``.txt``) as Prometheus text."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(self.snapshot(), indent=2) if path.suffix == ".json" else self.to_prometheus()
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
+
+
+def _prometheus_histogram(name: str, histogram: Histogram, labels: str = "") -> list:
+    with histogram._lock:
+        counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+    separator = "," if labels else ""
+    lines, cumulative = [], 0
+    for bound, bucket_count in zip(list(histogram.bounds) + ["+Inf"], counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {total}")
+    lines.append(f"{name}_count{suffix} {count}")
+    return lines
+
+
+# Process-wide registry; ATTENDANCE_METRICS=1 turns it on from the start
+METRICS = Metrics(enabled=os.environ.get("ATTENDANCE_METRICS") == "1")
+
+
+def metrics_path(fmt: str = "json", directory: Optional[Path] = None) -> Path:
+    return Path(directory or METRICS_DIR) / f"metrics.{'json' if fmt == 'json' else 'prom'}"
@@ -0,0 +1,276 @@
+import os
+import time
+import pickle
+import struct
+import zlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.db.attendance_writer import directory_lock
+
+logger = logging.getLogger("model_store")
+
+# Paths
+MODEL_PATH = Path("data/model/face_encodings.bin")
+LEGACY_MODEL_PATH = Path("data/model/face_encodings.pkl")
+
+# On-disk layout of MODEL_PATH:
+#   64-byte header: magic, version, dim, count, crc32 of the encodings block
+#   count x dim little-endian float32 encodings, row-major
+# Row IDs live in a sibling ".ids" file, one UTF-8 ID per line, in row order.
+# write_model() and append_model() never modify a data file in place: they write
+# a new version (face_encodings.<timestamp>.bin/.ids) and switch the ".current"
+# pointer beside MODEL_PATH to it, since readers keep the old version memory-mapped.
+# Both hold the model directory's lock from reading ".current" to switching it,
+# since the trainer, the enrollment CLI and every app process may write.
+MAGIC = b"FACEENC\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQI")
+HEADER_SIZE = 64
+ENCODING_DIM = 128
+DTYPE = np.dtype("<f4")
+VERSIONS_KEPT = 2
+REPLACE_ATTEMPTS = 5
+COPY_CHUNK_BYTES = 1 << 20
+
+
+class ModelFormatError(Exception):
+    pass
+
+
+def ids_path_for(path: Path) -> Path:
+    return Path(path).with_suffix(".ids")
+
+
+def current_path_for(path: Path) -> Path:
+    return Path(path).with_suffix(".current")
+
+
+def resolve_model(path: Path) -> Path:
+    """The data file ``path`` refers to: the version named by its ``.current`` pointer, else ``path`` itself."""
+    path = Path(path)
+    try:
+        name = current_path_for(path).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return path
+    return path.with_name(name) if name else path
+
+
+def model_exists(path: Path) -> bool:
+    return resolve_model(path).exists()
+
+
+def _replace(src: Path, dst: Path):
+    # On Windows the pointer cannot be replaced while a reader has it open; readers only hold it briefly
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def _prune_versions(path: Path, current: Path):
+    versions = sorted(path.parent.glob(f"{path.stem}.*{path.suffix}"))
+    stale = [version for version in versions if version != current][:max(0, len(versions) - VERSIONS_KEPT)]
+    for version in stale:
+        for old in (version, ids_path_for(version)):
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Still mapped by a reader on Windows; the next write tries again
+                logger.info(f"Keeping old model version {old} for now: {e}")
+
+
+def _pack_header(dim: int, count: int, checksum: int) -> bytes:
+    return HEADER.pack(MAGIC, FORMAT_VERSION, dim, count, checksum).ljust(HEADER_SIZE, b"\x00")
+
+
+def read_header(path: Path) -> Tuple[int, int, int]:
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ModelFormatError(f"{path} is too short to be an encoding store")
+    magic, version, dim, count, checksum = HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ModelFormatError(f"{path} is not an encoding store")
+    if version != FORMAT_VERSION:
+        raise ModelFormatError(f"{path} has unsupported format version {version}")
+    return dim, count, checksum
+
+
+def _read_ids(path: Path, count: int) -> List[str]:
+    with open(ids_path_for(path), "r", encoding="utf-8") as f:
+        ids = f.read().split("\n")[:count]
+    if len(ids) != count:
+        raise ModelFormatError(f"{ids_path_for(path)} has {len(ids)} IDs, expected {count}")
+    return ids
+
+
+def _as_rows(encodings: Sequence[np.ndarray], dim: int) -> np.ndarray:
+    if len(encodings) == 0:
+        return np.empty((0, dim), dtype=DTYPE)
+    return np.ascontiguousarray(np.asarray(encodings, dtype=DTYPE).reshape(-1, dim))
+
+
+def _new_version(path: Path) -> Path:
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    target = path.with_name(f"{path.stem}.{stamp}{path.suffix}")
+    suffix = 0
+    while target.exists():
+        suffix += 1
+        target = path.with_name(f"{path.stem}.{stamp}-{suffix}{path.suffix}")
+    return target
+
+
+def _switch_current(path: Path, target: Path):
+    # The pointer switch is the commit point; a crash before it leaves the previous version current
+    tmp_current = current_path_for(path).with_name(current_path_for(path).name + ".tmp")
+    with open(tmp_current, "w", encoding="utf-8") as f:
+        f.write(target.name)
+    _replace(tmp_current, current_path_for(path))
+    _prune_versions(path, target)
+
+
+def write_model(path: Path, encodings: Sequence[np.ndarray], ids: Sequence[str], dim: int = ENCODING_DIM):
+    path = Path(path)
+    rows = _as_rows(encodings, dim)
+    if len(rows) != len(ids):
+        raise ValueError(f"{len(rows)} encodings but {len(ids)} IDs")
+    with directory_lock(path.parent):
+        _write_version(path, rows, ids)
+
+
+def _write_version(path: Path, rows: np.ndarray, ids: Sequence[str]):
+    # Called under the model directory's lock
+    data = rows.tobytes()
+    target = _new_version(path)
+    with open(ids_path_for(target), "w", encoding="utf-8", newline="\n") as f:
+        f.write("".join(f"{user_id}\n" for user_id in ids))
+        f.flush()
+        os.fsync(f.fileno())
+    with open(target, "wb") as f:
+        f.write(_pack_header(rows.shape[1], len(rows), zlib.crc32(data)))
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    _switch_current(path, target)
+
+
+def append_model(path: Path, encodings: Sequence[np.ndarray], ids: Sequence[str]):
+    """Add rows as a new version: the current rows are copied, ours appended, then ``.current`` switches.
+
+    The current version is never modified, so readers that have it mapped
+    keep a consistent view until their next ``refresh()``. Writers in other
+    processes wait on the model directory's lock, so each one starts from
+    the version the previous one switched to.
+    """
+    path = Path(path)
+    with directory_lock(path.parent):
+        if not model_exists(path):
+            rows = _as_rows(encodings, ENCODING_DIM)
+            if len(rows) != len(ids):
+                raise ValueError(f"{len(rows)} encodings but {len(ids)} IDs")
+            _write_version(path, rows, ids)
+            return
+        current = resolve_model(path)
+        dim, count, checksum = read_header(current)
+        rows = _as_rows(encodings, dim)
+        if len(rows) != len(ids):
+            raise ValueError(f"{len(rows)} encodings but {len(ids)} IDs")
+        if not len(rows):
+            return
+        data = rows.tobytes()
+
+        target = _new_version(path)
+        with open(ids_path_for(target), "w", encoding="utf-8", newline="\n") as f:
+            f.write("".join(f"{user_id}\n" for user_id in _read_ids(current, count) + list(ids)))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(current, "rb") as src, open(target, "wb") as f:
+            f.write(_pack_header(dim, count + len(rows), zlib.crc32(data, checksum)))
+            src.seek(HEADER_SIZE)
+            remaining = count * dim * DTYPE.itemsize
+            while remaining:
+                chunk = src.read(min(remaining, COPY_CHUNK_BYTES))
+                if not chunk:
+                    raise ModelFormatError(f"{current} is shorter than its header says")
+                f.write(chunk)
+                remaining -= len(chunk)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _switch_current(path, target)
+
+
+def migrate_pickle(legacy_path: Path = LEGACY_MODEL_PATH, path: Path = MODEL_PATH) -> bool:
+    legacy_path, path = Path(legacy_path), Path(path)
+    if model_exists(path) or not legacy_path.exists():
+        return False
+    with open(legacy_path, "rb") as f:
+        model = pickle.load(f)
+    write_model(path, model["encodings"], model["ids"])
+    logger.info(f"Migrated {len(model['ids'])} encodings from {legacy_path} to {path}")
+    return True
+
+
+class ModelReader:
+    """Read-only view of an encoding store backed by ``np.memmap``.
+
+    The encodings are mapped copy-on-write, so every process on the host
+    shares the same page-cache pages and nothing is copied until a caller
+    writes to the array. ``refresh()`` switches to the new version written
+    by ``write_model`` or ``append_model``.
+    """
+
+    def __init__(self, path: Path = MODEL_PATH, verify: bool = False):
+        self.path = Path(path)
+        self.encodings = np.empty((0, ENCODING_DIM), dtype=DTYPE)
+        self.ids: List[str] = []
+        self.dim = ENCODING_DIM
+        self.checksum = 0
+        self._load()
+        if verify:
+            self.verify()
+
+    def _load(self):
+        self.data_path = resolve_model(self.path)
+        self.dim, count, self.checksum = read_header(self.data_path)
+        self.ids = _read_ids(self.data_path, count)
+        if count:
+            self.encodings = np.memmap(self.data_path, dtype=DTYPE, mode="c", offset=HEADER_SIZE, shape=(count, self.dim))
+        else:
+            self.encodings = np.empty((0, self.dim), dtype=DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def refresh(self) -> bool:
+        if resolve_model(self.path) != self.data_path:
+            self._load()
+            return True
+        _, count, checksum = read_header(self.data_path)
+        if count == len(self.ids) and checksum == self.checksum:
+            return False
+        self._load()
+        return True
+
+    def verify(self):
+        with open(self.data_path, "rb") as f:
+            f.seek(HEADER_SIZE)
+            data = f.read(len(self.ids) * self.dim * DTYPE.itemsize)
+        if zlib.crc32(data) != self.checksum:
+            raise ModelFormatError(f"Checksum mismatch in {self.data_path}")
+
+
+def open_model(path: Path = MODEL_PATH, legacy_path: Path = LEGACY_MODEL_PATH) -> ModelReader:
+    migrate_pickle(legacy_path, path)
+    return ModelReader(path)
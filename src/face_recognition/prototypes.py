@@ -0,0 +1,243 @@
+import time
+import logging
+import argparse
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.model_store import ENCODING_DIM, MODEL_PATH, open_model, write_model
+
+logger = logging.getLogger("prototypes")
+
+# Constants
+MATCH_TOLERANCE = 0.5
+KMEDOIDS_ITERATIONS = 10
+HOLDOUT = 0.3
+UNKNOWN_USERS = 0.1
+
+
+@dataclass
+class PrototypeConfig:
+    max_medoids: int = 3            # photos kept next to the mean for a user whose photos vary a lot
+    spread: float = 0.3             # mean distance from the user's mean above which medoids are kept
+    outlier_distance: float = 0.5   # photos farther than this from the user's medoid are flagged and dropped
+    min_photos_for_outliers: int = 3
+
+
+@dataclass
+class Outlier:
+    user_id: str
+    label: str
+    distance: float
+
+
+@dataclass
+class CompactedGallery:
+    encodings: np.ndarray
+    ids: List[str]
+    outliers: List[Outlier]
+    original_size: int
+
+    @property
+    def ratio(self) -> float:
+        return len(self.ids) / self.original_size if self.original_size else 1.0
+
+
+def pairwise_distances(points: np.ndarray) -> np.ndarray:
+    sq = np.einsum("ij,ij->i", points, points)
+    distances = sq[:, None] + sq[None, :] - 2.0 * (points @ points.T)
+    return np.sqrt(np.maximum(distances, 0.0, out=distances), out=distances)
+
+
+def kmedoids(distances: np.ndarray, k: int, iterations: int = KMEDOIDS_ITERATIONS) -> np.ndarray:
+    """Row numbers of ``k`` medoids for an (n x n) distance matrix: greedy build, then alternating updates."""
+    k = max(1, min(k, len(distances)))
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    while len(medoids) < k:
+        # The point that most reduces everyone's distance to their nearest medoid
+        nearest = distances[:, medoids].min(axis=1)
+        gain = np.maximum(nearest[:, None] - distances, 0.0).sum(axis=0)
+        gain[medoids] = -1.0
+        medoids.append(int(np.argmax(gain)))
+
+    medoids = np.array(medoids)
+    for _ in range(iterations):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(labels == cluster)
+            if len(members):
+                updated[cluster] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return medoids
+
+
+def compact_user(encodings: np.ndarray, config: PrototypeConfig = PrototypeConfig()) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(prototypes, outlier_rows, outlier_distances)`` for one user's (n x 128) encodings.
+
+    Photos farther than ``outlier_distance`` from the user's medoid would not
+    match the user's own center at the live threshold, so they are dropped
+    (usually a wrong face or a mislabelled photo). The rest collapse to their
+    mean, or to the mean plus ``max_medoids`` k-medoids when they are spread
+    out, e.g. with and without glasses.
+    """
+    encodings = np.asarray(encodings, dtype=np.float64)
+    none = np.empty(0, dtype=np.int64)
+    if len(encodings) < 2:
+        return encodings, none, np.empty(0)
+
+    distances = pairwise_distances(encodings)
+    from_medoid = distances[np.argmin(distances.sum(axis=1))]
+    outliers = none
+    if len(encodings) >= config.min_photos_for_outliers:
+        outliers = np.flatnonzero(from_medoid > config.outlier_distance)
+    inliers = np.setdiff1d(np.arange(len(encodings)), outliers)
+
+    members = encodings[inliers]
+    mean = members.mean(axis=0)
+    if config.max_medoids <= 0 or np.linalg.norm(members - mean, axis=1).mean() <= config.spread:
+        prototypes = mean[None, :]
+    elif len(inliers) <= config.max_medoids + 1:
+        prototypes = members
+    else:
+        medoids = kmedoids(distances[np.ix_(inliers, inliers)], config.max_medoids)
+        prototypes = np.vstack([mean, members[medoids]])
+    return prototypes, outliers, from_medoid[outliers]
+
+
+def compact(encodings: Sequence[np.ndarray], ids: Sequence[str], labels: Optional[Sequence[str]] = None,
+            config: PrototypeConfig = PrototypeConfig()) -> CompactedGallery:
+    """Reduce every user's encodings to prototypes; ``labels`` (e.g. photo paths) name the flagged outliers."""
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+    rows: Dict[str, List[int]] = {}
+    for row, user_id in enumerate(ids):
+        rows.setdefault(str(user_id), []).append(row)
+
+    blocks, out_ids, outliers = [], [], []
+    for user_id, user_rows in rows.items():
+        prototypes, outlier_rows, outlier_distances = compact_user(encodings[user_rows], config)
+        blocks.append(prototypes)
+        out_ids.extend([user_id] * len(prototypes))
+        for row, distance in zip(outlier_rows, outlier_distances):
+            source = user_rows[row]
+            outliers.append(Outlier(user_id, str(labels[source]) if labels is not None else f"row {source}", float(distance)))
+
+    matrix = np.vstack(blocks) if blocks else np.empty((0, encodings.shape[1]))
+    return CompactedGallery(matrix, out_ids, outliers, len(ids))
+
+
+def _holdout_split(ids: np.ndarray, holdout: float, unknown_users: float, rng) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Whole users held out play strangers; of the rest, users with 2+ photos give some photos up as probes
+    users = np.unique(ids)
+    strangers = set(rng.choice(users, size=int(len(users) * unknown_users), replace=False)) if len(users) > 1 else set()
+    enrolled, known_probes, unknown_probes = [], [], []
+    for user_id in users:
+        user_rows = rng.permutation(np.flatnonzero(ids == user_id))
+        if user_id in strangers:
+            unknown_probes.extend(user_rows)
+        elif len(user_rows) < 2:
+            enrolled.extend(user_rows)
+        else:
+            count = min(len(user_rows) - 1, max(1, int(round(holdout * len(user_rows)))))
+            known_probes.extend(user_rows[:count])
+            enrolled.extend(user_rows[count:])
+    return np.array(enrolled, dtype=np.int64), np.array(known_probes, dtype=np.int64), np.array(unknown_probes, dtype=np.int64)
+
+
+def _score(gallery: FaceGallery, probes: np.ndarray, truth: List[Optional[str]], tolerance: float) -> Dict[str, float]:
+    started = time.perf_counter()
+    match_ids, match_distances = gallery.match(probes, k=1)
+    elapsed = time.perf_counter() - started
+    predicted = [ids[0] if ids and match_distances[i, 0] < tolerance else None for i, ids in enumerate(match_ids)]
+    known = [(p, t) for p, t in zip(predicted, truth) if t is not None]
+    unknown = [p for p, t in zip(predicted, truth) if t is None]
+    return {
+        "rows": len(gallery),
+        "mb": round(len(gallery) * gallery.dim * 4 / 1e6, 3),
+        "accuracy": round(sum(p == t for p, t in known) / len(known), 4) if known else float("nan"),
+        "misidentified": sum(p is not None and p != t for p, t in known),
+        "rejected": sum(p is None for p, _ in known),
+        "strangers_accepted": sum(p is not None for p in unknown),
+        "match_ms_per_probe": round(1000 * elapsed / len(probes), 4) if len(probes) else 0.0,
+    }
+
+
+def evaluate(encodings: Sequence[np.ndarray], ids: Sequence[str], config: PrototypeConfig = PrototypeConfig(),
+             tolerance: float = MATCH_TOLERANCE, holdout: float = HOLDOUT, unknown_users: float = UNKNOWN_USERS,
+             seed: int = 0) -> Dict:
+    """Gallery size and accuracy of every photo vs per-user prototypes, on held-out photos at ``tolerance``."""
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+    ids = np.array([str(i) for i in ids])
+    enrolled, known_probes, unknown_probes = _holdout_split(ids, holdout, unknown_users, np.random.default_rng(seed))
+    probes = np.concatenate([encodings[known_probes], encodings[unknown_probes]])
+    truth = list(ids[known_probes]) + [None] * len(unknown_probes)
+
+    started = time.perf_counter()
+    compacted = compact(encodings[enrolled], ids[enrolled], config=config)
+    compact_seconds = time.perf_counter() - started
+    full = FaceGallery.from_encodings(encodings[enrolled], ids[enrolled])
+    prototypes = FaceGallery.from_encodings(compacted.encodings, compacted.ids)
+    return {
+        "tolerance": tolerance,
+        "users": len(np.unique(ids[enrolled])),
+        "known_probes": len(known_probes),
+        "unknown_probes": len(unknown_probes),
+        "outliers": len(compacted.outliers),
+        "compact_seconds": round(compact_seconds, 3),
+        "full": _score(full, probes, truth, tolerance),
+        "prototypes": _score(prototypes, probes, truth, tolerance),
+    }
+
+
+def print_report(report: Dict):
+    print(f"{report['users']} users, {report['known_probes']} held-out photos, {report['unknown_probes']} photos of "
+          f"unenrolled users, tolerance {report['tolerance']}; {report['outliers']} outlier photos dropped, "
+          f"compaction took {report['compact_seconds']:.2f}s")
+    print(f"{'gallery':>11} {'rows':>9} {'MB':>8} {'accuracy':>9} {'wrong':>7} {'rejected':>9} {'strangers':>10} {'ms/probe':>9}")
+    for name in ("full", "prototypes"):
+        r = report[name]
+        print(f"{name:>11} {r['rows']:>9} {r['mb']:>8.2f} {r['accuracy']:>9.2%} {r['misidentified']:>7} "
+              f"{r['rejected']:>9} {r['strangers_accepted']:>10} {r['match_ms_per_probe']:>9.3f}")
+
+
+def add_prototype_arguments(parser, default: PrototypeConfig = PrototypeConfig()):
+    parser.add_argument("--max-medoids", type=int, default=default.max_medoids,
+                        help="photos kept next to the mean for users whose photos vary a lot")
+    parser.add_argument("--spread", type=float, default=default.spread,
+                        help="mean distance from the user's mean above which medoids are kept")
+    parser.add_argument("--outlier-distance", type=float, default=default.outlier_distance,
+                        help="flag photos farther than this from the user's medoid")
+
+
+def prototype_config_from_args(args, default: PrototypeConfig = PrototypeConfig()) -> PrototypeConfig:
+    return replace(default, max_medoids=args.max_medoids, spread=args.spread, outlier_distance=args.outlier_distance)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Gallery size and accuracy of per-user prototypes vs every photo")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--tolerance", type=float, default=MATCH_TOLERANCE)
+    parser.add_argument("--holdout", type=float, default=HOLDOUT, help="share of each user's photos used as probes")
+    parser.add_argument("--unknown-users", type=float, default=UNKNOWN_USERS,
+                        help="share of users left out of the gallery to count strangers that get accepted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write", type=Path, default=None, help="also write the compacted model (all photos) here")
+    add_prototype_arguments(parser)
+    args = parser.parse_args()
+
+    config = prototype_config_from_args(args)
+    model = open_model(args.model)
+    print_report(evaluate(model.encodings, model.ids, config, args.tolerance, args.holdout, args.unknown_users, args.seed))
+
+    if args.write:
+        compacted = compact(model.encodings, model.ids, config=config)
+        for outlier in compacted.outliers:
+            print(f"Outlier: {outlier.user_id} {outlier.label} ({outlier.distance:.2f} from the user's medoid)")
+        write_model(args.write, compacted.encodings, compacted.ids)
+        print(f"Wrote {len(compacted.ids)} prototypes ({compacted.ratio:.0%} of {compacted.original_size}) to {args.write}")
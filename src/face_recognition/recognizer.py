@@ -1,25 +1,33 @@
 import cv2
-import face_recognition
-import numpy as np
-import pandas as pd
-import pickle
 from datetime import datetime
 import streamlit as st
 from pathlib import Path
+from src.db.db_handler import get_user_by_id
+from src.db.attendance_schema import ATTENDANCE_COLUMNS, attendance_record
+from src.db.attendance_writer import AttendanceWriter
+from src.face_recognition.core import locate_and_match
+from src.face_recognition.detectors import LIVE_DETECTOR
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.index import INDEX_PATH, load_index
+from src.face_recognition.metrics import METRICS
+from src.face_recognition.model_store import MODEL_PATH, LEGACY_MODEL_PATH, model_exists, open_model
+from src.face_recognition.tracking import FaceTracker, TrackingConfig
 
-MODEL_PATH = Path("data/model/face_encodings.pkl")
-ATTENDANCE_FILE = Path("data/attendance_logs") / f"attendance_{datetime.now().strftime('%Y-%m-%d')}.csv"
-ATTENDANCE_FILE.parent.mkdir(parents=True, exist_ok=True)
+MATCH_TOLERANCE = 0.6
+TRACKING_CONFIG = TrackingConfig(tolerance=MATCH_TOLERANCE)
+ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
+ATTENDANCE_LOG_DIR.mkdir(parents=True, exist_ok=True)
+# Write-through: every marked user is on disk before the success message is shown
+ATTENDANCE_WRITER = AttendanceWriter(ATTENDANCE_LOG_DIR, columns=ATTENDANCE_COLUMNS, flush_rows=1)
 
 def load_model():
-    if not MODEL_PATH.exists():
+    if not model_exists(MODEL_PATH) and not LEGACY_MODEL_PATH.exists():
         st.error("❌ Trained model not found. Please train the model first.")
         return [], []
-    with open(MODEL_PATH, "rb") as f:
-        model = pickle.load(f)
-    return model["encodings"], model["ids"]
+    model = open_model()
+    return model.encodings, model.ids
 
-def recognize_and_mark():
+def recognize_and_mark(tracking_config=TRACKING_CONFIG):
     st.title("📷 Real-Time Recognition")
     if "recognizing" not in st.session_state:
         st.session_state.recognizing = False
@@ -35,50 +43,50 @@ def recognize_and_mark():
         return
 
     known_encodings, known_ids = load_model()
-    if not known_encodings:
+    if not known_ids:
         return
+    gallery = FaceGallery.from_matrix(known_encodings, known_ids)
+    load_index(INDEX_PATH, gallery)
 
     cap = cv2.VideoCapture(0)
     stframe = st.empty()
     marked = set()
+    tracker = FaceTracker(tracking_config) if tracking_config is not None else None
+    # The tracker matches with its own config, so both paths use the same threshold
+    tolerance = tracking_config.tolerance if tracking_config is not None else MATCH_TOLERANCE
 
     while st.session_state.recognizing:
-        ret, frame = cap.read()
+        with METRICS.stage("capture"):
+            ret, frame = cap.read()
         if not ret:
             st.error("Camera error.")
             break
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        locs = face_recognition.face_locations(rgb)
-        encs = face_recognition.face_encodings(rgb, locs)
-
-        for (top, right, bottom, left), enc in zip(locs, encs):
-            matches = face_recognition.compare_faces(known_encodings, enc)
-            distances = face_recognition.face_distance(known_encodings, enc)
-            best_match_index = np.argmin(distances) if distances.size > 0 else None
+        with METRICS.stage("convert"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        faces = [(box, user_id) for box, user_id, _ in locate_and_match(rgb, gallery, tolerance, tracker, LIVE_DETECTOR)]
 
+        for (top, right, bottom, left), user_id in faces:
             label = "Unknown"
             color = (0, 0, 255)
 
-            if best_match_index is not None and matches[best_match_index]:
-                label = known_ids[best_match_index]
+            if user_id is not None:
+                label = user_id
                 color = (0, 255, 0)
                 if label not in marked:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    record = pd.DataFrame([[label, timestamp]], columns=["User ID", "Time"])
-                    if ATTENDANCE_FILE.exists():
-                        existing = pd.read_csv(ATTENDANCE_FILE)
-                        df = pd.concat([existing, record], ignore_index=True)
-                    else:
-                        df = record
-                    df.to_csv(ATTENDANCE_FILE, index=False)
+                    with METRICS.stage("lookup"):
+                        user_info = get_user_by_id(label)
+                    METRICS.inc("db_lookups")
+                    ATTENDANCE_WRITER.append(attendance_record(label, user_info["name"] if user_info else label, datetime.now()))
                     marked.add(label)
                     st.success(f"✅ Attendance marked: {label}")
 
             cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
             cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
 
-        stframe.image(frame, channels="BGR")
+        METRICS.record_frame(len(faces), sum(1 for _, user_id in faces if user_id is not None))
+        with METRICS.stage("display"):
+            stframe.image(frame, channels="BGR")
 
     cap.release()
     st.info("Recognition ended.")
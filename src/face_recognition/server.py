@@ -0,0 +1,422 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from src.db.attendance_schema import ATTENDANCE_COLUMNS, attendance_record, read_log
+from src.db.attendance_writer import ATTENDANCE_LOG_DIR, AttendanceWriter, daily_log_path
+from src.face_recognition.capture import READ_FAILURE_LIMIT, CameraSource, FrameRing, RateMeter, VideoFileSource
+from src.face_recognition.detectors import (LIVE_DETECTOR, DetectorConfig, add_detector_arguments, detect_faces,
+                                            detector_from_args, resolve_backend)
+from src.face_recognition.encoder_batch import MAX_BATCH, MAX_DELAY, EncodingBatcher
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.index import INDEX_PATH, load_index
+from src.face_recognition.metrics import METRICS
+from src.face_recognition.model_store import MODEL_PATH, open_model
+from src.face_recognition.server_status import STATUS_PATH
+
+logger = logging.getLogger("server")
+
+# Constants
+STATUS_INTERVAL = 1.0
+MAX_FPS = 5.0
+MATCH_TOLERANCE = 0.5
+LATENCY_WINDOW = 100
+IDLE_WAIT = 0.005
+
+
+def _default_name_lookup(user_id):
+    from src.db.db_handler import get_user_by_id
+
+    user_info = get_user_by_id(user_id)
+    return user_info["name"] if user_info else user_id
+
+
+class SourceWorker:
+    """One camera or stream: a grabber thread feeding a one-frame ring, plus its counters."""
+
+    def __init__(self, name: str, source_factory: Callable[[], object], max_fps: float = MAX_FPS,
+                 detector: Optional[DetectorConfig] = None):
+        self.name = name
+        self.source_factory = source_factory
+        self.max_fps = max_fps
+        # None uses the server's detector; a camera can narrow it, e.g. to a doorway ROI
+        self.detector = detector
+        self.ring = FrameRing(1)
+        self.capture_rate = RateMeter()
+        self.processed_rate = RateMeter()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.faces = 0
+        self.marked = 0
+        self.error: Optional[str] = None
+        self.next_due = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, stop: threading.Event):
+        self.ring = FrameRing(1)
+        self.error = None
+        self._thread = threading.Thread(target=self._grab_loop, args=(stop,), name=f"grab-{self.name}", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: float):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _grab_loop(self, stop: threading.Event):
+        try:
+            source = self.source_factory()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"[{self.name}] {e}")
+            self.ring.close()
+            return
+        failures = 0
+        try:
+            while not stop.is_set():
+                with METRICS.stage("capture"):
+                    ret, frame = source.read()
+                if not ret:
+                    failures += 1
+                    if not getattr(source, "live", False) or failures >= READ_FAILURE_LIMIT:
+                        if getattr(source, "live", False):
+                            self.error = "Camera error."
+                        break
+                    time.sleep(0.01)
+                    continue
+                failures = 0
+                self.capture_rate.tick()
+                self.ring.push((time.perf_counter(), frame))
+        finally:
+            source.release()
+            self.ring.close()
+
+    def take(self, now: float):
+        """Newest frame if this source's frame budget allows one now, else None."""
+        if now < self.next_due:
+            return None
+        item = self.ring.pop_latest(timeout=0)
+        if item is not None and self.max_fps:
+            self.next_due = now + 1.0 / self.max_fps
+        return item
+
+    def status(self) -> dict:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "name": self.name,
+            "state": "error" if self.error else ("running" if self.running else "stopped"),
+            "error": self.error,
+            "max_fps": self.max_fps,
+            "capture_fps": round(self.capture_rate.rate(), 2),
+            "processed_fps": round(self.processed_rate.rate(), 2),
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+            "frames_captured": self.capture_rate.count,
+            "frames_processed": self.processed_rate.count,
+            # Frames replaced in the ring before the budget let them through
+            "frames_dropped": self.ring.dropped,
+            "faces": self.faces,
+            "marked": self.marked,
+        }
+
+
+class AttendanceServer:
+    """Headless attendance for N cameras sharing one gallery, one matcher and one writer.
+
+    Every source has its own grabber thread; a single scheduler takes the
+    newest frame from each source whose frame budget (``max_fps``) allows,
+    detects faces in those frames on a small thread pool, encodes every
+    face of the round in shared network passes of up to ``encode_batch``
+    faces and matches them in one ``gallery.match`` call. A user is marked
+    once per day, whichever entrance they use.
+    """
+
+    def __init__(self, gallery: FaceGallery, writer: Optional[AttendanceWriter] = None,
+                 tolerance: float = MATCH_TOLERANCE, detector: DetectorConfig = LIVE_DETECTOR,
+                 detect_workers: Optional[int] = None, name_lookup: Callable[[str], str] = _default_name_lookup,
+                 status_path: Optional[Path] = STATUS_PATH, encode_batch: int = MAX_BATCH,
+                 encode_delay: float = MAX_DELAY, metrics_path: Optional[Path] = None):
+        self.gallery = gallery
+        self.writer = writer or AttendanceWriter(ATTENDANCE_LOG_DIR, columns=ATTENDANCE_COLUMNS)
+        self.tolerance = tolerance
+        self.detector = detector
+        self.detect_workers = detect_workers or min(4, os.cpu_count() or 1)
+        self.name_lookup = name_lookup
+        self.status_path = Path(status_path) if status_path else None
+        self.encode_batch = encode_batch
+        self.encode_delay = encode_delay
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.encoder: Optional[EncodingBatcher] = None
+        self.workers: Dict[str, SourceWorker] = {}
+        self.marked: Dict[str, str] = {}
+        self.stats = {"rounds": 0, "frames": 0, "faces": 0, "match_seconds": 0.0, "failed_rounds": 0}
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self._stop = threading.Event()
+        # Set as the scheduler exits, so its final status already reads "not running"
+        self._done = threading.Event()
+        self._scheduler: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def add_source(self, name: str, source_factory: Callable[[], object], max_fps: float = MAX_FPS,
+                   detector: Optional[DetectorConfig] = None) -> SourceWorker:
+        if name in self.workers:
+            raise ValueError(f"Duplicate source name {name!r}")
+        worker = self.workers[name] = SourceWorker(name, source_factory, max_fps, detector)
+        if self.running:
+            worker.start(self._stop)
+        return worker
+
+    @property
+    def running(self) -> bool:
+        return self._scheduler is not None and self._scheduler.is_alive() and not self._done.is_set()
+
+    def load_marked(self, day: Optional[str] = None) -> int:
+        """Mark everyone already in ``day``'s log (today by default), so a restart does not mark them again."""
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        path = daily_log_path(day, self.writer.directory)
+        try:
+            user_ids = read_log(path)["User ID"].unique()
+        except Exception as e:
+            logger.warning(f"Could not read {path} for users already marked: {e}")
+            return 0
+        for user_id in user_ids:
+            self.marked[str(user_id)] = day
+        return len(user_ids)
+
+    def start(self):
+        if self.running:
+            return self
+        self._stop.clear()
+        self._done.clear()
+        loaded = self.load_marked()
+        if loaded:
+            logger.info(f"{loaded} users already marked today")
+        self.started_at = time.perf_counter()
+        self._pool = ThreadPoolExecutor(self.detect_workers, thread_name_prefix="detect")
+        self.encoder = EncodingBatcher(self.encode_batch, self.encode_delay)
+        for worker in self.workers.values():
+            worker.start(self._stop)
+        self._scheduler = threading.Thread(target=self._schedule_loop, name="attendance-server", daemon=True)
+        self._scheduler.start()
+        logger.info(f"Attendance server started with {len(self.workers)} sources")
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for worker in self.workers.values():
+            worker.ring.close()
+            worker.join(timeout)
+        if self._scheduler is not None:
+            self._scheduler.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        if self.encoder is not None:
+            self.encoder.close(timeout)
+        self.writer.flush()
+        self._write_status()
+        logger.info("Attendance server stopped")
+
+    def wait(self):
+        """Block until every source has ended (finite videos) or stop() is called."""
+        while self.running:
+            self._scheduler.join(0.5)
+
+    def _detect_and_submit(self, worker: SourceWorker, frame: np.ndarray):
+        with METRICS.stage("convert"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with METRICS.stage("detect"):
+            boxes = detect_faces(rgb, worker.detector or self.detector)
+        return boxes, self.encoder.submit(rgb, boxes)
+
+    def _schedule_loop(self):
+        last_status = 0.0
+        try:
+            while not self._stop.is_set():
+                now = time.perf_counter()
+                batch = []
+                for worker in self.workers.values():
+                    item = worker.take(now)
+                    if item is not None:
+                        batch.append((worker, item[0], item[1]))
+                if not batch:
+                    if not any(worker.running or worker.ring.frames for worker in self.workers.values()):
+                        break
+                    time.sleep(IDLE_WAIT)
+                else:
+                    try:
+                        self._process(batch)
+                    except Exception as e:
+                        # A detector or encoder failure loses this round's frames, not the server
+                        self.stats["failed_rounds"] += 1
+                        self.last_error = f"{type(e).__name__}: {e}"
+                        logger.exception(f"Recognition round failed for {', '.join(w.name for w, _, _ in batch)}")
+                if now - last_status >= STATUS_INTERVAL:
+                    self._write_status()
+                    last_status = now
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Attendance scheduler stopped")
+        finally:
+            self._done.set()
+            self._write_status()
+
+    def _process(self, batch):
+        submitted = list(self._pool.map(self._detect_and_submit, [worker for worker, _, _ in batch],
+                                        [frame for _, _, frame in batch]))
+        # Every frame of the round is in, so the encoder need not wait out its deadline
+        self.encoder.flush()
+        # The batcher times its own passes into the "encode" stage; this only waits for them
+        detected = [(boxes, future.result()) for boxes, future in submitted]
+        encodings = [encoding for _, frame_encodings in detected for encoding in frame_encodings]
+        start = time.perf_counter()
+        match_ids, match_distances = self.gallery.match(encodings, k=1)
+        match_seconds = time.perf_counter() - start
+        self.stats["match_seconds"] += match_seconds
+        METRICS.observe_stage("match", match_seconds)
+
+        offset = 0
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        for (worker, captured_at, _), (boxes, frame_encodings) in zip(batch, detected):
+            matched = 0
+            for candidates, distances in zip(match_ids[offset:offset + len(frame_encodings)],
+                                             match_distances[offset:offset + len(frame_encodings)]):
+                if not candidates or distances[0] >= self.tolerance:
+                    continue
+                matched += 1
+                user_id = candidates[0]
+                if self.marked.get(user_id) == today:
+                    continue
+                self.marked[user_id] = today
+                with METRICS.stage("lookup"):
+                    name = self.name_lookup(user_id)
+                METRICS.inc("db_lookups")
+                self.writer.append(attendance_record(user_id, name, now, method=f"Face Recognition ({worker.name})"))
+                worker.marked += 1
+                logger.info(f"[{worker.name}] Marked {user_id}")
+            offset += len(frame_encodings)
+            worker.faces += len(boxes)
+            worker.processed_rate.tick()
+            worker.latencies.append(time.perf_counter() - captured_at)
+            METRICS.record_frame(len(frame_encodings), matched)
+            # Capture to result, including the time the frame waited in its ring
+            METRICS.observe_stage("frame", worker.latencies[-1])
+
+        self.stats["rounds"] += 1
+        self.stats["frames"] += len(batch)
+        self.stats["faces"] += len(encodings)
+
+    def status(self) -> dict:
+        rounds = max(1, self.stats["rounds"])
+        return {
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "running": self.running,
+            "uptime_seconds": round(time.perf_counter() - self.started_at, 1) if self.started_at else 0.0,
+            "gallery_size": len(self.gallery.ids),
+            "detector": resolve_backend(self.detector),
+            "rounds": self.stats["rounds"],
+            "frames_per_round": round(self.stats["frames"] / rounds, 2),
+            "faces_per_match_call": round(self.stats["faces"] / rounds, 2),
+            "match_ms_per_round": round(1000 * self.stats["match_seconds"] / rounds, 3),
+            "failed_rounds": self.stats["failed_rounds"],
+            "last_error": self.last_error,
+            **(self.encoder.report() if self.encoder else {}),
+            "marked_today": sum(1 for day in self.marked.values() if day == datetime.now().strftime("%Y-%m-%d")),
+            "sources": [worker.status() for worker in self.workers.values()],
+        }
+
+    def _write_status(self):
+        if self.status_path is not None:
+            try:
+                self.status_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.status_path.with_name(self.status_path.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.status(), f, indent=2)
+                os.replace(tmp, self.status_path)
+            except OSError as e:
+                logger.warning(f"Could not write server status: {e}")
+        if self.metrics_path is not None and METRICS.enabled:
+            try:
+                METRICS.dump(self.metrics_path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics: {e}")
+
+
+def load_gallery(model_path: Path = MODEL_PATH) -> FaceGallery:
+    model = open_model(Path(model_path))
+    gallery = FaceGallery.from_matrix(model.encodings, model.ids)
+    load_index(INDEX_PATH, gallery)
+    return gallery
+
+
+def _parse_source(spec: str, loop: bool):
+    # name=device-index | name=path/to/video | name=rtsp://...
+    name, _, target = spec.partition("=")
+    if not target:
+        name, target = f"cam{name}" if name.isdigit() else Path(name).stem, name
+    if target.isdigit():
+        return name, lambda: CameraSource(int(target))
+    if Path(target).exists():
+        return name, lambda: VideoFileSource(target, loop=loop, realtime=True)
+    return name, lambda: CameraSource(target)
+
+
+def _print_status(status: dict):
+    print(f"{status['updated_at']}  rounds={status['rounds']}  frames/round={status['frames_per_round']}  "
+          f"faces/match={status['faces_per_match_call']}  match={status['match_ms_per_round']} ms  "
+          f"faces/encode={status.get('faces_per_encode_batch', 0)}  encode={status.get('encode_ms_per_batch', 0)} ms  "
+          f"marked today={status['marked_today']}")
+    print(f"  {'source':<14} {'state':<8} {'cap fps':>8} {'proc fps':>8} {'p50 ms':>8} {'p95 ms':>8} {'dropped':>8} {'marked':>7}")
+    for source in status["sources"]:
+        print(f"  {source['name']:<14} {source['state']:<8} {source['capture_fps']:>8.1f} {source['processed_fps']:>8.1f} "
+              f"{source['latency_p50_ms']:>8.1f} {source['latency_p95_ms']:>8.1f} {source['frames_dropped']:>8} {source['marked']:>7}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Headless multi-camera attendance server")
+    parser.add_argument("sources", nargs="+", help="name=device-index, name=video-file or name=stream-url")
+    parser.add_argument("--loop", action="store_true", help="loop video files, standing in for cameras")
+    parser.add_argument("--max-fps", type=float, default=MAX_FPS, help="frames recognised per second per source")
+    add_detector_arguments(parser, LIVE_DETECTOR)
+    parser.add_argument("--workers", type=int, default=None, help="detection threads")
+    parser.add_argument("--encode-batch", type=int, default=MAX_BATCH, help="faces per batched encoder pass")
+    parser.add_argument("--encode-delay", type=float, default=MAX_DELAY, help="seconds a face may wait for its batch to fill")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--status-every", type=float, default=5.0, help="seconds between status lines")
+    parser.add_argument("--metrics", type=Path, default=None,
+                        help="record per-stage metrics to this file, .json or Prometheus text (e.g. metrics.prom)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        METRICS.enabled = True
+    server = AttendanceServer(load_gallery(args.model), detector=detector_from_args(args, LIVE_DETECTOR),
+                              detect_workers=args.workers,
+                              encode_batch=args.encode_batch, encode_delay=args.encode_delay,
+                              metrics_path=args.metrics)
+    for spec in args.sources:
+        server.add_source(*_parse_source(spec, args.loop), max_fps=args.max_fps)
+    server.start()
+    try:
+        while server.running:
+            time.sleep(args.status_every)
+            _print_status(server.status())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        _print_status(server.status())
@@ -0,0 +1,26 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Constants
+# Kept apart from server.py so the Cameras page can read it without importing cv2 and dlib
+STATUS_PATH = Path("data/logs/attendance_server.json")
+# The server rewrites its status every second; one this old was left by a server that died
+STALE_AFTER_SECONDS = 30.0
+
+
+def read_status(path: Path = STATUS_PATH, stale_after: float = STALE_AFTER_SECONDS) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        age = (datetime.now() - datetime.strptime(status["updated_at"], "%Y-%m-%d %H:%M:%S")).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        age = None
+    status["stale"] = age is None or age > stale_after
+    if status["stale"]:
+        status["running"] = False
+    return status
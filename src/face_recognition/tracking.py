@@ -0,0 +1,164 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import face_recognition
+import numpy as np
+
+from src.face_recognition.detectors import LIVE_DETECTOR, Box, DetectorConfig, detect_faces
+from src.face_recognition.metrics import METRICS
+
+
+@dataclass
+class TrackingConfig:
+    detect_every: int = 5          # run the detector on every Nth frame, track in between
+    detector: str = LIVE_DETECTOR.backend  # face detector backend, see detectors.DETECTOR_BACKENDS
+    detection_scale: float = 0.5   # detector input is the frame resized by this factor
+    upsample: int = 1              # times the detector input is doubled to find small faces
+    roi: Optional[Tuple[float, float, float, float]] = None  # detect only inside (left, top, right, bottom) fractions
+    iou_threshold: float = 0.3     # minimum overlap for a detection to continue a track
+    max_missed: int = 2            # detection rounds a track may go unseen before it is dropped
+    reencode_every: int = 30       # frames after which a known identity is considered stale
+    retry_unknown_every: int = 10  # frames between re-encodes of a track that matched nobody
+    tolerance: float = 0.5
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: Box
+    user_id: Optional[str] = None
+    distance: float = 1.0
+    encoded_at: int = -1
+    missed: int = 0
+    velocity: Tuple[float, float] = (0.0, 0.0)
+    detected_center: Optional[Tuple[float, float]] = None  # center of the last detection, not the prediction
+    detected_at: int = 0
+
+
+def iou(a: Box, b: Box) -> float:
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+def _center(box: Box) -> Tuple[float, float]:
+    return (box[1] + box[3]) / 2.0, (box[0] + box[2]) / 2.0
+
+
+class FaceTracker:
+    """Detect every N frames on a downscaled image and follow faces in between.
+
+    Faces are only encoded and matched when a track is new or its identity is
+    stale, so a person standing still costs one encoding per
+    ``reencode_every`` frames instead of one per frame.
+    """
+
+    def __init__(self, config: Optional[TrackingConfig] = None):
+        self.config = config or TrackingConfig()
+        self.tracks: Dict[int, Track] = {}
+        self.frame_index = 0
+        self._next_id = 0
+        self.stats = {"frames": 0, "detections": 0, "encodings": 0, "seconds": 0.0, "cpu_seconds": 0.0}
+        self.detector = DetectorConfig(backend=self.config.detector, scale=self.config.detection_scale,
+                                       upsample=self.config.upsample, roi=self.config.roi)
+
+    def detect(self, rgb_frame: np.ndarray) -> List[Box]:
+        return detect_faces(rgb_frame, self.detector)
+
+    def _associate(self, detections: List[Box]):
+        pairs = sorted(
+            ((iou(track.box, det), track_id, di) for track_id, track in self.tracks.items() for di, det in enumerate(detections)),
+            reverse=True,
+        )
+        used_tracks, used_dets = set(), set()
+        for overlap, track_id, di in pairs:
+            if overlap < self.config.iou_threshold:
+                break
+            if track_id in used_tracks or di in used_dets:
+                continue
+            used_tracks.add(track_id)
+            used_dets.add(di)
+            track = self.tracks[track_id]
+            # Measured between detections: track.box has already been moved by _predict in between
+            (old_x, old_y), (new_x, new_y) = track.detected_center or _center(track.box), _center(detections[di])
+            steps = max(1, self.frame_index - track.detected_at)
+            track.velocity = ((new_x - old_x) / steps, (new_y - old_y) / steps)
+            track.box = detections[di]
+            track.detected_center, track.detected_at = (new_x, new_y), self.frame_index
+            track.missed = 0
+
+        for track_id in list(self.tracks):
+            if track_id not in used_tracks:
+                self.tracks[track_id].missed += 1
+                if self.tracks[track_id].missed > self.config.max_missed:
+                    del self.tracks[track_id]
+
+        for di, det in enumerate(detections):
+            if di not in used_dets:
+                self.tracks[self._next_id] = Track(self._next_id, det, detected_center=_center(det),
+                                                   detected_at=self.frame_index)
+                self._next_id += 1
+
+    def _predict(self, shape):
+        # Constant-velocity step between detections; cheap and good enough at kiosk frame rates
+        height, width = shape[:2]
+        for track in self.tracks.values():
+            dx, dy = track.velocity
+            top, right, bottom, left = track.box
+            track.box = (
+                int(np.clip(top + dy, 0, height)), int(np.clip(right + dx, 0, width)),
+                int(np.clip(bottom + dy, 0, height)), int(np.clip(left + dx, 0, width)),
+            )
+
+    def _needs_encoding(self, track: Track) -> bool:
+        if track.encoded_at < 0:
+            return True
+        age = self.frame_index - track.encoded_at
+        if track.user_id is None:
+            return age >= self.config.retry_unknown_every
+        return age >= self.config.reencode_every
+
+    def update(self, rgb_frame: np.ndarray, gallery) -> List[Track]:
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        if self.frame_index % max(1, self.config.detect_every) == 0:
+            with METRICS.stage("detect"):
+                detections = self.detect(rgb_frame)
+            self._associate(detections)
+            self.stats["detections"] += 1
+        else:
+            self._predict(rgb_frame.shape)
+
+        stale = [track for track in self.tracks.values() if track.missed == 0 and self._needs_encoding(track)]
+        if stale:
+            with METRICS.stage("encode"):
+                encodings = face_recognition.face_encodings(rgb_frame, [track.box for track in stale])
+            with METRICS.stage("match"):
+                match_ids, match_distances = gallery.match(encodings, k=1)
+            for track, candidates, distances in zip(stale, match_ids, match_distances):
+                track.encoded_at = self.frame_index
+                if candidates and distances[0] < self.config.tolerance:
+                    track.user_id, track.distance = candidates[0], float(distances[0])
+                else:
+                    track.user_id, track.distance = None, 1.0
+            self.stats["encodings"] += len(stale)
+
+        self.frame_index += 1
+        self.stats["frames"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        self.stats["cpu_seconds"] += time.thread_time() - cpu_start
+        return [track for track in self.tracks.values() if track.missed == 0]
+
+    def report(self) -> dict:
+        frames = max(1, self.stats["frames"])
+        return {
+            **self.stats,
+            "fps": self.stats["frames"] / self.stats["seconds"] if self.stats["seconds"] else 0.0,
+            "ms_per_frame": 1000 * self.stats["seconds"] / frames,
+            "cpu_ms_per_frame": 1000 * self.stats["cpu_seconds"] / frames,
+        }
@@ -1,57 +1,161 @@
 import os
-import pickle
+import sys
+import argparse
 import face_recognition
 import numpy as np
 from pathlib import Path
 import logging
 import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+if __package__ in (None, ""):
+    # Run as "python src/face_recognition/trainer.py": make the repo root importable
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.face_recognition.detectors import STILL_DETECTOR, add_detector_arguments, detect_faces, detector_from_args
+from src.face_recognition.model_store import MODEL_PATH, write_model
+from src.face_recognition.prototypes import PrototypeConfig, add_prototype_arguments, compact, prototype_config_from_args
 
 # Paths
 FACES_DIR = Path("data/faces")
-MODEL_PATH = Path("data/model/face_encodings.pkl")
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("trainer")
 
-def train_model():
+PROGRESS_EVERY = 500
+STAGES = ("decode", "detect", "encode")
+
+
+def list_training_images():
+    tasks = []
+    for user_folder in FACES_DIR.iterdir():
+        if user_folder.is_dir():
+            user_id = user_folder.name
+            for img_path in user_folder.glob("*.jpg"):
+                tasks.append((user_id, img_path))
+    return tasks
+
+
+def _process_image(task, detector=STILL_DETECTOR):
+    # Runs inside pool workers as well, so failures are returned, never raised
+    user_id, img_path = task
+    timings = dict.fromkeys(STAGES, 0.0)
+    try:
+        t0 = time.perf_counter()
+        image = face_recognition.load_image_file(str(img_path))
+        t1 = time.perf_counter()
+        face_locations = detect_faces(image, detector)
+        t2 = time.perf_counter()
+        timings["decode"], timings["detect"] = t1 - t0, t2 - t1
+        if not face_locations:
+            return user_id, img_path, None, "no_face", timings
+        encoding = face_recognition.face_encodings(image, face_locations)[0]
+        timings["encode"] = time.perf_counter() - t2
+        return user_id, img_path, encoding, "ok", timings
+    except Exception as e:
+        return user_id, img_path, None, f"{type(e).__name__}: {e}", timings
+
+
+def _chunk_size(total, workers):
+    # A few chunks per worker keeps the pool balanced without per-image IPC
+    return max(1, min(64, total // (workers * 4) or 1))
+
+
+def _log_report(report, elapsed, final=False):
+    rate = report["processed"] / elapsed if elapsed > 0 else 0.0
+    stage_times = ", ".join(f"{stage} {report['stage_seconds'][stage]:.1f}s" for stage in STAGES)
+    prefix = "Training finished" if final else "Progress"
+    logger.info(
+        f"{prefix}: {report['processed']}/{report['total']} images in {elapsed:.2f}s "
+        f"({rate:.1f} images/sec), {report['encoded']} encoded, {report['no_face']} without a face, "
+        f"{report['failed']} failed; stage time {stage_times}"
+    )
+
+
+def train_model(workers=1, chunk_size=None, detector=STILL_DETECTOR, prototypes=None):
     start_time = time.time()
     known_encodings = []
     known_ids = []
+    known_paths = []
 
     if not FACES_DIR.exists():
         logger.error(f"Face data folder not found: {FACES_DIR}")
         return False
 
-    for user_folder in FACES_DIR.iterdir():
-        if user_folder.is_dir():
-            user_id = user_folder.name
-            for img_path in user_folder.glob("*.jpg"):
-                try:
-                    image = face_recognition.load_image_file(str(img_path))
-                    face_locations = face_recognition.face_locations(image)
-                    if not face_locations:
-                        continue
-                    encoding = face_recognition.face_encodings(image, face_locations)[0]
-                    known_encodings.append(encoding)
-                    known_ids.append(user_id)
-                except Exception as e:
-                    logger.warning(f"Skipping {img_path}: {e}")
+    tasks = list_training_images()
+    workers = workers or os.cpu_count() or 1
+    report = {
+        "total": len(tasks),
+        "processed": 0,
+        "encoded": 0,
+        "no_face": 0,
+        "failed": 0,
+        "stage_seconds": dict.fromkeys(STAGES, 0.0),
+    }
+
+    if workers > 1 and len(tasks) > 1:
+        logger.info(f"Training on {len(tasks)} images with {workers} worker processes")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # map() yields in submission order, so the model matches the serial run
+        results = executor.map(partial(_process_image, detector=detector), tasks, chunksize=chunk_size or _chunk_size(len(tasks), workers))
+    else:
+        executor = None
+        results = map(partial(_process_image, detector=detector), tasks)
+
+    try:
+        for user_id, img_path, encoding, status, timings in results:
+            report["processed"] += 1
+            for stage in STAGES:
+                report["stage_seconds"][stage] += timings[stage]
+            if status == "ok":
+                known_encodings.append(encoding)
+                known_ids.append(user_id)
+                known_paths.append(img_path)
+                report["encoded"] += 1
+            elif status == "no_face":
+                report["no_face"] += 1
+            else:
+                report["failed"] += 1
+                logger.warning(f"Skipping {img_path}: {status}")
+            if report["processed"] % PROGRESS_EVERY == 0:
+                _log_report(report, time.time() - start_time)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    _log_report(report, time.time() - start_time, final=True)
 
     if not known_encodings:
         logger.error("No valid face encodings found.")
         return False
 
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump({"encodings": known_encodings, "ids": known_ids}, f)
+    if prototypes is not None:
+        compacted = compact(known_encodings, known_ids, known_paths, prototypes)
+        for outlier in compacted.outliers:
+            logger.warning(f"Outlier photo {outlier.label} for {outlier.user_id}: "
+                           f"{outlier.distance:.2f} from the user's other photos, left out of the model")
+        logger.info(f"Compacted {compacted.original_size} encodings to {len(compacted.ids)} prototypes "
+                    f"({compacted.ratio:.0%}), {len(compacted.outliers)} outlier photos")
+        known_encodings, known_ids = compacted.encodings, compacted.ids
+
+    write_model(MODEL_PATH, known_encodings, known_ids)
 
     logger.info(f"Trained model saved at {MODEL_PATH}")
-    logger.info(f"Time taken: {time.time() - start_time:.2f} seconds")
     return True
 
 if __name__ == "__main__":
-    if train_model():
+    parser = argparse.ArgumentParser(description="Encode data/faces into the recognition model")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 = one per CPU core)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="images handed to a worker at a time")
+    parser.add_argument("--compact", action="store_true", help="store per-user prototypes instead of every photo")
+    add_detector_arguments(parser, STILL_DETECTOR)
+    add_prototype_arguments(parser, PrototypeConfig())
+    args = parser.parse_args()
+    prototypes = prototype_config_from_args(args, PrototypeConfig()) if args.compact else None
+    if train_model(workers=args.workers, chunk_size=args.chunk_size, detector=detector_from_args(args, STILL_DETECTOR),
+                   prototypes=prototypes):
         print("✅ Model trained and saved.")
     else:
         print("❌ Model training failed.")
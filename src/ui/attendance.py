@@ -1,174 +1,295 @@
+import os
 import cv2
-import numpy as np
-import face_recognition
+import time
+import threading
 import pandas as pd
+from dataclasses import replace
 from datetime import datetime
 import streamlit as st
 from pathlib import Path
 from src.db.db_handler import get_user_by_id
+from src.db.attendance_writer import AttendanceWriter, daily_log_path
+from src.face_recognition.encoding_cache import EncodingCache
+from src.face_recognition.enrollment import shared_queue
+from src.face_recognition.metrics import METRICS, metrics_path
+from src.face_recognition.gallery import FaceGallery
+from src.face_recognition.prototypes import compact
+from src.face_recognition.index import INDEX_PATH, load_index
+from src.face_recognition.capture import CameraSource, CaptureService
+from src.db.attendance_schema import ATTENDANCE_COLUMNS, attendance_record
+from src.face_recognition.core import locate_and_match
+from src.face_recognition.detectors import DETECTOR_BACKENDS, LIVE_DETECTOR
+from src.face_recognition.tracking import FaceTracker, TrackingConfig
 
 FACE_DATA_DIR = Path("data/faces")
 ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
 ATTENDANCE_LOG_DIR.mkdir(parents=True, exist_ok=True)
+# One writer per process, shared by every browser session
+ATTENDANCE_WRITER = AttendanceWriter(ATTENDANCE_LOG_DIR, columns=ATTENDANCE_COLUMNS)
+UI_REFRESH_SECONDS = 0.1
+# The camera is released when the page has not polled the capture service for this long (tab closed)
+CAPTURE_IDLE_TIMEOUT = 10.0
+MATCH_TOLERANCE = 0.5
+# "1" matches against per-user prototypes instead of every photo; see src.face_recognition.prototypes
+COMPACT_GALLERY = os.environ.get("GALLERY_PROTOTYPES", "0") == "1"
 
+# Built once per process and shared by every session; "Refresh Faces" rebuilds it
+_shared_gallery = None
+_shared_gallery_lock = threading.Lock()
 
-def load_known_faces():
-    known_encodings = []
-    known_ids = []
 
+def load_known_faces():
     if not FACE_DATA_DIR.exists():
         st.warning("Face data directory is missing.")
-        return known_encodings, known_ids
-
-    for user_folder in FACE_DATA_DIR.iterdir():
-        if user_folder.is_dir():
-            user_id = user_folder.name
-            for img_path in user_folder.glob("*.jpg"):
-                try:
-                    image = face_recognition.load_image_file(str(img_path))
-                    face_locations = face_recognition.face_locations(image)
-                    if not face_locations:
-                        continue
-                    encoding = face_recognition.face_encodings(image, face_locations)[0]
-                    known_encodings.append(encoding)
-                    known_ids.append(user_id)
-                except Exception as e:
-                    st.warning(f"Skipping {img_path.name}: {e}")
-
-    st.success(f"Loaded {len(known_encodings)} face encodings")
+        return [], []
+
+    cache = EncodingCache(FACE_DATA_DIR)
+    stats = cache.refresh()
+    for failure in stats["failed"]:
+        st.warning(f"Skipping {failure}")
+
+    known_encodings, known_ids = cache.known_faces()
+    st.success(
+        f"Loaded {len(known_encodings)} face encodings "
+        f"({len(stats['encoded'])} new, {len(stats['reused'])} cached, {len(stats['removed'])} removed)"
+    )
     return known_encodings, known_ids
 
 
+def shared_gallery(refresh=False):
+    global _shared_gallery
+    with _shared_gallery_lock:
+        if _shared_gallery is None or refresh:
+            known_encodings, known_ids = load_known_faces()
+            if COMPACT_GALLERY and known_ids:
+                compacted = compact(known_encodings, known_ids)
+                known_encodings, known_ids = compacted.encodings, compacted.ids
+                st.info(f"Compacted {compacted.original_size} encodings to {len(known_ids)} per-user prototypes")
+                if compacted.outliers:
+                    users = sorted({outlier.user_id for outlier in compacted.outliers})
+                    st.warning(f"⚠️ Left out {len(compacted.outliers)} outlier photos of: {', '.join(users)}")
+            gallery = FaceGallery.from_encodings(known_encodings, known_ids)
+            load_index(INDEX_PATH, gallery)
+            # Photos registered while the camera runs are recognized without a restart
+            shared_queue().attach(gallery)
+            _shared_gallery = gallery
+        else:
+            st.info(f"Using {len(_shared_gallery)} face encodings already loaded; use Refresh Faces to rescan photos")
+        return _shared_gallery
+
+
 def save_attendance_log(buffer):
     if not buffer:
         return
 
-    today_file = ATTENDANCE_LOG_DIR / f"attendance_{datetime.now().strftime('%Y-%m-%d')}.csv"
-    if today_file.exists():
-        df_existing = pd.read_csv(today_file)
-    else:
-        df_existing = pd.DataFrame(columns=["User ID", "Name", "Date", "Time", "Status", "Method"])
-
-    new_df = pd.DataFrame(buffer)
-    df_combined = pd.concat([df_existing, new_df], ignore_index=True)
-    df_combined.to_csv(today_file, index=False)
-    st.success(f"Saved {len(buffer)} attendance records to {today_file.name}")
-
-
-def recognize_faces(frame, known_encodings, known_ids, marked_users, attendance_buffer):
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    face_locations = face_recognition.face_locations(rgb_frame)
-    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-    for (top, right, bottom, left), encoding in zip(face_locations, face_encodings):
-        distances = face_recognition.face_distance(known_encodings, encoding)
-        match_id = "Unknown"
-        min_dist = 1.0
-
-        if len(distances) > 0:
-            best_index = np.argmin(distances)
-            if distances[best_index] < 0.5:
-                match_id = known_ids[best_index]
-                if match_id not in marked_users:
-                    now = datetime.now()
-                    user_info = get_user_by_id(match_id)
-                    name = user_info["name"] if user_info else match_id
-                    record = {
-                        "User ID": match_id,
-                        "Name": name,
-                        "Date": now.strftime("%Y-%m-%d"),
-                        "Time": now.strftime("%H:%M:%S"),
-                        "Status": "Present",
-                        "Method": "Face Recognition"
-                    }
-                    attendance_buffer.append(record)
-                    marked_users.add(match_id)
-                    st.success(f"✅ Marked: {name} ({match_id})")
-
-        label = f"{match_id} ({min_dist:.2f})" if match_id != "Unknown" else "Unknown"
-        color = (0, 255, 0) if match_id != "Unknown" else (0, 0, 255)
-
-        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-        cv2.rectangle(frame, (left, top - 35), (right, top), color, cv2.FILLED)
-        cv2.putText(frame, label, (left + 6, top - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    ATTENDANCE_WRITER.write(buffer)
+    report_saved(buffer)
+
+
+def report_saved(buffer):
+    if buffer:
+        today_file = daily_log_path(datetime.now().strftime('%Y-%m-%d'), ATTENDANCE_LOG_DIR)
+        st.success(f"Saved {len(buffer)} attendance records to {today_file.name}")
+
 
+def process_frame(frame, gallery, marked_users, tracker=None, detector=LIVE_DETECTOR, writer=None):
+    # Pure recognition step, safe to run off the Streamlit script thread
+    start = time.perf_counter()
+    new_records = []
+    with METRICS.stage("convert"):
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    faces = locate_and_match(rgb_frame, gallery, MATCH_TOLERANCE, tracker, detector)
+    new_users = set()
+    for _, user_id, _ in faces:
+        if user_id is not None and user_id not in marked_users and user_id not in new_users:
+            with METRICS.stage("lookup"):
+                user_info = get_user_by_id(user_id)
+            METRICS.inc("db_lookups")
+            name = user_info["name"] if user_info else user_id
+            new_records.append(attendance_record(user_id, name, datetime.now()))
+            new_users.add(user_id)
+    # Marked once queued: a row the writer cannot write stays queued and is retried by the writer,
+    # so a later sighting must not queue a second one
+    marked_users.update(new_users)
+    if writer is not None and new_records:
+        writer.write(new_records)
+
+    with METRICS.stage("draw"):
+        for (top, right, bottom, left), user_id, distance in faces:
+            match_id = user_id if user_id is not None else "Unknown"
+            label = f"{match_id} ({distance:.2f})" if match_id != "Unknown" else "Unknown"
+            color = (0, 255, 0) if match_id != "Unknown" else (0, 0, 255)
+
+            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+            cv2.rectangle(frame, (left, top - 35), (right, top), color, cv2.FILLED)
+            cv2.putText(frame, label, (left + 6, top - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+    METRICS.record_frame(len(faces), sum(1 for _, user_id, _ in faces if user_id is not None))
+    METRICS.observe_stage("frame", time.perf_counter() - start)
+    return frame, new_records
+
+
+def recognize_faces(frame, gallery, marked_users, attendance_buffer):
+    frame, new_records = process_frame(frame, gallery, marked_users)
+    for record in new_records:
+        attendance_buffer.append(record)
+        st.success(f"✅ Marked: {record['Name']} ({record['User ID']})")
     return frame
 
 
+def start_capture_service(gallery, marked_users, tracking_config=None, source_factory=CameraSource,
+                          detector=LIVE_DETECTOR, writer=ATTENDANCE_WRITER):
+    tracker = FaceTracker(tracking_config) if tracking_config is not None else None
+    # Records are written on the recognition thread, so none are lost if the page stops polling
+    service = CaptureService(source_factory,
+                             lambda frame: process_frame(frame, gallery, marked_users, tracker, detector, writer),
+                             idle_timeout=CAPTURE_IDLE_TIMEOUT)
+    service.tracker = tracker
+    return service.start()
+
+
+def recognition_settings():
+    with st.expander("⚙️ Recognition settings"):
+        backend = st.selectbox(
+            "Face detector", DETECTOR_BACKENDS, index=DETECTOR_BACKENDS.index(LIVE_DETECTOR.backend), key="detector_backend",
+            help="auto uses YuNet when its model is in data/model, otherwise OpenCV's Haar cascade, otherwise HOG; hog is the slowest",
+        )
+        detector = replace(LIVE_DETECTOR, backend=backend)
+        if not st.checkbox("Track faces between detections", value=True, key="tracking_on"):
+            return detector, None
+        return detector, TrackingConfig(
+            detector=backend,
+            detect_every=st.slider("Run detection every N frames", 1, 15, TrackingConfig.detect_every, key="detect_every"),
+            detection_scale=st.slider("Detection scale", 0.25, 1.0, TrackingConfig.detection_scale, 0.05, key="detection_scale"),
+            reencode_every=st.slider("Re-check identity every N frames", 5, 120, TrackingConfig.reencode_every, key="reencode_every"),
+            tolerance=MATCH_TOLERANCE,
+        )
+
+
+def metrics_ui():
+    with st.expander("📊 Pipeline metrics"):
+        # Shared by every session and camera thread in this process, so this is a switch, not a per-session setting
+        if METRICS.enabled:
+            st.caption("🟢 Collecting per-stage timings for every session in this process.")
+            if st.button("⏸️ Stop Collecting"):
+                METRICS.enabled = False
+                st.rerun()
+        else:
+            st.caption("Per-stage timings are not being collected.")
+            if st.button("▶️ Collect Per-Stage Timings"):
+                METRICS.enabled = True
+                st.rerun()
+        snapshot = METRICS.snapshot()
+        if snapshot["stages_ms"]:
+            counters = snapshot["counters"]
+            cols = st.columns(5)
+            for col, (label, key) in zip(cols, [("Frames", "frames"), ("Faces", "faces"), ("Matches", "matches"),
+                                                ("Unknown", "unknowns"), ("DB Lookups", "db_lookups")]):
+                col.metric(label, counters.get(key, 0))
+            stages = pd.DataFrame.from_dict(snapshot["stages_ms"], orient="index")
+            stages.columns = ["Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)"]
+            st.dataframe(stages.round(2), use_container_width=True)
+            st.caption(f"Since {snapshot['since']}; percentiles are estimated from histogram buckets.")
+        else:
+            st.info("No frames measured yet." if METRICS.enabled else "Enable collection, then start the camera.")
+
+        col1, col2, col3 = st.columns(3)
+        if col1.button("💾 Save JSON"):
+            st.success(f"Saved {METRICS.dump(metrics_path('json'))}")
+        if col2.button("💾 Save Prometheus"):
+            st.success(f"Saved {METRICS.dump(metrics_path('prom'))}")
+        if col3.button("♻️ Reset Metrics"):
+            METRICS.reset()
+
+
+def stop_capture_service():
+    service = st.session_state.get("capture_service")
+    if service is not None:
+        service.stop()
+        st.session_state.capture_service = None
+
+
+def leave_ui():
+    # Called by app.py when the session switches to another page
+    if st.session_state.get("camera_on"):
+        st.session_state.camera_on = False
+        stop_capture_service()
+
+
 def attendance_ui():
     st.title("📷 Face Recognition Attendance")
 
     if "camera_on" not in st.session_state:
         st.session_state.camera_on = False
-        st.session_state.known_encodings = []
-        st.session_state.known_ids = []
+        st.session_state.gallery = FaceGallery()
         st.session_state.marked_users = set()
         st.session_state.attendance_buffer = []
+        st.session_state.capture_service = None
+
+    detector, tracking_config = recognition_settings()
+    metrics_ui()
 
     if st.button("🔄 Refresh Faces"):
-        st.session_state.known_encodings, st.session_state.known_ids = load_known_faces()
+        stop_capture_service()
+        st.session_state.gallery = shared_gallery(refresh=True)
 
     col1, col2 = st.columns(2)
     if col1.button("▶️ Start Camera"):
         st.session_state.camera_on = True
-        st.session_state.known_encodings, st.session_state.known_ids = load_known_faces()
+        st.session_state.gallery = shared_gallery()
         st.session_state.marked_users = set()
         st.session_state.attendance_buffer = []
+        stop_capture_service()
 
     if col2.button("⛔ Stop Camera"):
         st.session_state.camera_on = False
-        save_attendance_log(st.session_state.attendance_buffer)
+        stop_capture_service()
+        report_saved(st.session_state.attendance_buffer)
 
     if st.session_state.camera_on:
-        cap = cv2.VideoCapture(0)
-        ret, frame = cap.read()
-        if ret:
-            frame = recognize_faces(
-                frame,
-                st.session_state.known_encodings,
-                st.session_state.known_ids,
-                st.session_state.marked_users,
-                st.session_state.attendance_buffer
-            )
-            st.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
-        cap.release()
-import io
-
-def export_attendance():
-    st.title("📈 Export Attendance Logs")
+        service = st.session_state.get("capture_service")
+        if service is None:
+            try:
+                service = start_capture_service(st.session_state.gallery, st.session_state.marked_users, tracking_config,
+                                                detector=detector)
+            except RuntimeError as e:
+                st.error(f"❌ {e}")
+                st.session_state.camera_on = False
+                return
+            st.session_state.capture_service = service
 
-    log_dir = Path("data/attendance_logs")
-    log_files = sorted(log_dir.glob("*.csv"), reverse=True)
-
-    if not log_files:
-        st.warning("No attendance logs found to export.")
-        return
+        service.heartbeat()
+        # Already on disk: the recognition thread writes each record before it is queued for display
+        events = service.drain_events()
+        for record in events:
+            st.session_state.attendance_buffer.append(record)
+            st.success(f"✅ Marked: {record['Name']} ({record['User ID']})")
 
-    file_map = {f.name: f for f in log_files}
-    selected_log = st.selectbox("📂 Select a log file to export", list(file_map.keys()))
-    file_path = file_map[selected_log]
+        frame = service.latest_frame()
+        if frame is not None:
+            with METRICS.stage("display"):
+                st.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
 
-    df = pd.read_csv(file_path)
-    st.dataframe(df, use_container_width=True, height=400)
+        stats = service.stats()
+        st.caption(
+            f"Capture {stats['capture_fps']:.1f} FPS · Recognition {stats['recognition_fps']:.1f} FPS · "
+            f"Dropped frames {stats['frames_dropped']}"
+        )
+        if service.tracker is not None:
+            report = service.tracker.report()
+            st.caption(
+                f"Tracking: {report['ms_per_frame']:.1f} ms/frame, {report['cpu_ms_per_frame']:.1f} ms CPU/frame, "
+                f"{report['detections']} detections and {report['encodings']} encodings over {report['frames']} frames"
+            )
 
-    export_format = st.selectbox("🧾 Choose export format", ["CSV", "Excel"])
+        if service.error:
+            st.error(service.error)
+        if not service.running:
+            st.session_state.camera_on = False
+            stop_capture_service()
+            report_saved(st.session_state.attendance_buffer)
+            return
 
-    if st.button("⬇️ Download"):
-        if export_format == "CSV":
-            st.download_button(
-                label="Download CSV",
-                data=df.to_csv(index=False).encode("utf-8"),
-                file_name=selected_log,
-                mime="text/csv"
-            )
-        else:
-            towrite = io.BytesIO()
-            with pd.ExcelWriter(towrite, engine="xlsxwriter") as writer:
-                df.to_excel(writer, index=False, sheet_name="Attendance")
-                writer.save()
-            st.download_button(
-                label="Download Excel",
-                data=towrite.getvalue(),
-                file_name=selected_log.replace(".csv", ".xlsx"),
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        time.sleep(UI_REFRESH_SECONDS)
+        st.rerun()
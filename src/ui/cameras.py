@@ -0,0 +1,41 @@
+import streamlit as st
+import pandas as pd
+from src.face_recognition.server_status import STATUS_PATH, read_status
+
+def cameras_ui():
+    st.title("🎥 Camera Server")
+
+    if st.button("🔄 Refresh Status"):
+        st.rerun()
+
+    status = read_status(STATUS_PATH)
+    if status is None:
+        st.info("The attendance server is not running. Start it with `python -m src.face_recognition.server name=0 ...`.")
+        return
+
+    state = "🟢 Running" if status["running"] else "🔴 Stopped"
+    st.caption(f"{state} · updated {status['updated_at']} · {status['gallery_size']} known faces")
+    if status["stale"]:
+        st.warning("⚠️ The server has not updated its status recently; it may have crashed.")
+    if status.get("last_error"):
+        st.error(f"❌ Last recognition error ({status.get('failed_rounds', 0)} failed rounds): {status['last_error']}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Marked Today", status["marked_today"])
+    col2.metric("Faces per Match Call", status["faces_per_match_call"])
+    col3.metric("Match Time", f"{status['match_ms_per_round']:.2f} ms")
+    col4.metric("Faces per Encode Batch", status.get("faces_per_encode_batch", 0))
+
+    if not status["sources"]:
+        st.warning("No cameras configured.")
+        return
+
+    df = pd.DataFrame(status["sources"])
+    df = df[["name", "state", "capture_fps", "processed_fps", "max_fps", "latency_p50_ms", "latency_p95_ms",
+             "frames_dropped", "faces", "marked", "error"]]
+    df.columns = ["Camera", "State", "Capture FPS", "Processed FPS", "Budget FPS", "Latency p50 (ms)",
+                  "Latency p95 (ms)", "Dropped", "Faces", "Marked", "Error"]
+    st.dataframe(df, use_container_width=True)
+
+if __name__ == "__main__":
+    st.write("Run this file via app.py.")
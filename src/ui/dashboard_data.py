@@ -0,0 +1,169 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+import pandas as pd
+
+from src.db.attendance_schema import fallback_day_for, parse_log_bytes, read_log_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Constants
+USER_INFO_COLUMNS = ["User ID", "Name", "Phone Number", "Email", "Department"]
+ANCHOR_BYTES = 64
+MAX_CACHED_LOGS = 8
+MAX_CACHED_ROWS = 2_000_000
+
+
+@dataclass
+class LogView:
+    """Parsed and merged rows of one log plus its running metrics."""
+    path: Path
+    size: int
+    mtime_ns: int
+    offset: int
+    anchor: bytes
+    header: List[str]
+    attendance: pd.DataFrame
+    users_version: object = None
+    merged: Optional[pd.DataFrame] = None
+    total: int = 0
+    unique_users: Set[str] = field(default_factory=set)
+    first_checkin: Optional[pd.Timestamp] = None
+
+    def add_metrics(self, rows: pd.DataFrame):
+        self.total += len(rows)
+        self.unique_users.update(rows["User ID"])
+        if len(rows):
+            first = rows["Time"].min()
+            if self.first_checkin is None or first < self.first_checkin:
+                self.first_checkin = first
+
+
+def _attendance_rows(normalized: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "User ID": normalized["User ID"].astype(str),
+        "Logged Name": normalized["Name"],
+        "Time": normalized["Timestamp"],
+    })
+
+
+def merge_user_info(attendance: pd.DataFrame, users_df: pd.DataFrame) -> pd.DataFrame:
+    if users_df.empty:
+        merged = attendance.assign(**{"Name": pd.NA, "Phone Number": "", "Email": "", "Department": ""})
+    else:
+        users_df = users_df[USER_INFO_COLUMNS].drop_duplicates("User ID").astype({"User ID": str})
+        merged = attendance.merge(users_df, on="User ID", how="left")
+    # Users missing from the table keep the name the log was written with
+    logged = merged["Logged Name"].replace("", pd.NA)
+    merged["Name"] = merged["Name"].fillna(logged).fillna("Unknown")
+    merged = merged.fillna({"Phone Number": "", "Email": "", "Department": ""})
+    return merged[["User ID", "Time", "Name", "Phone Number", "Email", "Department"]]
+
+
+def _read_anchor(path: Path, offset: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - ANCHOR_BYTES))
+        return f.read(offset - max(0, offset - ANCHOR_BYTES))
+
+
+class DashboardCache:
+    """Per-log memo of the parsed and merged dashboard frame, shared by every session.
+
+    A log that only grew is brought up to date by parsing the appended
+    tail; one that shrank or was rewritten is reloaded. The merge with the
+    user table is redone only when ``users_version()`` changes. Least
+    recently viewed logs are evicted past ``max_logs`` or ``max_rows``.
+    """
+
+    def __init__(self, load_users: Callable[[], pd.DataFrame], users_version: Callable[[], object],
+                 max_logs: int = MAX_CACHED_LOGS, max_rows: int = MAX_CACHED_ROWS):
+        self.load_users = load_users
+        self.users_version = users_version
+        self.max_logs = max_logs
+        self.max_rows = max_rows
+        self._views: "OrderedDict[Path, LogView]" = OrderedDict()
+        self._users = (object(), None)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "tail_reads": 0, "full_loads": 0, "merges": 0, "evictions": 0}
+
+    def _full_load(self, path: Path) -> LogView:
+        stat = os.stat(path)
+        normalized, header, offset = read_log_snapshot(path)
+        view = LogView(path, stat.st_size, stat.st_mtime_ns, offset, _read_anchor(path, offset), header,
+                       _attendance_rows(normalized))
+        view.add_metrics(view.attendance)
+        self.stats["full_loads"] += 1
+        return view
+
+    def _read_tail(self, view: LogView, stat: os.stat_result) -> Optional[pd.DataFrame]:
+        """Rows appended since the last read, or None if the already-read part changed."""
+        with open(view.path, "rb") as f:
+            f.seek(view.offset - len(view.anchor))
+            data = f.read(stat.st_size - view.offset + len(view.anchor))
+        if not data.startswith(view.anchor):
+            return None
+        data = data[len(view.anchor):]
+        end = data.rfind(b"\n") + 1
+        rows = _attendance_rows(parse_log_bytes(data[:end], view.header, fallback_day_for(view.path)))
+        view.offset += end
+        view.anchor = (view.anchor + data[:end])[-ANCHOR_BYTES:]
+        view.size, view.mtime_ns = stat.st_size, stat.st_mtime_ns
+        self.stats["tail_reads"] += 1
+        return rows
+
+    def get(self, path: Path) -> LogView:
+        path = Path(path)
+        with self._lock:
+            stat = os.stat(path)
+            users_version = self.users_version()
+            view = self._views.get(path)
+            new_rows = None
+            if view is not None and (stat.st_size, stat.st_mtime_ns) == (view.size, view.mtime_ns):
+                self.stats["hits"] += 1
+            elif view is not None and view.header and stat.st_size >= view.offset:
+                new_rows = self._read_tail(view, stat)
+                if new_rows is None:
+                    logger.info(f"{path.name} was rewritten, reloading it")
+                    view = None
+                else:
+                    view.attendance = pd.concat([view.attendance, new_rows], ignore_index=True)
+                    view.add_metrics(new_rows)
+            else:
+                view = None
+            if view is None:
+                # New, shrunk or rewritten log
+                view = self._full_load(path)
+
+            if view.merged is None or users_version != view.users_version:
+                view.merged = merge_user_info(view.attendance, self._users_df(users_version))
+                view.users_version = users_version
+                self.stats["merges"] += 1
+            elif new_rows is not None and len(new_rows):
+                view.merged = pd.concat([view.merged, merge_user_info(new_rows, self._users_df(users_version))],
+                                        ignore_index=True)
+
+            self._views[path] = view
+            self._views.move_to_end(path)
+            self._evict()
+            return view
+
+    def _users_df(self, version) -> pd.DataFrame:
+        if self._users[0] != version:
+            self._users = (version, self.load_users())
+        return self._users[1]
+
+    def _evict(self):
+        rows = sum(len(view.attendance) for view in self._views.values())
+        while len(self._views) > 1 and (len(self._views) > self.max_logs or rows > self.max_rows):
+            _, evicted = self._views.popitem(last=False)
+            rows -= len(evicted.attendance)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
@@ -0,0 +1,64 @@
+import streamlit as st
+from datetime import datetime
+from pathlib import Path
+from src.db.exports import EXPORT_DIR, EXPORT_FORMATS, export_attendance_range
+
+# Constants
+ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
+EXPORT_MIME_TYPES = {
+    ".csv": "text/csv",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+# st.download_button sends the whole file through the browser session in memory; larger exports stay on disk
+DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+
+
+def export_ui():
+    st.title("📈 Export Attendance Logs")
+
+    if not any(ATTENDANCE_LOG_DIR.glob("*.csv")):
+        st.warning("No attendance logs found to export.")
+        return
+
+    today = datetime.now().date()
+    selected = st.date_input("📅 Date range", (today.replace(day=1), today))
+    if len(selected) != 2:
+        st.info("Pick an end date.")
+        return
+    start, end = selected
+    export_format = st.selectbox("🧾 Choose export format", list(EXPORT_FORMATS))
+
+    if st.button("📦 Export"):
+        bar = st.progress(0.0, text="Exporting...")
+        try:
+            result = export_attendance_range(
+                export_format, start, end, ATTENDANCE_LOG_DIR, EXPORT_DIR,
+                progress=lambda rows, fraction: bar.progress(min(1.0, fraction), text=f"Exported {rows} rows"),
+            )
+        except Exception as e:
+            st.error(f"❌ Export failed: {e}")
+            return
+        bar.progress(1.0, text=f"Exported {result['rows']} rows in {result['seconds']:.1f}s")
+        st.session_state.last_export = result["path"]
+
+    path = st.session_state.get("last_export")
+    if path is not None and Path(path).exists():
+        st.success(f"✅ Saved to {path}")
+        size = Path(path).stat().st_size
+        if size > DOWNLOAD_MAX_BYTES:
+            st.info(f"This export is {size / 1024 / 1024:.0f} MB, too large to download through the browser; "
+                    f"copy it from {path} instead.")
+            return
+        with open(path, "rb") as f:
+            st.download_button(
+                label=f"⬇️ Download {Path(path).name}",
+                data=f,
+                file_name=Path(path).name,
+                mime=EXPORT_MIME_TYPES[Path(path).suffix]
+            )
+
+
+if __name__ == "__main__":
+    export_ui()
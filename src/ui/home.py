@@ -6,7 +6,10 @@ from pathlib import Path
 from io import BytesIO
 import os
 import logging
-from src.db.db_handler import get_all_users
+from src.db.db_handler import get_all_users, get_users_version
+from src.db.attendance_history import AttendanceHistory
+from src.db.attendance_schema import ATTENDANCE_COLUMNS as LOG_COLUMNS, attendance_record, read_log
+from src.ui.dashboard_data import DashboardCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -17,6 +20,12 @@ logger = logging.getLogger(__name__)
 # Constants
 ATTENDANCE_LOG_DIR = Path("data/attendance_logs")
 ATTENDANCE_COLUMNS = ["User ID", "Time"]
+HISTORY_RANGE_DAYS = 120
+
+# Shared by every session; roll_up() is serialised internally
+ATTENDANCE_HISTORY = AttendanceHistory()
+# (name, size, mtime) of the logs last rolled up, so an unchanged directory skips roll_up() entirely
+_rolled_up_logs = None
 
 def ensure_directory_exists(directory_path):
     if not directory_path.exists():
@@ -30,22 +39,11 @@ def load_attendance_log(file_path: Path) -> pd.DataFrame:
             logger.error(f"Attendance log file not found: {file_path}")
             return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
 
-        df = pd.read_csv(file_path)
+        # Typed and already normalized; timestamps are not re-parsed on every view
+        df = read_log(file_path)
         logger.info(f"Loaded attendance log with {len(df)} records from {file_path}")
+        return df[["User ID", "Timestamp"]].rename(columns={"Timestamp": "Time"})
 
-        for col in ATTENDANCE_COLUMNS:
-            if col not in df.columns:
-                logger.warning(f"Column '{col}' missing, adding empty column")
-                df[col] = ""
-
-        df = df[ATTENDANCE_COLUMNS]
-        df["Time"] = pd.to_datetime(df["Time"], errors="coerce")
-        df = df.dropna(subset=["Time"])
-        return df
-
-    except pd.errors.EmptyDataError:
-        logger.warning(f"Empty CSV file: {file_path}")
-        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
     except Exception as e:
         logger.error(f"Error loading attendance file {file_path}: {str(e)}")
         st.error(f"❌ Error loading attendance file: {str(e)}")
@@ -57,14 +55,11 @@ def generate_sample_attendance_if_empty():
         logger.info("Generating sample data")
         today = datetime.now().strftime("%Y-%m-%d")
         sample_file = ATTENDANCE_LOG_DIR / f"attendance_{today}.csv"
-        sample_data = {
-            "User ID": ["DEMO001", "DEMO002"],
-            "Time": [
-                (datetime.now() - timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ]
-        }
-        pd.DataFrame(sample_data).to_csv(sample_file, index=False)
+        sample_data = [
+            attendance_record("DEMO001", "Demo User 1", datetime.now() - timedelta(hours=2)),
+            attendance_record("DEMO002", "Demo User 2", datetime.now()),
+        ]
+        pd.DataFrame(sample_data, columns=LOG_COLUMNS).to_csv(sample_file, index=False)
         logger.info(f"Sample log generated at {sample_file}")
         return True
     return False
@@ -100,9 +95,48 @@ def get_user_info_df():
         st.error(f"❌ Error retrieving user information: {str(e)}")
         return pd.DataFrame(columns=["User ID", "Name", "Phone Number", "Email", "Department"])
 
-def home_ui():
-    st.title("🏠 Attendance System Dashboard")
-    ensure_directory_exists(ATTENDANCE_LOG_DIR)
+# Parsed and merged frame per log, shared by every session
+DASHBOARD_CACHE = DashboardCache(get_user_info_df, get_users_version)
+
+def log_signature(log_dir: Path) -> tuple:
+    # One directory listing; on Windows scandir returns size and mtime without a stat per file
+    try:
+        with os.scandir(log_dir) as entries:
+            return tuple(sorted((e.name, e.stat().st_size, e.stat().st_mtime_ns)
+                                for e in entries if e.name.endswith(".csv")))
+    except OSError:
+        return ()
+
+def roll_up_history():
+    global _rolled_up_logs
+    # Read before rolling up: a log written meanwhile changes the signature and is picked up next time
+    signature = log_signature(ATTENDANCE_LOG_DIR)
+    if signature == _rolled_up_logs:
+        return
+    with st.spinner("Updating attendance history..."):
+        ATTENDANCE_HISTORY.roll_up(ATTENDANCE_LOG_DIR)
+    _rolled_up_logs = signature
+
+def history_ui():
+    st.markdown("### 📈 Attendance History")
+    today = datetime.now().date()
+    selected = st.date_input("Date range", (today - timedelta(days=HISTORY_RANGE_DAYS), today), key="history_range")
+    if len(selected) != 2:
+        return
+    start, end = selected
+    roll_up_history()
+
+    daily = ATTENDANCE_HISTORY.daily_counts(start, end)
+    if daily.empty:
+        st.info("📝 No attendance in the selected range.")
+        return
+    st.line_chart(daily)
+
+    rates = ATTENDANCE_HISTORY.department_rates(start, end)
+    st.caption(f"Rates over {rates.attrs['session_days']} days with attendance")
+    st.dataframe(rates, use_container_width=True)
+
+def daily_log_ui():
     if not any(ATTENDANCE_LOG_DIR.glob("*.csv")):
         if st.button("🔄 Generate Sample Data"):
             if generate_sample_attendance_if_empty():
@@ -128,44 +162,33 @@ def home_ui():
     file_path = ATTENDANCE_LOG_DIR / selected_log
 
     with st.spinner("Loading attendance data..."):
-        attendance_df = load_attendance_log(file_path)
+        try:
+            view = DASHBOARD_CACHE.get(file_path)
+        except Exception as e:
+            logger.error(f"Error loading attendance file {file_path}: {str(e)}")
+            st.error(f"❌ Error loading attendance file: {str(e)}")
+            return
 
-    if attendance_df.empty:
+    if view.merged.empty:
         st.info("📝 No records for the selected date.")
         return
 
-    attendance_df["Date"] = attendance_df["Time"].dt.date
-    attendance_df["User ID"] = attendance_df["User ID"].astype(str)
-
-    with st.spinner("Loading user info..."):
-        users_df = get_user_info_df()
-
-    if users_df.empty:
-        merged_df = attendance_df.copy()
-        merged_df["Name"] = "Unknown"
-        merged_df["Phone Number"] = ""
-        merged_df["Email"] = ""
-        merged_df["Department"] = ""
-    else:
-        users_df["User ID"] = users_df["User ID"].astype(str)
-        merged_df = pd.merge(
-            attendance_df,
-            users_df[["User ID", "Name", "Phone Number", "Email", "Department"]],
-            on="User ID",
-            how="left"
-        )
-        merged_df.fillna({"Name": "Unknown", "Phone Number": "", "Email": "", "Department": ""}, inplace=True)
-
     st.markdown("### 📊 Overview")
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Records", len(merged_df))
-    col2.metric("Unique Users", merged_df["User ID"].nunique())
-    col3.metric("First Check-in", merged_df["Time"].min().strftime("%H:%M") if not merged_df["Time"].isna().all() else "N/A")
+    col1.metric("Total Records", view.total)
+    col2.metric("Unique Users", len(view.unique_users))
+    col3.metric("First Check-in", view.first_checkin.strftime("%H:%M") if view.first_checkin is not None else "N/A")
 
     st.markdown("### 📋 Attendance Records")
-    display_df = merged_df.drop(columns=["Date"])
-    display_df.rename(columns={"Time": "Check-in Time"}, inplace=True)
+    display_df = view.merged.rename(columns={"Time": "Check-in Time"})
     st.dataframe(display_df, use_container_width=True, height=400)
 
+def home_ui():
+    st.title("🏠 Attendance System Dashboard")
+    ensure_directory_exists(ATTENDANCE_LOG_DIR)
+    # The history stays visible when there are no logs yet or the selected day is empty
+    daily_log_ui()
+    history_ui()
+
 if __name__ == "__main__":
     home_ui()
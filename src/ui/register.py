@@ -2,10 +2,9 @@ import streamlit as st
 import os
 from pathlib import Path
 import logging
-import cv2
-import time
-from datetime import datetime
+import pandas as pd
 from src.db.db_handler import register_user, get_user_by_id
+from src.face_recognition.enrollment import enroll_bulk, shared_queue
 
 # Setup logging
 logger = logging.getLogger("register")
@@ -13,6 +12,57 @@ logger = logging.getLogger("register")
 # Constants
 FACES_DIR = Path("data/faces")
 FACES_DIR.mkdir(parents=True, exist_ok=True)
+# The photo is checked before the user is saved; the first check also starts the enrollment worker
+PHOTO_CHECK_SECONDS = 30
+# How long the form waits for the checked photo to be added to the gallery and model
+ENROLL_WAIT_SECONDS = 5
+STATUS_ICONS = {"queued": "⏳", "enrolled": "✅", "rejected": "❌", "failed": "⚠️"}
+
+def enrollment_status_ui():
+    enrollment = shared_queue()
+    jobs = enrollment.jobs()
+    if not jobs:
+        return
+    st.subheader("🧬 Face Enrollment")
+    pending = enrollment.pending()
+    st.caption(f"{pending} photos waiting to be encoded · {enrollment.stats['enrolled']} enrolled, "
+               f"{enrollment.stats['rejected']} rejected, {enrollment.stats['failed']} failed")
+    if pending and st.button("🔄 Refresh Enrollment Status"):
+        st.rerun()
+    st.dataframe(pd.DataFrame([{
+        "Job": job.job_id,
+        "User ID": job.user_id,
+        "Photo": job.path.name,
+        "Source": job.source,
+        "Status": f"{STATUS_ICONS[job.status]} {job.status}",
+        "Message": job.message,
+        "Submitted": job.submitted_at.strftime("%H:%M:%S"),
+    } for job in jobs]), use_container_width=True)
+
+def bulk_enrollment_ui():
+    with st.expander("📦 Bulk Enrollment"):
+        st.write("Add photos of registered users from a zip or a server folder laid out as `<user_id>/<photo>.jpg`.")
+        archive = st.file_uploader("Zip of photos", type=["zip"], key="bulk_zip")
+        folder = st.text_input("Or a folder on the server", key="bulk_folder")
+        if not st.button("Enroll Photos"):
+            return
+        if archive is None and not folder:
+            st.error("Please upload a zip or enter a folder.")
+            return
+        if archive is None and not Path(folder).is_dir():
+            st.error(f"Folder not found: {folder}")
+            return
+        try:
+            jobs, skipped = enroll_bulk(shared_queue(), archive if archive is not None else Path(folder),
+                                        known_user=lambda user_id: get_user_by_id(user_id) is not None,
+                                        label=archive.name if archive is not None else Path(folder).name)
+        except Exception as e:
+            logger.error(f"Bulk enrollment failed: {e}")
+            st.error(f"Error: {e}")
+            return
+        st.success(f"✅ Queued {len(jobs)} photos for encoding.")
+        for line in skipped:
+            st.warning(f"Skipped {line}")
 
 def register_ui():
     st.title("📝 Register New User")
@@ -48,18 +98,14 @@ def register_ui():
                 return
 
             image_file = photo or uploaded_file
-            try:
-                user_face_dir = FACES_DIR / user_id
-                user_face_dir.mkdir(parents=True, exist_ok=True)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{user_id}_{timestamp}.jpg"
-                photo_path = user_face_dir / filename
-
-                with open(photo_path, "wb") as f:
-                    f.write(image_file.getbuffer())
-
-                st.info("✅ Photo saved.")
+            image_bytes = bytes(image_file.getbuffer())
+            with st.spinner("Checking the photo..."):
+                status, reason, encoding = shared_queue().check(image_bytes, timeout=PHOTO_CHECK_SECONDS)
+            if status != "enrolled":
+                st.error(f"❌ Photo not accepted: {reason}. The user was not registered.")
+                return
 
+            try:
                 success, message = register_user(
                     user_id=user_id,
                     name=name,
@@ -71,9 +117,15 @@ def register_ui():
 
                 if success:
                     st.success(f"✅ {message}: {name} ({user_id})")
-                    st.balloons()
-                    time.sleep(1)
-                    st.experimental_rerun()
+                    job = shared_queue().add_encoded(user_id, image_bytes, encoding)
+                    job = shared_queue().wait(job.job_id, timeout=ENROLL_WAIT_SECONDS)
+                    if job.status == "enrolled":
+                        st.success("✅ Face enrolled; the user can be recognized right away.")
+                        st.balloons()
+                    elif job.done:
+                        st.error(f"❌ Photo not enrolled: {job.message}. Add a new photo with Bulk Enrollment.")
+                    else:
+                        st.info("⏳ Photo being saved; see Face Enrollment below.")
                 else:
                     st.error(f"❌ {message}")
 
@@ -81,5 +133,8 @@ def register_ui():
                 logger.error(f"Error saving photo or registering user: {e}")
                 st.error(f"Error: {e}")
 
+    bulk_enrollment_ui()
+    enrollment_status_ui()
+
 if __name__ == "__main__":
     st.write("Run this from app.py.")
@@ -0,0 +1,115 @@
+import sys
+import time
+import logging
+import argparse
+import importlib
+import subprocess
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List, Tuple
+
+logger = logging.getLogger("startup")
+
+# Constants
+ROOT = Path(__file__).resolve().parents[2]
+PAGE_MODULES = ["src.ui.home", "src.ui.register", "src.ui.users", "src.ui.attendance", "src.ui.export", "src.ui.cameras"]
+RERUN_WINDOW = 100
+TOP_MODULES = 15
+
+# Per process: what each page cost to import the first time, and how long its reruns take
+_started_at = datetime.now()
+_imports: Dict[str, Dict[str, float]] = {}
+_reruns: Dict[str, Deque[float]] = {}
+_lock = threading.Lock()
+
+
+def timed_import(module_path: str):
+    """``importlib.import_module`` that records how long the first import took and how many modules it loaded."""
+    if module_path in sys.modules:
+        return sys.modules[module_path]
+    before = len(sys.modules)
+    started = time.perf_counter()
+    module = importlib.import_module(module_path)
+    seconds = time.perf_counter() - started
+    loaded = len(sys.modules) - before
+    with _lock:
+        _imports[module_path] = {"seconds": seconds, "modules": loaded}
+    logger.info(f"Imported {module_path} in {seconds:.2f}s ({loaded} new modules)")
+    return module
+
+
+def record_rerun(page: str, seconds: float):
+    with _lock:
+        _reruns.setdefault(page, deque(maxlen=RERUN_WINDOW)).append(seconds)
+
+
+def startup_report() -> Dict:
+    with _lock:
+        reruns = {}
+        for page, times in _reruns.items():
+            ordered = sorted(times)
+            reruns[page] = {
+                "runs": len(ordered),
+                "last_ms": round(1000 * times[-1], 1),
+                "median_ms": round(1000 * ordered[len(ordered) // 2], 1),
+                "max_ms": round(1000 * ordered[-1], 1),
+            }
+        return {
+            "process_started": _started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "modules_loaded": len(sys.modules),
+            "imports": {module: dict(cost) for module, cost in _imports.items()},
+            "reruns": reruns,
+        }
+
+
+def importtime(module_path: str, python: str = sys.executable) -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self µs, cumulative µs) for a cold import of ``module_path`` in a fresh interpreter."""
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module_path}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(f"Importing {module_path} failed: {lines[-1] if lines else result.returncode}")
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(own), int(cumulative)))
+    return rows
+
+
+def print_report(module_path: str, top: int = TOP_MODULES):
+    rows = importtime(module_path)
+    total = next((cumulative for name, depth, _, cumulative in rows if name == module_path), 0)
+    print(f"{module_path}: {total / 1000:.0f} ms cold import, {len(rows)} modules")
+    # The page's direct imports, with everything they pull in
+    direct = sorted((row for row in rows if row[1] == 1), key=lambda row: row[3], reverse=True)
+    print(f"  {'direct import':<50} {'cumulative ms':>14}")
+    for name, _, _, cumulative in direct[:top]:
+        print(f"  {name:<50} {cumulative / 1000:>14.1f}")
+    # Where the time is actually spent: module bodies such as dlib model loading
+    heaviest = sorted(rows, key=lambda row: row[2], reverse=True)
+    print(f"  {'module':<50} {'self ms':>14}")
+    for name, _, own, _ in heaviest[:top]:
+        print(f"  {name:<50} {own / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import cost of each UI page (python -X importtime)")
+    parser.add_argument("modules", nargs="*", default=PAGE_MODULES, help="modules to import cold, one interpreter each")
+    parser.add_argument("--top", type=int, default=TOP_MODULES, help="modules listed per section")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        try:
+            print_report(module, args.top)
+        except RuntimeError as e:
+            print(f"{module}: {e}")
+            failed = True
+        print()
+    sys.exit(1 if failed else 0)
@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-from src.db.db_handler import get_all_users
+from src.db.db_handler import get_cache_stats
+from src.db.user_directory import DIRECTORY_COLUMNS, SEARCH_MODES, get_directory_stats, get_user_directory
+
+PAGE_SIZES = [25, 50, 100, 250]
 
 def users_ui():
     st.title("👥 Registered Users")
@@ -8,23 +11,46 @@ def users_ui():
     if st.button("🔄 Refresh List"):
         st.rerun()
 
-    users = get_all_users()
+    directory = get_user_directory()
 
-    if not users:
+    if not len(directory):
         st.info("No registered users found.")
         return
 
-    df = pd.DataFrame(users)
+    col1, col2, col3 = st.columns([3, 1, 2])
+    query = col1.text_input("🔍 Search", placeholder="User ID, name, email or department")
+    mode = col2.radio("Match", list(SEARCH_MODES), format_func=lambda m: "Contains" if m == "contains" else "Starts with")
+    department = col3.selectbox("Department", ["All"] + directory.departments)
+
+    col1, col2 = st.columns([1, 3])
+    page_size = col1.selectbox("Rows per page", PAGE_SIZES, index=1)
+    rows = directory.matching_rows(query, None if department == "All" else department, mode)
+    pages = max(1, -(-len(rows) // page_size))
+    # Keyed on the search, so a new search starts again at page 1
+    page = col2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                             key=f"users_page_{query}_{mode}_{department}_{page_size}")
+
+    result = directory.page_of(rows, int(page), page_size)
+    if not result.total:
+        st.info("No users match this search.")
+        return
 
-    expected_columns = ["user_id", "name", "phone", "email", "department"]
-    for col in expected_columns:
+    df = pd.DataFrame(result.users)
+    for col in DIRECTORY_COLUMNS:
         if col not in df.columns:
             df[col] = ""
 
-    df = df[expected_columns]
+    df = df[DIRECTORY_COLUMNS]
     df.columns = ["User ID", "Name", "Phone", "Email", "Department"]
 
-    st.dataframe(df, use_container_width=True, height=400)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    st.caption(f"Showing {result.first}–{result.first + len(result.users) - 1} of {result.total} users"
+               f" ({len(directory)} registered)")
+
+    stats = get_cache_stats()
+    directory_stats = get_directory_stats()
+    st.caption(f"User cache: {stats['hits']} hits, {stats['misses']} misses; "
+               f"directory index built {directory_stats['builds']} times, last in {directory.build_seconds:.2f}s")
 
 if __name__ == "__main__":
-    st.write("Run this file via app.py.")
\ No newline at end of file
+    st.write("Run this file via app.py.")